@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+
+"""Evaluate stop-loss / 1R alerts for every holding in one pass.
+
+    evaluate_stops.py [--db PATH] [--provider polygon|yahoo] [--dedup-minutes 60]
+
+Reads `holdings` and `alerts_log` from portfolio.sqlite (read-only), fetches
+all quotes in one batch through get_quote.fetch_quotes and prints one JSON
+document (the resident `get_quote.py --serve` answers the same thing for
+{"cmd": "evaluate_stops", "db": ...} through run_evaluation):
+
+    {"evaluated_at": ..., "holdings": [...], "alerts": [...], "errors": {SYMBOL: msg}}
+
+`alerts` lists the triggers that are not inside the dedup window of the same
+holding/alert type. Sending and logging alerts stays with the caller
+(reporter.js): the app's sql.js database lives in memory and rewrites the
+file on every change, so rows written here would be lost.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as _dt
+import json
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+if str(Path(__file__).resolve().parent) not in sys.path:
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import numpy as np  # noqa: E402
+
+from get_quote import DEFAULT_PROVIDER, PROVIDERS, _error_message, fetch_quotes  # noqa: E402
+
+# same thresholds as reporter.js evaluateHolding: 80% of the way to the stop,
+# and price at entry + 1R
+STOP_LOSS_FRACTION = 0.8
+TAKE_PROFIT_R = 1.0
+ALERT_STOP_LOSS = "stop_loss_80"
+ALERT_TAKE_PROFIT = "take_profit_100"
+DEFAULT_DEDUP_MINUTES = 60
+
+DEFAULT_DB = (
+    Path(os.environ.get("WORKBENCH_USER_DATA") or Path(__file__).resolve().parent.parent / ".user-data")
+    / "portfolio.sqlite"
+)
+
+
+def _epoch(iso: str | None) -> float:
+    if not iso:
+        return np.nan
+    try:
+        dt = _dt.datetime.fromisoformat(iso.replace("Z", "+00:00"))
+    except ValueError:
+        return np.nan
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=_dt.timezone.utc)
+    return dt.timestamp()
+
+
+def load_portfolio(db_path: Path) -> tuple[list[dict], dict[tuple[int, str], float]]:
+    """Holdings with a stop below the average price, and last trigger epochs."""
+    uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True)
+    try:
+        conn.row_factory = sqlite3.Row
+        holdings = [
+            dict(row)
+            for row in conn.execute(
+                """
+                SELECT id, symbol, shares, avg_price, stop_loss, currency
+                FROM holdings
+                WHERE stop_loss IS NOT NULL AND avg_price > stop_loss
+                ORDER BY symbol
+                """
+            )
+        ]
+        last = {
+            (row["holding_id"], row["alert_type"]): _epoch(row["last_triggered"])
+            for row in conn.execute("SELECT holding_id, alert_type, last_triggered FROM alerts_log")
+        }
+    finally:
+        conn.close()
+    return holdings, last
+
+
+def evaluate(
+    holdings: list[dict],
+    quotes: dict[str, dict],
+    last_triggered: dict[tuple[int, str], float],
+    *,
+    now: float,
+    dedup_seconds: float,
+) -> tuple[list[dict], list[dict]]:
+    """Per-holding metrics and the alerts due, computed column-wise."""
+    n = len(holdings)
+    ids = np.array([h["id"] for h in holdings], dtype=np.int64)
+    avg = np.array([h["avg_price"] for h in holdings], dtype=float)
+    stop = np.array([h["stop_loss"] for h in holdings], dtype=float)
+    price = np.full(n, np.nan)
+    for i, h in enumerate(holdings):
+        quote = quotes.get(str(h["symbol"]).upper()) or {}
+        try:
+            price[i] = float(quote.get("price"))
+        except (TypeError, ValueError):
+            pass
+
+    risk = avg - stop
+    valid = np.isfinite(price) & np.isfinite(risk) & (risk > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r_multiple = np.where(valid, (price - avg) / risk, np.nan)
+        stop_distance = np.where(valid, price - stop, np.nan)
+        stop_distance_pct = np.where(valid & (price != 0), stop_distance / price * 100, np.nan)
+
+    triggers = {
+        ALERT_STOP_LOSS: valid & (price <= avg - STOP_LOSS_FRACTION * risk),
+        ALERT_TAKE_PROFIT: valid & (price >= avg + TAKE_PROFIT_R * risk),
+    }
+    due = {}
+    for alert_type, hit in triggers.items():
+        last = np.array([last_triggered.get((int(i), alert_type), np.nan) for i in ids], dtype=float)
+        recent = np.isfinite(last) & (now - last < dedup_seconds)
+        due[alert_type] = hit & ~recent
+
+    def num(value):
+        return float(value) if np.isfinite(value) else None
+
+    rows = []
+    alerts = []
+    for i, h in enumerate(holdings):
+        symbol = str(h["symbol"]).upper()
+        quote = quotes.get(symbol) or {}
+        row = {
+            "holding_id": int(ids[i]),
+            "symbol": symbol,
+            "price": num(price[i]),
+            "avg_price": float(avg[i]),
+            "stop_loss": float(stop[i]),
+            "risk": num(risk[i]),
+            "r_multiple": num(r_multiple[i]),
+            "stop_distance": num(stop_distance[i]),
+            "stop_distance_pct": num(stop_distance_pct[i]),
+            "currency": quote.get("currency") or h.get("currency") or "USD",
+            "as_of": quote.get("as_of") or quote.get("fetched_at"),
+            "triggered": [t for t, hit in triggers.items() if hit[i]],
+        }
+        rows.append(row)
+        for alert_type, mask in due.items():
+            if mask[i]:
+                alerts.append({
+                    **{k: row[k] for k in row if k != "triggered"},
+                    "type": alert_type,
+                    "direction": "down" if alert_type == ALERT_STOP_LOSS else "up",
+                })
+    return rows, alerts
+
+
+def _parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Portföy stop-loss / 1R uyarılarını toplu değerlendir")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB, help="portfolio.sqlite yolu")
+    parser.add_argument(
+        "--provider",
+        choices=sorted(PROVIDERS),
+        default=os.getenv("QUOTE_PROVIDER", DEFAULT_PROVIDER),
+        help="Kullanılacak veri sağlayıcısı",
+    )
+    parser.add_argument("--api-key", dest="api_key", default=None, help="Polygon API anahtarı (opsiyonel)")
+    parser.add_argument(
+        "--dedup-minutes",
+        type=float,
+        default=DEFAULT_DEDUP_MINUTES,
+        help="Aynı uyarının tekrar gönderilmeyeceği süre (dakika)",
+    )
+    return parser.parse_args(argv[1:])
+
+
+def run_evaluation(
+    db_path: Path,
+    provider: str = DEFAULT_PROVIDER,
+    api_key: str | None = None,
+    dedup_minutes: float = DEFAULT_DEDUP_MINUTES,
+    use_cache: bool = True,
+) -> dict:
+    """One evaluation pass; database problems raise ValueError with a user-facing message."""
+    db_path = Path(db_path)
+    if not db_path.exists():
+        raise ValueError(f"Veritabanı bulunamadı: {db_path}")
+
+    now = _dt.datetime.now(tz=_dt.timezone.utc)
+    try:
+        holdings, last_triggered = load_portfolio(db_path)
+    except sqlite3.Error as exc:
+        raise ValueError(f"Veritabanı okunamadı: {exc}") from exc
+
+    quotes: dict[str, dict] = {}
+    if holdings:
+        quotes = fetch_quotes(
+            [h["symbol"] for h in holdings], provider=provider, api_key=api_key, use_cache=use_cache
+        )
+
+    rows, alerts = evaluate(
+        holdings,
+        quotes,
+        last_triggered,
+        now=now.timestamp(),
+        dedup_seconds=float(dedup_minutes) * 60,
+    )
+    errors = {symbol: quote["error"] for symbol, quote in quotes.items() if "error" in quote}
+    return {
+        "evaluated_at": now.isoformat(),
+        "provider": provider,
+        "holdings": rows,
+        "alerts": alerts,
+        "errors": errors,
+    }
+
+
+def main(argv: list[str]) -> int:
+    try:
+        args = _parse_args(argv)
+    except SystemExit:
+        return 1
+
+    try:
+        result = run_evaluation(
+            args.db, provider=args.provider, api_key=args.api_key, dedup_minutes=args.dedup_minutes
+        )
+    except Exception as exc:  # noqa: BLE001
+        print(json.dumps({"error": _error_message(exc)}))
+        return 1
+    print(json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,14 +1,29 @@
 #!/usr/bin/env python3
 
-"""Generate portfolio chart image using existing scanner plotting helpers."""
+"""Generate portfolio chart image using existing scanner plotting helpers.
+
+    generate_chart.py SYMBOL      one chart, JSON on stdout
+    generate_chart.py --serve     resident worker: JSON-lines requests on stdin
+                                  ({"id": ..., "symbol": ...}), one JSON line per
+                                  reply on stdout, in completion order
+
+In --serve mode {"cmd": "render_run", "run_dir": ..., "symbol": ...} draws a
+deferred chart of a scanner run from its bar snapshot (scanner --charts
+accepted|lazy) instead of downloading prices.
+"""
 
 from __future__ import annotations
 
 import base64
+import hashlib
 import json
 import os
+import shutil
 import sys
 import tempfile
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -17,6 +32,8 @@ SCANNER_DIR = ROOT / "scanner-agent"
 
 if str(SCANNER_DIR) not in sys.path:
     sys.path.insert(0, str(SCANNER_DIR))
+if str(Path(__file__).resolve().parent) not in sys.path:
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
 
 REQUIRED_PACKAGES = (
     ("pandas", "pandas"),
@@ -41,10 +58,11 @@ def ensure_dependencies():
                 _sys.path.append(entry)
     except Exception:
         pass
+    # locate only; the real imports below load what is actually used
+    import importlib.util
+
     for module_name, package_name in REQUIRED_PACKAGES:
-        try:
-            importlib.import_module(module_name)
-        except ModuleNotFoundError:
+        if importlib.util.find_spec(module_name) is None:
             missing.append((module_name, package_name))
 
     if not missing:
@@ -85,10 +103,12 @@ ensure_dependencies()
 
 import pandas as pd  # noqa: E402
 import yfinance as yf  # noqa: E402
-from scanner.plotting import plot_ticker_stockcharts  # type: ignore  # noqa: E402
+from scanner.chart_template import render_ticker  # type: ignore  # noqa: E402
+from scanner.bars import Bars  # type: ignore  # noqa: E402
+from market_hours import is_market_open, last_session_close  # noqa: E402
 
 
-def load_price_history(symbol: str) -> pd.DataFrame:
+def _download_history(symbol: str) -> pd.DataFrame:
     df = yf.download(symbol, period="6mo", interval="1d", auto_adjust=False, progress=False)
     if df is None or df.empty:
         raise ValueError("Yeterli fiyat verisi alınamadı")
@@ -104,38 +124,365 @@ def load_price_history(symbol: str) -> pd.DataFrame:
     return df
 
 
-def build_chart(symbol: str) -> dict:
+DARK_CFG = {
+    "options": {
+        "style": {
+            "base_mpf_style": "nightclouds",
+        },
+        "facecolor": "#0f172a",
+        "edgecolor": "#0f172a",
+    }
+}
+
+# bump when the chart renderer output changes so old images stop matching
+RENDER_VERSION = "template-1"
+
+CACHE_DIR = Path(
+    os.environ.get("CHART_CACHE_DIR")
+    or Path(os.environ.get("WORKBENCH_USER_DATA") or ROOT / "electron-app" / ".user-data") / "chart-cache"
+)
+CACHE_MAX_BYTES = int(float(os.environ.get("CHART_CACHE_MB", "64")) * 1024 * 1024)
+# during market hours a cached image younger than this is served without revalidation
+REVALIDATE_AFTER = float(os.environ.get("CHART_REVALIDATE_SECONDS", "60"))
+# a revalidation lock older than this is considered abandoned
+REVALIDATE_LOCK_TTL = 120.0
+
+
+def style_hash(cfg: dict) -> str:
+    payload = json.dumps({"cfg": cfg, "renderer": RENDER_VERSION}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def last_bar_id(df: pd.DataFrame) -> str:
+    """Last bar date plus its values, so an intraday bar that moved gets a new key."""
+    last = df.iloc[-1]
+    values = "|".join(f"{float(last[c]):.6g}" for c in ("Open", "High", "Low", "Close", "Volume"))
+    return f"{pd.Timestamp(last['Date']).date().isoformat()}|{values}"
+
+
+def cache_key(symbol: str, bar_id: str, style: str) -> str:
+    return hashlib.sha256(f"{symbol}|{bar_id}|{style}".encode("utf-8")).hexdigest()[:32]
+
+
+# symbol -> (frame, fetched_at), least recently used first; shared by
+# concurrent requests in --serve mode and bounded so the server stays small
+PRICE_CACHE_ENTRIES = max(1, int(os.environ.get("CHART_PRICE_CACHE_ENTRIES", "64")))
+_PRICES: OrderedDict[str, tuple[pd.DataFrame, float]] = OrderedDict()
+# per-key locks; idle ones are dropped once a table passes this size
+MAX_LOCKS = 256
+_PRICE_LOCKS: dict[str, threading.Lock] = {}
+_RENDER_LOCKS: dict[str, threading.Lock] = {}
+_LOCK_GUARD = threading.Lock()
+
+
+def _lock_for(table: dict, key: str) -> threading.Lock:
+    with _LOCK_GUARD:
+        lock = table.get(key)
+        if lock is None:
+            if len(table) >= MAX_LOCKS:
+                for stale in [k for k, v in table.items() if not v.locked()]:
+                    del table[stale]
+            lock = table[key] = threading.Lock()
+        return lock
+
+
+def _cached_prices(symbol: str):
+    with _LOCK_GUARD:
+        hit = _PRICES.get(symbol)
+        if hit is not None:
+            _PRICES.move_to_end(symbol)
+        return hit
+
+
+def _remember_prices(symbol: str, df: pd.DataFrame):
+    with _LOCK_GUARD:
+        _PRICES[symbol] = (df, time.time())
+        _PRICES.move_to_end(symbol)
+        while len(_PRICES) > PRICE_CACHE_ENTRIES:
+            _PRICES.popitem(last=False)
+
+
+def _price_fresh(fetched_at: float) -> bool:
+    if is_market_open():
+        return time.time() - fetched_at < REVALIDATE_AFTER
+    return fetched_at >= last_session_close().timestamp()
+
+
+def load_price_history(symbol: str) -> pd.DataFrame:
+    """6 months of daily bars; reused while fresh, one download per symbol at a time."""
+    with _lock_for(_PRICE_LOCKS, symbol):
+        hit = _cached_prices(symbol)
+        if hit is not None and _price_fresh(hit[1]):
+            return hit[0]
+        df = _download_history(symbol)
+        _remember_prices(symbol, df)
+        return df
+
+
+class ChartCache:
+    """
+    Content-addressed PNG store: images/<key>.png where key hashes (symbol,
+    last bar, style). latest/<symbol>.<style>.json points at the newest image
+    of a symbol and records when it was last checked against fresh data.
+    Image mtimes are bumped on every hit; the oldest are evicted past max_bytes.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.images = self.root / "images"
+        self.latest = self.root / "latest"
+        self.max_bytes = max(0, int(max_bytes))
+        self.images.mkdir(parents=True, exist_ok=True)
+        self.latest.mkdir(parents=True, exist_ok=True)
+
+    def image_path(self, key: str) -> Path:
+        return self.images / f"{key}.png"
+
+    def _pointer_path(self, symbol: str, style: str) -> Path:
+        return self.latest / f"{symbol}.{style}.json"
+
+    def read_pointer(self, symbol: str, style: str) -> dict | None:
+        try:
+            ptr = json.loads(self._pointer_path(symbol, style).read_text())
+        except (OSError, ValueError):
+            return None
+        if not self.image_path(ptr.get("key", "")).exists():
+            return None
+        return ptr
+
+    def write_pointer(self, symbol: str, style: str, ptr: dict):
+        path = self._pointer_path(symbol, style)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(ptr))
+        os.replace(tmp, path)
+
+    def touch(self, key: str):
+        try:
+            os.utime(self.image_path(key))
+        except OSError:
+            pass
+
+    def store(self, key: str, src: Path):
+        dst = self.image_path(key)
+        tmp = dst.with_suffix(f".{os.getpid()}.tmp")
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+        self.evict(keep=key)
+
+    def evict(self, keep: str | None = None):
+        entries = []
+        for path in self.images.glob("*.png"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            if path.stem == keep:
+                continue
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+
+    def try_lock(self, symbol: str, style: str) -> bool:
+        lock = self.latest / f"{symbol}.{style}.lock"
+        try:
+            if time.time() - lock.stat().st_mtime > REVALIDATE_LOCK_TTL:
+                lock.unlink()
+        except OSError:
+            pass
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except OSError:
+            return False
+
+    def unlock(self, symbol: str, style: str):
+        try:
+            (self.latest / f"{symbol}.{style}.lock").unlink()
+        except OSError:
+            pass
+
+
+def render_png(symbol: str, df: pd.DataFrame, cfg: dict, out_dir: Path) -> Path:
+    render_ticker(Bars.from_frame(df, symbol), cfg, str(out_dir))
+    file_path = out_dir / f"{symbol}.png"
+    if not file_path.exists():
+        raise RuntimeError("Grafik dosyası oluşturulamadı")
+    return file_path
+
+
+def _result(symbol: str, cache: ChartCache, ptr: dict, cached: bool, stale: bool = False) -> dict:
+    data = cache.image_path(ptr["key"]).read_bytes()
+    image64 = base64.b64encode(data).decode("ascii")
+    return {
+        "symbol": symbol,
+        "image": f"data:image/png;base64,{image64}",
+        "generated_at": ptr.get("generated_at"),
+        "cached": cached,
+        "stale": stale,
+    }
+
+
+def refresh_chart(symbol: str, cache: ChartCache, style: str, cfg: dict = DARK_CFG) -> tuple[dict, bool]:
+    """Download, and render only if (symbol, last bar, style) is not stored yet."""
+    with _lock_for(_RENDER_LOCKS, symbol):
+        return _refresh_chart(symbol, cache, style, cfg)
+
+
+def _refresh_chart(symbol: str, cache: ChartCache, style: str, cfg: dict) -> tuple[dict, bool]:
     df = load_price_history(symbol)
-    tmp_dir = Path(tempfile.mkdtemp(prefix="chart_"))
+    key = cache_key(symbol, last_bar_id(df), style)
+    now = datetime.now(timezone.utc).isoformat()
+    old = cache.read_pointer(symbol, style)
+    hit = cache.image_path(key).exists()
+    if hit:
+        cache.touch(key)
+        generated_at = old["generated_at"] if old and old.get("key") == key else now
+    else:
+        tmp_dir = Path(tempfile.mkdtemp(prefix="chart_"))
+        try:
+            cache.store(key, render_png(symbol, df, cfg, tmp_dir))
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        generated_at = now
+    ptr = {"key": key, "generated_at": generated_at, "checked_at": time.time()}
+    cache.write_pointer(symbol, style, ptr)
+    return ptr, hit
+
+
+def spawn_revalidate(symbol: str):
+    """Refresh the cache entry in a detached process; the caller is not kept waiting."""
+    import subprocess
+
+    kwargs = {"stdin": subprocess.DEVNULL, "stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+    if os.name == "nt":
+        kwargs["creationflags"] = getattr(subprocess, "DETACHED_PROCESS", 0)
+    else:
+        kwargs["start_new_session"] = True
+    subprocess.Popen([sys.executable, str(Path(__file__).resolve()), "--refresh", symbol], **kwargs)
+
+
+def build_chart(symbol: str, cfg: dict = DARK_CFG, revalidate=spawn_revalidate) -> dict:
+    """
+    Cached image if nothing changed. Outside market hours an image checked
+    after the last session close is current. During market hours the cached
+    image is returned at once (stale-while-revalidate) and a background
+    process (revalidate(symbol); a worker thread in --serve mode) refreshes it.
+    """
+    cache = ChartCache(CACHE_DIR, CACHE_MAX_BYTES)
+    style = style_hash(cfg)
+    ptr = cache.read_pointer(symbol, style)
+    if ptr is not None:
+        checked = float(ptr.get("checked_at") or 0)
+        if is_market_open():
+            if time.time() - checked < REVALIDATE_AFTER:
+                cache.touch(ptr["key"])
+                return _result(symbol, cache, ptr, cached=True)
+            if cache.try_lock(symbol, style):
+                try:
+                    revalidate(symbol)
+                except Exception:  # noqa: BLE001
+                    cache.unlock(symbol, style)
+            cache.touch(ptr["key"])
+            return _result(symbol, cache, ptr, cached=True, stale=True)
+        if checked >= last_session_close().timestamp():
+            cache.touch(ptr["key"])
+            return _result(symbol, cache, ptr, cached=True)
+
+    ptr, hit = refresh_chart(symbol, cache, style, cfg)
+    return _result(symbol, cache, ptr, cached=hit)
+
+
+def render_run(run_dir: str, symbol: str) -> dict:
+    """Deferred chart of a scanner run, drawn from the run's bars.npy on first request."""
+    from scanner.runs import render_run_chart  # type: ignore
+
+    run_path = str(Path(run_dir).resolve())
+    with _lock_for(_RENDER_LOCKS, f"{run_path}|{symbol}"):
+        path = render_run_chart(run_path, symbol)
+    image64 = base64.b64encode(Path(path).read_bytes()).decode("ascii")
+    return {"symbol": symbol, "path": path, "image": f"data:image/png;base64,{image64}"}
+
+
+def serve(workers: int = 4) -> int:
+    """
+    Resident worker: imports, chart template and price cache stay warm.
+    Requests run concurrently on a thread pool (downloads overlap; rendering
+    is serialised by the plotting lock) and each reply carries the request id.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from scanner.chart_template import template_for  # type: ignore
+
+    # libraries that print must not corrupt the JSON-lines channel
+    out = sys.stdout
+    sys.stdout = sys.stderr
+    out_lock = threading.Lock()
+
+    def reply(obj: dict):
+        line = json.dumps(obj)
+        with out_lock:
+            out.write(line + "\n")
+            out.flush()
+
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="chart")
+    style = style_hash(DARK_CFG)
+
+    def revalidate(symbol: str):
+        cache = ChartCache(CACHE_DIR, CACHE_MAX_BYTES)
+
+        def run():
+            try:
+                refresh_chart(symbol, cache, style)
+            except Exception:  # noqa: BLE001
+                pass
+            finally:
+                cache.unlock(symbol, style)
+
+        pool.submit(run)
+
+    def handle(req: dict):
+        rid = req.get("id")
+        symbol = str(req.get("symbol") or "").strip().upper()
+        if not symbol:
+            reply({"id": rid, "error": "Ticker gerekli"})
+            return
+        try:
+            if req.get("cmd") == "render_run":
+                if not req.get("run_dir"):
+                    raise ValueError("Çalışma klasörü gerekli")
+                result = render_run(str(req["run_dir"]), symbol)
+            else:
+                result = build_chart(symbol, revalidate=revalidate)
+        except Exception as exc:  # noqa: BLE001
+            reply({"id": rid, "error": str(exc)})
+            return
+        result["id"] = rid
+        reply(result)
+
+    template_for(DARK_CFG)
+    reply({"ready": True, "pid": os.getpid()})
     try:
-        dark_cfg = {
-            "options": {
-                "style": {
-                    "base_mpf_style": "nightclouds",
-                },
-                "facecolor": "#0f172a",
-                "edgecolor": "#0f172a",
-            }
-        }
-
-        plot_ticker_stockcharts(df, dark_cfg, str(tmp_dir))
-        file_path = tmp_dir / f"{symbol}.png"
-        if not file_path.exists():
-            raise RuntimeError("Grafik dosyası oluşturulamadı")
-        data = file_path.read_bytes()
-        image64 = base64.b64encode(data).decode("ascii")
-        return {
-            "symbol": symbol,
-            "image": f"data:image/png;base64,{image64}",
-            "generated_at": datetime.now(timezone.utc).isoformat(),
-        }
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                req = json.loads(line)
+            except ValueError:
+                reply({"error": "Geçersiz JSON istek"})
+                continue
+            if req.get("cmd") == "shutdown":
+                break
+            pool.submit(handle, req)
     finally:
-        try:
-            for item in tmp_dir.glob('*'):
-                item.unlink(missing_ok=True)
-            tmp_dir.rmdir()
-        except Exception:
-            pass
+        pool.shutdown(wait=True)
+    return 0
 
 
 def main(argv: list[str]) -> int:
@@ -143,6 +490,22 @@ def main(argv: list[str]) -> int:
         print(json.dumps({"error": "Ticker gerekli"}))
         return 1
 
+    if argv[1] == "--serve":
+        return serve()
+
+    if argv[1] == "--refresh":
+        # background revalidation spawned by build_chart
+        symbol = (argv[2] if len(argv) > 2 else "").strip().upper()
+        cache = ChartCache(CACHE_DIR, CACHE_MAX_BYTES)
+        style = style_hash(DARK_CFG)
+        try:
+            refresh_chart(symbol, cache, style)
+        except Exception:  # noqa: BLE001
+            return 1
+        finally:
+            cache.unlock(symbol, style)
+        return 0
+
     symbol = argv[1].strip().upper()
     try:
         result = build_chart(symbol)
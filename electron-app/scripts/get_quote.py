@@ -1,17 +1,33 @@
 #!/usr/bin/env python3
 
-"""Fetch latest quote data for a ticker symbol via Yahoo Finance or Polygon."""
+"""Fetch latest quote data for a ticker symbol via Yahoo Finance or Polygon.
+
+    get_quote.py SYMBOL [--provider polygon|yahoo]   one quote, JSON on stdout
+    get_quote.py SYM1 SYM2 ... [--batch]             many quotes in as few requests
+        as the provider allows, JSON map {SYMBOL: quote | {"error": ...}}
+    get_quote.py ... --no-cache                      skip the quote cache
+    get_quote.py --serve                             resident service: JSON-lines
+        requests ({"id": ..., "symbol": ..., "provider": ...}, or "symbols": [...]
+        for a batch answered as {"id": ..., "quotes": {...}}) on stdin, one JSON
+        reply per request on stdout, in completion order
+"""
 
 from __future__ import annotations
 
 import argparse
 import datetime as _dt
+import http.client
 import json
 import os
 import sys
+import threading
+import time
 import urllib.error
 import urllib.parse
-import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from market_hours import is_market_open, last_session_close
 
 
 YAHOO_CHART_URL = (
@@ -21,6 +37,12 @@ YAHOO_CHART_URL = (
 POLYGON_AGG_PATH = "/v2/aggs/ticker/{symbol}/range/1/minute/{start}/{end}"
 POLYGON_PREV_PATH = "/v2/aggs/ticker/{symbol}/prev"
 
+# multi-symbol endpoints used by fetch_quotes
+YAHOO_QUOTE_URL = "https://query1.finance.yahoo.com/v7/finance/quote?symbols={symbols}"
+POLYGON_SNAPSHOT_PATH = "/v2/snapshot/locale/us/markets/stocks/tickers"
+# symbols per snapshot/quote request; keeps the query string well under URL limits
+BATCH_CHUNK = 200
+
 DEFAULT_PROVIDER = "polygon"
 PROVIDERS = {"polygon", "yahoo"}
 
@@ -34,23 +56,203 @@ def _iso_from_epoch(epoch: float | None) -> str | None:
         return None
     return dt.isoformat()
 
+HTTP_TIMEOUT = 8
+# idle keep-alive connections kept per host
+POOL_SIZE = 8
+
+
+class _ConnectionPool:
+    """
+    Keep-alive HTTPS connections per host. urllib opens a new TCP+TLS
+    connection for every request; here a connection goes back to the pool
+    after its response has been read and is reused by the next request.
+    """
+
+    def __init__(self, size: int = POOL_SIZE, timeout: float = HTTP_TIMEOUT):
+        self.size = size
+        self.timeout = timeout
+        self._idle: dict[str, list[http.client.HTTPSConnection]] = {}
+        self._lock = threading.Lock()
+
+    def _take(self, host: str) -> tuple[http.client.HTTPSConnection, bool]:
+        with self._lock:
+            idle = self._idle.get(host)
+            if idle:
+                return idle.pop(), True
+        return http.client.HTTPSConnection(host, timeout=self.timeout), False
+
+    def _give(self, host: str, conn: http.client.HTTPSConnection):
+        with self._lock:
+            idle = self._idle.setdefault(host, [])
+            if len(idle) < self.size:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def get(self, url: str, headers: dict[str, str] | None = None) -> bytes:
+        parts = urllib.parse.urlsplit(url)
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+        while True:
+            conn, reused = self._take(parts.netloc)
+            try:
+                conn.request("GET", target, headers=headers or {})
+                response = conn.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError) as exc:
+                conn.close()
+                if reused:
+                    # the server closed an idle connection; retry on a fresh one
+                    continue
+                raise urllib.error.URLError(exc) from exc
+            if response.will_close:
+                conn.close()
+            else:
+                self._give(parts.netloc, conn)
+            if response.status >= 400:
+                raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+            return body
+
+
+_POOL = _ConnectionPool()
+# agg and prev-close lookups run side by side
+_EXECUTOR = ThreadPoolExecutor(max_workers=16, thread_name_prefix="quote")
+# per-symbol batch fallback; separate from _EXECUTOR because fetch_quote_polygon
+# itself waits on _EXECUTOR and would deadlock a saturated shared pool
+_EACH_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="quote-each")
+
+
 def _load_json(url: str, headers: dict[str, str] | None = None) -> dict:
-    request = urllib.request.Request(url, headers=headers or {})
-    with urllib.request.urlopen(request, timeout=8) as response:
-        payload = response.read().decode("utf-8")
+    payload = _POOL.get(url, headers=headers).decode("utf-8")
     return json.loads(payload)
 
 
+# during the regular session a cached quote younger than this is served as is;
+# 0 disables the cache
+QUOTE_CACHE_TTL = float(os.environ.get("QUOTE_CACHE_TTL", "15"))
+# closing auction prints land a little after 16:00; quotes taken inside this
+# window still expire by TTL instead of lasting until the next open
+CLOSE_SETTLE_SECONDS = 300
+QUOTE_CACHE_FILE = Path(
+    os.environ.get("QUOTE_CACHE_FILE")
+    or Path(os.environ.get("WORKBENCH_USER_DATA") or Path(__file__).resolve().parent.parent / ".user-data")
+    / "quote-cache.json"
+)
+
+
+def _quote_fresh(fetched_at: float, ttl: float) -> bool:
+    if ttl <= 0:
+        return False
+    if is_market_open():
+        return time.time() - fetched_at < ttl
+    # nothing trades until the next open once the close has settled
+    if fetched_at >= last_session_close().timestamp() + CLOSE_SETTLE_SECONDS:
+        return True
+    return time.time() - fetched_at < ttl
+
+
+class _QuoteCache:
+    """
+    Quotes keyed by provider and symbol, kept in memory and mirrored to a JSON
+    file so the app's quote server, the headless reporter and one-shot runs
+    share it. The file is re-read when another process has replaced it and
+    merged (not overwritten) on save; errors are never cached.
+    """
+
+    def __init__(self, path: Path, ttl: float = QUOTE_CACHE_TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+        self._entries: dict[str, dict] = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(provider: str, symbol: str) -> str:
+        return f"{provider}:{symbol.strip().upper()}"
+
+    def _stat(self):
+        try:
+            return self.path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _read_file(self) -> dict:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _sync(self):
+        mtime = self._stat()
+        if mtime is not None and mtime != self._mtime:
+            for key, entry in self._read_file().items():
+                mine = self._entries.get(key)
+                if mine is None or entry.get("at", 0) > mine.get("at", 0):
+                    self._entries[key] = entry
+            self._mtime = mtime
+
+    def get(self, provider: str, symbol: str) -> dict | None:
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            self._sync()
+            entry = self._entries.get(self._key(provider, symbol))
+        if not entry or not _quote_fresh(entry.get("at", 0), self.ttl):
+            return None
+        quote = dict(entry["quote"])
+        quote["cached"] = True
+        return quote
+
+    def put_many(self, provider: str, quotes: dict[str, dict]):
+        if self.ttl <= 0:
+            return
+        now = time.time()
+        with self._lock:
+            for symbol, quote in quotes.items():
+                if quote and "error" not in quote:
+                    self._entries[self._key(provider, symbol)] = {"at": now, "quote": dict(quote)}
+            self._save()
+
+    def _save(self):
+        self._sync()
+        self._entries = {
+            key: entry for key, entry in self._entries.items()
+            if _quote_fresh(entry.get("at", 0), self.ttl)
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(self._entries), encoding="utf-8")
+            os.replace(tmp, self.path)
+            self._mtime = self._stat()
+        except OSError:
+            # an unwritable cache only costs the cross-process sharing
+            pass
+
+
+_CACHE = _QuoteCache(QUOTE_CACHE_FILE)
+
+
+YAHOO_HEADERS = {
+    "User-Agent": "Mozilla/5.0",
+    "Accept": "application/json, text/javascript, */*; q=0.01",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Connection": "keep-alive",
+}
+
+
+def _change(price, prev_close) -> tuple[float | None, float | None]:
+    if price is None or prev_close is None:
+        return None, None
+    change = price - prev_close
+    change_pct = (change / prev_close) * 100 if prev_close not in (0, 0.0) else None
+    return change, change_pct
+
+
 def fetch_quote_yahoo(symbol: str) -> dict:
     encoded = urllib.parse.quote(symbol)
     url = YAHOO_CHART_URL.format(symbol=encoded)
-    headers = {
-        "User-Agent": "Mozilla/5.0",
-        "Accept": "application/json, text/javascript, */*; q=0.01",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Connection": "keep-alive",
-    }
-    data = _load_json(url, headers=headers)
+    data = _load_json(url, headers=YAHOO_HEADERS)
     chart = data.get("chart", {})
     error = chart.get("error")
     if error:
@@ -67,13 +269,7 @@ def fetch_quote_yahoo(symbol: str) -> dict:
     currency = meta.get("currency") or "USD"
     symbol_resolved = meta.get("symbol", symbol)
     market_time = meta.get("regularMarketTime")
-
-    change = None
-    change_pct = None
-    if price is not None and prev_close is not None:
-        change = price - prev_close
-        if prev_close not in (0, 0.0):
-            change_pct = (change / prev_close) * 100
+    change, change_pct = _change(price, prev_close)
 
     return {
         "symbol": symbol_resolved,
@@ -110,17 +306,28 @@ def fetch_quote_polygon(symbol: str, *, api_key: str | None = None) -> dict:
     start = (now - _dt.timedelta(days=3)).strftime("%Y-%m-%d")
     end = now.strftime("%Y-%m-%d")
 
-    agg_path = POLYGON_AGG_PATH.format(symbol=encoded, start=start, end=end)
-    agg_data = _polygon_call(
-        agg_path,
+    prev_future = _EXECUTOR.submit(
+        _polygon_call,
+        POLYGON_PREV_PATH.format(symbol=encoded),
         api_key=api_key,
-        params={
-            "adjusted": "true",
-            "sort": "desc",
-            "limit": "120",
-        },
+        params={"adjusted": "true"},
     )
 
+    agg_path = POLYGON_AGG_PATH.format(symbol=encoded, start=start, end=end)
+    try:
+        agg_data = _polygon_call(
+            agg_path,
+            api_key=api_key,
+            params={
+                "adjusted": "true",
+                "sort": "desc",
+                "limit": "120",
+            },
+        )
+    except BaseException:
+        prev_future.cancel()
+        raise
+
     results = agg_data.get("results") or []
     latest = next((row for row in results if row.get("c") is not None), None)
     if not latest:
@@ -129,20 +336,10 @@ def fetch_quote_polygon(symbol: str, *, api_key: str | None = None) -> dict:
     price = latest.get("c")
     timestamp_ns = latest.get("t")
 
-    prev_data = _polygon_call(
-        POLYGON_PREV_PATH.format(symbol=encoded),
-        api_key=api_key,
-        params={"adjusted": "true"},
-    )
+    prev_data = prev_future.result()
     prev_results = prev_data.get("results") or []
     prev_close = prev_results[0].get("c") if prev_results else None
-
-    change = None
-    change_pct = None
-    if price is not None and prev_close is not None:
-        change = price - prev_close
-        if prev_close not in (0, 0.0):
-            change_pct = (change / prev_close) * 100
+    change, change_pct = _change(price, prev_close)
 
     return {
         "symbol": (agg_data.get("ticker") or symbol).upper(),
@@ -179,19 +376,208 @@ def _iso_from_epoch_ns(epoch_ns: float | None) -> str | None:
     return dt.isoformat()
 
 
-def fetch_quote(symbol: str, *, provider: str = DEFAULT_PROVIDER, api_key: str | None = None) -> dict:
+def fetch_quote(
+    symbol: str,
+    *,
+    provider: str = DEFAULT_PROVIDER,
+    api_key: str | None = None,
+    use_cache: bool = True,
+) -> dict:
     provider_normalized = (provider or DEFAULT_PROVIDER).lower()
     if provider_normalized not in PROVIDERS:
         raise ValueError(f"Desteklenmeyen sağlayıcı: {provider}")
 
+    if use_cache:
+        cached = _CACHE.get(provider_normalized, symbol)
+        if cached is not None:
+            return cached
+
     if provider_normalized == "yahoo":
-        return fetch_quote_yahoo(symbol)
-    return fetch_quote_polygon(symbol, api_key=api_key)
+        quote = fetch_quote_yahoo(symbol)
+    else:
+        quote = fetch_quote_polygon(symbol, api_key=api_key)
+    if use_cache:
+        _CACHE.put_many(provider_normalized, {symbol: quote})
+    return quote
+
+
+def _chunks(symbols: list[str]):
+    for i in range(0, len(symbols), BATCH_CHUNK):
+        yield symbols[i:i + BATCH_CHUNK]
+
+
+def _fetch_each(symbols: list[str], fetch) -> dict[str, dict]:
+    """Per-symbol fallback, run concurrently over the pooled connections."""
+    futures = {symbol: _EACH_EXECUTOR.submit(fetch, symbol) for symbol in symbols}
+    quotes = {}
+    for symbol, future in futures.items():
+        try:
+            quotes[symbol] = future.result()
+        except Exception as exc:  # noqa: BLE001
+            quotes[symbol] = {"error": _error_message(exc)}
+    return quotes
+
+
+def _yahoo_quote_row(row: dict, fetched_at: str) -> dict:
+    price = row.get("regularMarketPrice")
+    prev_close = row.get("regularMarketPreviousClose")
+    change, change_pct = _change(price, prev_close)
+    return {
+        "symbol": row.get("symbol"),
+        "price": price,
+        "currency": row.get("currency") or "USD",
+        "source": "Yahoo Finance",
+        "change": change,
+        "change_percent": change_pct,
+        "prev_close": prev_close,
+        "as_of": _iso_from_epoch(row.get("regularMarketTime")),
+        "fetched_at": fetched_at,
+    }
+
+
+def fetch_quotes_yahoo(symbols: list[str]) -> dict[str, dict]:
+    """
+    One v7 quote request per BATCH_CHUNK symbols. Yahoo answers that endpoint
+    with 401 when it wants a cookie/crumb; the chunk then falls back to the
+    per-symbol chart endpoint.
+    """
+    quotes: dict[str, dict] = {}
+    for chunk in _chunks(symbols):
+        url = YAHOO_QUOTE_URL.format(symbols=urllib.parse.quote(",".join(chunk), safe=","))
+        try:
+            data = _load_json(url, headers=YAHOO_HEADERS)
+            rows = (data.get("quoteResponse") or {}).get("result")
+            if rows is None:
+                raise ValueError("Sonuç bulunamadı")
+        except (urllib.error.URLError, ValueError):
+            quotes.update(_fetch_each(chunk, fetch_quote_yahoo))
+            continue
+        fetched_at = _dt.datetime.now(tz=_dt.timezone.utc).isoformat()
+        by_symbol = {str(row.get("symbol") or "").upper(): row for row in rows}
+        for symbol in chunk:
+            row = by_symbol.get(symbol)
+            if row is None or row.get("regularMarketPrice") is None:
+                quotes[symbol] = {"error": "Sonuç bulunamadı"}
+            else:
+                quotes[symbol] = _yahoo_quote_row(row, fetched_at)
+    return quotes
+
+
+def _polygon_snapshot_row(row: dict, fetched_at: str) -> dict:
+    last_trade = row.get("lastTrade") or {}
+    minute = row.get("min") or {}
+    day = row.get("day") or {}
+    prev_day = row.get("prevDay") or {}
+    # outside the session lastTrade/min are empty and day is zeroed
+    price = last_trade.get("p") or minute.get("c") or day.get("c") or prev_day.get("c")
+    prev_close = prev_day.get("c") or None
+    change, change_pct = _change(price, prev_close)
+    return {
+        "symbol": str(row.get("ticker") or "").upper(),
+        "price": price,
+        "currency": "USD",
+        "source": "Polygon.io",
+        "change": change,
+        "change_percent": change_pct,
+        "prev_close": prev_close,
+        "as_of": _iso_from_epoch_ns(last_trade.get("t") or minute.get("t") or row.get("updated")),
+        "fetched_at": fetched_at,
+    }
+
+
+def fetch_quotes_polygon(symbols: list[str], *, api_key: str | None = None) -> dict[str, dict]:
+    """
+    Multi-ticker snapshot: one request per BATCH_CHUNK symbols instead of two
+    per symbol. Plans without snapshot access get 403/NOT_AUTHORIZED; those
+    fall back to fetch_quote_polygon per symbol.
+    """
+    api_key = api_key or os.getenv("POLYGON_API_KEY") or os.getenv("POLYGON_KEY")
+    if not api_key:
+        raise ValueError("Polygon API anahtarı bulunamadı")
+
+    quotes: dict[str, dict] = {}
+    for chunk in _chunks(symbols):
+        try:
+            data = _polygon_call(POLYGON_SNAPSHOT_PATH, api_key=api_key, params={"tickers": ",".join(chunk)})
+        except urllib.error.HTTPError as exc:
+            if exc.code not in (401, 403):
+                raise
+            data = None
+        except ValueError:
+            data = None
+        if data is None or (data.get("status") or "").upper() == "NOT_AUTHORIZED":
+            quotes.update(_fetch_each(chunk, lambda s: fetch_quote_polygon(s, api_key=api_key)))
+            continue
+        fetched_at = _dt.datetime.now(tz=_dt.timezone.utc).isoformat()
+        by_symbol = {str(row.get("ticker") or "").upper(): row for row in data.get("tickers") or []}
+        for symbol in chunk:
+            row = by_symbol.get(symbol)
+            quote = _polygon_snapshot_row(row, fetched_at) if row else None
+            if quote is None or quote["price"] is None:
+                quotes[symbol] = {"error": "Sonuç bulunamadı"}
+            else:
+                quotes[symbol] = quote
+    return quotes
+
+
+def fetch_quotes(
+    symbols: list[str],
+    *,
+    provider: str = DEFAULT_PROVIDER,
+    api_key: str | None = None,
+    use_cache: bool = True,
+) -> dict[str, dict]:
+    """
+    Quotes for many symbols keyed by the (upper-cased) requested symbol. A
+    symbol that could not be resolved maps to {"error": ...}; errors that
+    affect the whole batch (bad provider, missing key) raise. Only symbols
+    missing from the cache go to the provider.
+    """
+    provider_normalized = (provider or DEFAULT_PROVIDER).lower()
+    if provider_normalized not in PROVIDERS:
+        raise ValueError(f"Desteklenmeyen sağlayıcı: {provider}")
+
+    wanted = list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+    if not wanted:
+        return {}
+
+    quotes: dict[str, dict] = {}
+    if use_cache:
+        for symbol in wanted:
+            cached = _CACHE.get(provider_normalized, symbol)
+            if cached is not None:
+                quotes[symbol] = cached
+    missing = [symbol for symbol in wanted if symbol not in quotes]
+    if missing:
+        if provider_normalized == "yahoo":
+            fetched = fetch_quotes_yahoo(missing)
+        else:
+            fetched = fetch_quotes_polygon(missing, api_key=api_key)
+        if use_cache:
+            _CACHE.put_many(provider_normalized, fetched)
+        quotes.update(fetched)
+    return {symbol: quotes[symbol] for symbol in wanted}
 
 
 def _parse_args(argv: list[str]) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Get latest quote for a ticker")
-    parser.add_argument("symbol", help="Ticker sembolü")
+    parser.add_argument("symbols", nargs="*", help="Ticker sembolü (birden fazla verilirse toplu sorgu)")
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Tek sembolde de sembol -> fiyat JSON haritası yazdır",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Stdin/stdout üzerinden JSON-lines isteklerine yanıt veren kalıcı servis",
+    )
+    parser.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help="Önbelleği atla, fiyatı sağlayıcıdan al",
+    )
     parser.add_argument(
         "--provider",
         choices=sorted(PROVIDERS),
@@ -207,6 +593,99 @@ def _parse_args(argv: list[str]) -> argparse.Namespace:
     return parser.parse_args(argv[1:])
 
 
+def _error_message(exc: Exception) -> str:
+    if isinstance(exc, urllib.error.HTTPError):
+        return f"HTTP hata {exc.code}"
+    if isinstance(exc, urllib.error.URLError):
+        return str(getattr(exc, "reason", exc))
+    if isinstance(exc, ValueError):
+        return str(exc)
+    return f"Beklenmeyen hata: {exc}"
+
+
+def serve(default_provider: str, api_key: str | None = None, use_cache: bool = True) -> int:
+    """Resident quote service; connections and cached quotes persist across requests."""
+    out_lock = threading.Lock()
+
+    def reply(obj: dict):
+        line = json.dumps(obj)
+        with out_lock:
+            sys.stdout.write(line + "\n")
+            sys.stdout.flush()
+
+    def handle(req: dict):
+        rid = req.get("id")
+        if req.get("cmd") == "evaluate_stops":
+            # the reporter's per-cycle stop check runs here, on the warm
+            # connections and quote cache, instead of in a fresh process
+            if not req.get("db"):
+                reply({"id": rid, "error": "Veritabanı yolu gerekli"})
+                return
+            try:
+                from evaluate_stops import DEFAULT_DEDUP_MINUTES, run_evaluation
+
+                result = run_evaluation(
+                    Path(str(req["db"])),
+                    provider=req.get("provider") or default_provider,
+                    api_key=api_key,
+                    dedup_minutes=float(req.get("dedup_minutes") or DEFAULT_DEDUP_MINUTES),
+                    use_cache=use_cache,
+                )
+            except Exception as exc:  # noqa: BLE001
+                reply({"id": rid, "error": _error_message(exc)})
+                return
+            reply({"id": rid, **result})
+            return
+        if "symbols" in req:
+            try:
+                quotes = fetch_quotes(
+                    [str(s) for s in req.get("symbols") or []],
+                    provider=req.get("provider") or default_provider,
+                    api_key=api_key,
+                    use_cache=use_cache,
+                )
+            except Exception as exc:  # noqa: BLE001
+                reply({"id": rid, "error": _error_message(exc)})
+                return
+            reply({"id": rid, "quotes": quotes})
+            return
+        symbol = str(req.get("symbol") or "").strip().upper()
+        if not symbol:
+            reply({"id": rid, "error": "Ticker gerekli"})
+            return
+        try:
+            quote = fetch_quote(
+                symbol,
+                provider=req.get("provider") or default_provider,
+                api_key=api_key,
+                use_cache=use_cache,
+            )
+        except Exception as exc:  # noqa: BLE001
+            reply({"id": rid, "error": _error_message(exc)})
+            return
+        quote["id"] = rid
+        reply(quote)
+
+    workers = ThreadPoolExecutor(max_workers=8, thread_name_prefix="serve")
+    reply({"ready": True, "pid": os.getpid()})
+    try:
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                req = json.loads(line)
+            except ValueError:
+                reply({"error": "Geçersiz JSON istek"})
+                continue
+            if req.get("cmd") == "shutdown":
+                break
+            workers.submit(handle, req)
+    finally:
+        workers.shutdown(wait=True)
+    return 0
+
+
 def main(argv: list[str]) -> int:
     try:
         args = _parse_args(argv)
@@ -214,26 +693,30 @@ def main(argv: list[str]) -> int:
         # argparse already printed error/help
         return 1
 
-    symbol = args.symbol.strip().upper()
-    if not symbol:
+    if args.serve:
+        return serve(args.provider, api_key=args.api_key, use_cache=args.use_cache)
+
+    symbols = [s.strip().upper() for s in args.symbols if s.strip()]
+    if not symbols:
         print(json.dumps({"error": "Ticker gerekli"}))
         return 1
 
+    if args.batch or len(symbols) > 1:
+        try:
+            quotes = fetch_quotes(symbols, provider=args.provider, api_key=args.api_key, use_cache=args.use_cache)
+        except Exception as exc:  # noqa: BLE001
+            print(json.dumps({"error": _error_message(exc)}))
+            return 1
+        # per-symbol errors are part of the map, not a failed run
+        print(json.dumps(quotes))
+        return 0
+
+    symbol = symbols[0]
+
     try:
-        quote = fetch_quote(symbol, provider=args.provider, api_key=args.api_key)
-    except urllib.error.HTTPError as exc:
-        message = f"HTTP hata {exc.code}"
-        print(json.dumps({"error": message}))
-        return 1
-    except urllib.error.URLError as exc:
-        message = getattr(exc, "reason", exc)
-        print(json.dumps({"error": str(message)}))
-        return 1
-    except ValueError as exc:
-        print(json.dumps({"error": str(exc)}))
-        return 1
+        quote = fetch_quote(symbol, provider=args.provider, api_key=args.api_key, use_cache=args.use_cache)
     except Exception as exc:  # noqa: BLE001
-        print(json.dumps({"error": f"Beklenmeyen hata: {exc}"}))
+        print(json.dumps({"error": _error_message(exc)}))
         return 1
 
     print(json.dumps(quote))
@@ -241,4 +724,7 @@ def main(argv: list[str]) -> int:
 
 
 if __name__ == "__main__":
+    # evaluate_stops imports get_quote; let it share this module (executors,
+    # pooled connections, quote cache) instead of loading a second copy
+    sys.modules.setdefault("get_quote", sys.modules[__name__])
     sys.exit(main(sys.argv))
@@ -0,0 +1,43 @@
+"""US equity regular session helpers (NYSE/Nasdaq, 09:30-16:00 America/New_York).
+
+Exchange holidays and half days are not modelled; on those days the session is
+treated as open, which only makes the caches above it refresh more eagerly.
+"""
+
+from __future__ import annotations
+
+import datetime as _dt
+
+try:
+    from zoneinfo import ZoneInfo
+
+    NEW_YORK = ZoneInfo("America/New_York")
+except Exception:  # noqa: BLE001 - no tzdata; fall back to fixed EST
+    NEW_YORK = _dt.timezone(_dt.timedelta(hours=-5), "EST")
+
+SESSION_OPEN = _dt.time(9, 30)
+SESSION_CLOSE = _dt.time(16, 0)
+
+
+def _now_ny(now: _dt.datetime | None = None) -> _dt.datetime:
+    now = now or _dt.datetime.now(_dt.timezone.utc)
+    if now.tzinfo is None:
+        now = now.replace(tzinfo=_dt.timezone.utc)
+    return now.astimezone(NEW_YORK)
+
+
+def is_market_open(now: _dt.datetime | None = None) -> bool:
+    ny = _now_ny(now)
+    return ny.weekday() < 5 and SESSION_OPEN <= ny.time() < SESSION_CLOSE
+
+
+def last_session_close(now: _dt.datetime | None = None) -> _dt.datetime:
+    """Most recent regular-session close at or before `now` (UTC-aware)."""
+    ny = _now_ny(now)
+    day = ny.date()
+    if ny.time() < SESSION_CLOSE:
+        day -= _dt.timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= _dt.timedelta(days=1)
+    close = _dt.datetime.combine(day, SESSION_CLOSE, tzinfo=NEW_YORK)
+    return close.astimezone(_dt.timezone.utc)
@@ -4,6 +4,7 @@ const fs = require('fs');
 const path = require('path');
 const storage = require('../src/storage');
 const { initReporter, rescheduleReporter } = require('../src/reporter');
+const { PythonLineServer } = require('../src/pythonServer');
 
 // Resolve important paths
 const repoRoot = path.resolve(__dirname, '..', '..');
@@ -95,6 +96,15 @@ async function runPythonJson(scriptPath, args = [], options = {}) {
   }
 }
 
+// one warm get_quote.py --serve process instead of a spawn per symbol
+const quoteServer = new PythonLineServer({
+  name: 'Fiyat sunucusu',
+  script: path.resolve(scriptsDir, 'get_quote.py'),
+  args: ['--serve'],
+  pythonBin: defaultPythonBin,
+  timeoutMs: 30000,
+});
+
 async function runQuoteFetcher(symbol, options = {}) {
   if (!symbol || !symbol.trim()) {
     throw new Error('Ticker gerekli');
@@ -105,9 +115,19 @@ async function runQuoteFetcher(symbol, options = {}) {
   const candidate = (overrideProvider || storedProvider || 'polygon').toLowerCase();
   const providers = ['polygon', 'yahoo'];
   const provider = providers.includes(candidate) ? candidate : storedProvider;
-  const args = [symbol.trim(), '--provider', provider];
-  const mergedEnv = { ...(runnerOptions.env || {}), QUOTE_PROVIDER: provider };
-  const data = await runPythonJson(script, args, { ...runnerOptions, env: mergedEnv });
+  let data;
+  try {
+    data = await quoteServer.request({ symbol: symbol.trim(), provider });
+  } catch (err) {
+    if (quoteServer.running) {
+      throw err;
+    }
+  }
+  if (!data) {
+    const args = [symbol.trim(), '--provider', provider];
+    const mergedEnv = { ...(runnerOptions.env || {}), QUOTE_PROVIDER: provider };
+    data = await runPythonJson(script, args, { ...runnerOptions, env: mergedEnv });
+  }
   if (data && data.error) {
     throw new Error(data.error);
   }
@@ -115,6 +135,66 @@ async function runQuoteFetcher(symbol, options = {}) {
   return data;
 }
 
+// all holdings in one request: {SYMBOL: quote | {error}}
+async function runQuoteBatch(symbols, options = {}) {
+  const wanted = Array.from(new Set((symbols || [])
+    .map((symbol) => String(symbol || '').trim().toUpperCase())
+    .filter(Boolean)));
+  if (!wanted.length) return {};
+  const script = path.resolve(scriptsDir, 'get_quote.py');
+  const { provider: overrideProvider, ...runnerOptions } = options;
+  const storedProvider = storage.getQuoteProvider();
+  const candidate = (overrideProvider || storedProvider || 'polygon').toLowerCase();
+  const providers = ['polygon', 'yahoo'];
+  const provider = providers.includes(candidate) ? candidate : storedProvider;
+  let data;
+  try {
+    data = await quoteServer.request({ symbols: wanted, provider });
+  } catch (err) {
+    if (quoteServer.running) {
+      throw err;
+    }
+  }
+  if (!data) {
+    const args = [...wanted, '--batch', '--provider', provider];
+    const mergedEnv = { ...(runnerOptions.env || {}), QUOTE_PROVIDER: provider };
+    data = await runPythonJson(script, args, { ...runnerOptions, env: mergedEnv });
+  }
+  if (data && data.error) {
+    throw new Error(data.error);
+  }
+  const quotes = (data && data.quotes) || data || {};
+  Object.values(quotes).forEach((quote) => {
+    if (quote && !quote.error) quote.provider = provider;
+  });
+  return quotes;
+}
+
+// whole-portfolio stop-loss / 1R check in one pass on the warm quote server
+async function runStopEvaluator() {
+  const candidate = (storage.getQuoteProvider() || 'polygon').toLowerCase();
+  const provider = ['polygon', 'yahoo'].includes(candidate) ? candidate : 'polygon';
+  const dbPath = storage.getDbPath();
+  let data;
+  try {
+    data = await quoteServer.request({ cmd: 'evaluate_stops', db: dbPath, provider });
+  } catch (err) {
+    if (quoteServer.running) {
+      throw err;
+    }
+  }
+  if (!data) {
+    const script = path.resolve(scriptsDir, 'evaluate_stops.py');
+    data = await runPythonJson(script, ['--db', dbPath, '--provider', provider], {
+      env: { QUOTE_PROVIDER: provider },
+    });
+  }
+  if (data && data.error) {
+    throw new Error(data.error);
+  }
+  return data;
+}
+
 function toBool(val, def = false) {
   if (val === undefined || val === null || val === '') return def;
   const v = String(val).trim().toLowerCase();
@@ -177,7 +257,7 @@ async function main() {
   await configureFromEnv();
 
   // Start reporter
-  initReporter({ fetchQuote: runQuoteFetcher });
+  initReporter({ fetchQuote: runQuoteFetcher, fetchQuotes: runQuoteBatch, evaluateStops: runStopEvaluator });
   rescheduleReporter();
 
   const settings = storage.getReporterSettings();
@@ -195,6 +275,7 @@ async function main() {
   const shutdown = (signal) => {
     console.log(`[headless] Kapanıyor (${signal})`);
     clearInterval(tick);
+    quoteServer.stop();
     process.exit(0);
   };
 
@@ -9,6 +9,7 @@ const fs = require('fs');
 const yaml = require('js-yaml');
 const storage = require('./storage');
 const { initReporter, rescheduleReporter } = require('./reporter');
+const { PythonLineServer } = require('./pythonServer');
 const nodemailer = require('nodemailer');
 
 const jobs = new Map();
@@ -41,6 +42,7 @@ const toolPaths = {
   scanner: path.resolve(scannerDir, 'scanner.py'),
   quoteFetcher: path.resolve(scriptsDir, 'get_quote.py'),
   chartGenerator: path.resolve(scriptsDir, 'generate_chart.py'),
+  stopEvaluator: path.resolve(scriptsDir, 'evaluate_stops.py'),
   filters: filtersPath,
 };
 
@@ -141,7 +143,10 @@ function createWindow() {
 app.whenReady().then(async () => {
   await storage.initStorage(app);
   createWindow();
-  initReporter({ fetchQuote: runQuoteFetcher });
+  initReporter({ fetchQuote: runQuoteFetcher, fetchQuotes: runQuoteBatch, evaluateStops: runStopEvaluator });
+  // warm the resident servers at launch; a failure is retried on the first request
+  chartServer.start().catch(() => {});
+  quoteServer.start().catch(() => {});
 
   app.on('activate', () => {
     if (BrowserWindow.getAllWindows().length === 0) {
@@ -150,6 +155,11 @@ app.whenReady().then(async () => {
   });
 });
 
+app.on('will-quit', () => {
+  chartServer.stop();
+  quoteServer.stop();
+});
+
 app.on('window-all-closed', () => {
   if (process.platform !== 'darwin') {
     app.quit();
@@ -217,18 +227,54 @@ async function runPythonJson(scriptPath, args = [], options = {}) {
   }
 }
 
+const chartServer = new PythonLineServer({
+  name: 'Grafik sunucusu',
+  script: toolPaths.chartGenerator,
+  args: ['--serve'],
+  pythonBin: defaultPythonBin,
+});
+
+const quoteServer = new PythonLineServer({
+  name: 'Fiyat sunucusu',
+  script: toolPaths.quoteFetcher,
+  args: ['--serve'],
+  pythonBin: defaultPythonBin,
+  timeoutMs: 30000,
+});
+
+function resolveQuoteProvider(overrideProvider) {
+  const storedProvider = storage.getQuoteProvider();
+  const candidate = (overrideProvider || storedProvider || 'polygon').toLowerCase();
+  return QUOTE_PROVIDERS.includes(candidate) ? candidate : storedProvider;
+}
+
+// Sends `payload` to the resident quote server unless the caller asked for a
+// custom interpreter/env; falls back to a one-shot get_quote.py run with `args`
+// when the server cannot be started.
+async function requestQuotes(payload, args, provider, runnerOptions) {
+  const customRun = (runnerOptions.pythonPath && runnerOptions.pythonPath.trim())
+    || Object.keys(runnerOptions.env || {}).length > 0;
+  if (!customRun) {
+    try {
+      return await quoteServer.request({ ...payload, provider });
+    } catch (err) {
+      if (quoteServer.running) {
+        throw err;
+      }
+      // server could not start; fall back to a one-shot process
+    }
+  }
+  const mergedEnv = { ...(runnerOptions.env || {}), QUOTE_PROVIDER: provider };
+  return runPythonJson(toolPaths.quoteFetcher, [...args, '--provider', provider], { ...runnerOptions, env: mergedEnv });
+}
+
 async function runQuoteFetcher(symbol, options = {}) {
   if (!symbol || !symbol.trim()) {
     throw new Error('Ticker gerekli');
   }
-  const script = toolPaths.quoteFetcher;
   const { provider: overrideProvider, ...runnerOptions } = options;
-  const storedProvider = storage.getQuoteProvider();
-  const candidate = (overrideProvider || storedProvider || 'polygon').toLowerCase();
-  const provider = QUOTE_PROVIDERS.includes(candidate) ? candidate : storedProvider;
-  const args = [symbol.trim(), '--provider', provider];
-  const mergedEnv = { ...(runnerOptions.env || {}), QUOTE_PROVIDER: provider };
-  const data = await runPythonJson(script, args, { ...runnerOptions, env: mergedEnv });
+  const provider = resolveQuoteProvider(overrideProvider);
+  const data = await requestQuotes({ symbol: symbol.trim() }, [symbol.trim()], provider, runnerOptions);
   if (data && data.error) {
     throw new Error(data.error);
   }
@@ -238,6 +284,56 @@ async function runQuoteFetcher(symbol, options = {}) {
   return data;
 }
 
+// Quotes for many symbols in one round-trip: `{SYMBOL: quote | {error}}`.
+// Per-symbol failures stay in the map; only batch-wide errors throw.
+async function runQuoteBatch(symbols, options = {}) {
+  const wanted = Array.from(new Set((symbols || [])
+    .map((symbol) => String(symbol || '').trim().toUpperCase())
+    .filter(Boolean)));
+  if (!wanted.length) {
+    return {};
+  }
+  const { provider: overrideProvider, ...runnerOptions } = options;
+  const provider = resolveQuoteProvider(overrideProvider);
+  const data = await requestQuotes({ symbols: wanted }, [...wanted, '--batch'], provider, runnerOptions);
+  if (data && data.error) {
+    throw new Error(data.error);
+  }
+  // the server wraps the map in `quotes`; the one-shot CLI prints it bare
+  const quotes = (data && data.quotes) || data || {};
+  Object.values(quotes).forEach((quote) => {
+    if (quote && !quote.error) {
+      quote.provider = provider;
+    }
+  });
+  return quotes;
+}
+
+// Whole-portfolio stop-loss / 1R check in one Python pass, answered by the
+// resident quote server (warm connections and quote cache); a one-shot
+// evaluate_stops.py run is only the fallback when the server cannot start
+async function runStopEvaluator() {
+  const provider = resolveQuoteProvider();
+  const dbPath = storage.getDbPath();
+  let data;
+  try {
+    data = await quoteServer.request({ cmd: 'evaluate_stops', db: dbPath, provider });
+  } catch (err) {
+    if (quoteServer.running) {
+      throw err;
+    }
+  }
+  if (!data) {
+    data = await runPythonJson(toolPaths.stopEvaluator, ['--db', dbPath, '--provider', provider], {
+      env: { QUOTE_PROVIDER: provider },
+    });
+  }
+  if (data && data.error) {
+    throw new Error(data.error);
+  }
+  return data;
+}
+
 function parseNumber(value) {
   if (value === null || value === undefined || value === '') return null;
   const num = Number(value);
@@ -361,6 +457,11 @@ ipcMain.handle('quotes:get', async (_event, payload) => {
   return runQuoteFetcher(symbol, { provider, pythonPath, env });
 });
 
+ipcMain.handle('quotes:get-many', async (_event, payload) => {
+  const { symbols, provider, pythonPath, env = {} } = payload || {};
+  return runQuoteBatch(symbols, { provider, pythonPath, env });
+});
+
 ipcMain.handle('quotes:set-provider', (_event, payload) => {
   const provider = payload && payload.provider;
   return {
@@ -396,6 +497,15 @@ ipcMain.handle('portfolio:load', () => {
   return storage.getPortfolioSnapshot();
 });
 
+// NAV / P&L / drawdown / beta over the whole ledger, one scanner job
+ipcMain.handle('portfolio:analytics', async () => {
+  const data = await runPythonJson(toolPaths.scanner, ['--portfolio', storage.getDbPath(), '--quiet']);
+  if (data && data.error) {
+    throw new Error(data.error);
+  }
+  return data;
+});
+
 ipcMain.handle('portfolio:bought', async (_event, payload) => {
   const { symbol, mode, shares, totalAmount, avgPrice, currency, buyDate, stopLoss } = payload || {};
   const symbolSafe = (symbol || '').trim().toUpperCase();
@@ -572,9 +682,74 @@ ipcMain.handle('chart:generate', async (_event, payload) => {
   if (!symbolSafe) {
     throw new Error('Ticker gerekli');
   }
-  const data = await runPythonJson(toolPaths.chartGenerator, [symbolSafe]);
+  let data;
+  try {
+    data = await chartServer.request({ symbol: symbolSafe });
+  } catch (err) {
+    if (chartServer.running) {
+      throw err;
+    }
+    // server could not start; fall back to a one-shot process
+    data = await runPythonJson(toolPaths.chartGenerator, [symbolSafe]);
+  }
   if (!data || !data.image) {
     throw new Error('Grafik üretilemedi');
   }
   return data;
 });
+
+ipcMain.handle('chart:run-list', async (_event, payload) => {
+  const { runDir } = payload || {};
+  if (!runDir) {
+    throw new Error('Çalışma klasörü gerekli');
+  }
+  const runPath = path.resolve(scannerDir, runDir);
+  const manifestPath = path.join(runPath, 'charts.json');
+  if (!fs.existsSync(manifestPath)) {
+    throw new Error('Bu çalışmada ertelenmiş grafik yok (charts.json bulunamadı)');
+  }
+  const manifest = JSON.parse(fs.readFileSync(manifestPath, 'utf8'));
+  const tickers = Object.entries(manifest.tickers || {}).map(([symbol, entry]) => ({
+    symbol,
+    passes: Boolean(entry.passes),
+    failReason: entry.fail_reason || '',
+    rendered: fs.existsSync(path.join(runPath, entry.chart)),
+  }));
+  return { runDir: runPath, tickers };
+});
+
+ipcMain.handle('chart:render-run', async (_event, payload) => {
+  const { runDir, symbol, pythonPath } = payload || {};
+  const symbolSafe = (symbol || '').trim().toUpperCase();
+  if (!runDir || !symbolSafe) {
+    throw new Error('Çalışma klasörü ve ticker gerekli');
+  }
+  const runPath = path.resolve(scannerDir, runDir);
+  // the resident chart worker draws from the run's bar snapshot without a
+  // process start; a one-shot scanner run is only the fallback
+  if (!(pythonPath && pythonPath.trim())) {
+    try {
+      const data = await chartServer.request({ cmd: 'render_run', run_dir: runPath, symbol: symbolSafe });
+      if (data && data.image) {
+        return { symbol: symbolSafe, path: data.path, image: data.image };
+      }
+    } catch (err) {
+      if (chartServer.running) {
+        throw err;
+      }
+    }
+  }
+  const data = await runPythonJson(toolPaths.scanner, ['--render', runPath, symbolSafe], {
+    cwd: scannerDir,
+    pythonPath,
+  });
+  if (!data || !data.path || !fs.existsSync(data.path)) {
+    throw new Error((data && data.error) || 'Grafik üretilemedi');
+  }
+  const image64 = fs.readFileSync(data.path).toString('base64');
+  return {
+    symbol: symbolSafe,
+    path: data.path,
+    image: `data:image/png;base64,${image64}`,
+  };
+});
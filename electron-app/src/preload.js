@@ -6,15 +6,19 @@ contextBridge.exposeInMainWorld('pythonBridge', {
   stop: (jobId) => ipcRenderer.invoke('python:stop', jobId),
   listJobs: () => ipcRenderer.invoke('python:list-jobs'),
   fetchQuote: (symbol) => ipcRenderer.invoke('quotes:get', { symbol }),
+  fetchQuotes: (symbols) => ipcRenderer.invoke('quotes:get-many', { symbols }),
   setQuoteProvider: (provider) => ipcRenderer.invoke('quotes:set-provider', { provider }),
   loadFilters: () => ipcRenderer.invoke('filters:load'),
   prepareFilters: (config) => ipcRenderer.invoke('filters:prepare', config),
   saveFilters: (config) => ipcRenderer.invoke('filters:save', config),
   loadPortfolio: () => ipcRenderer.invoke('portfolio:load'),
+  portfolioAnalytics: () => ipcRenderer.invoke('portfolio:analytics'),
   saveHolding: (payload) => ipcRenderer.invoke('portfolio:bought', payload),
   updateHolding: (payload) => ipcRenderer.invoke('portfolio:update', payload),
   sellHolding: (payload) => ipcRenderer.invoke('portfolio:sell', payload),
   generateChart: (symbol) => ipcRenderer.invoke('chart:generate', { symbol }),
+  listRunCharts: (runDir) => ipcRenderer.invoke('chart:run-list', { runDir }),
+  renderRunChart: (runDir, symbol) => ipcRenderer.invoke('chart:render-run', { runDir, symbol }),
   getReporterSettings: () => ipcRenderer.invoke('reporter:get-settings'),
   saveReporterSettings: (config) => ipcRenderer.invoke('reporter:save-settings', config),
   sendReporterTestEmail: () => ipcRenderer.invoke('reporter:send-test'),
@@ -0,0 +1,177 @@
+const path = require('path');
+const fs = require('fs');
+const { spawn } = require('child_process');
+
+const DEFAULT_TIMEOUT_MS = 60000;
+// first start may install missing Python packages (generate_chart.py)
+const DEFAULT_START_TIMEOUT_MS = 120000;
+
+// Resident Python worker speaking JSON lines over stdio: `{id, ...}` in,
+// `{id, ...}` or `{id, error}` out, plus a `{ready: true}` line at startup.
+// The process is started on first use and restarted after it dies. A child
+// that never reports ready, or lets a request time out, is killed so that
+// `running` turns false and callers fall back to one-shot processes.
+class PythonLineServer {
+  constructor({
+    name, script, args = [], pythonBin, timeoutMs = DEFAULT_TIMEOUT_MS, startTimeoutMs = DEFAULT_START_TIMEOUT_MS,
+  }) {
+    this.name = name;
+    this.script = script;
+    this.args = args;
+    this.pythonBin = pythonBin;
+    this.timeoutMs = timeoutMs;
+    this.startTimeoutMs = startTimeoutMs;
+    this.child = null;
+    this.ready = null;
+    this.pending = new Map();
+    this.seq = 0;
+  }
+
+  get running() {
+    return this.child !== null;
+  }
+
+  start() {
+    if (this.ready) {
+      return this.ready;
+    }
+    if (!fs.existsSync(this.script)) {
+      return Promise.reject(new Error(`Python script bulunamadı: ${this.script}`));
+    }
+    const child = spawn(this.pythonBin, [this.script, ...this.args], {
+      cwd: path.dirname(this.script),
+      env: { ...process.env },
+    });
+    this.child = child;
+    child.stdin.on('error', () => {
+      // EPIPE after the process died; 'close' rejects the pending requests
+    });
+    this.ready = new Promise((resolve, reject) => {
+      let buffer = '';
+      let stderr = '';
+      let started = false;
+      const startTimer = setTimeout(() => {
+        if (started) return;
+        const message = `${this.name} başlatılamadı (zaman aşımı)`;
+        this.abort(child, message);
+        reject(new Error(message));
+      }, this.startTimeoutMs);
+
+      child.stdout.on('data', (chunk) => {
+        buffer += chunk.toString();
+        let idx = buffer.indexOf('\n');
+        while (idx >= 0) {
+          const line = buffer.slice(0, idx).trim();
+          buffer = buffer.slice(idx + 1);
+          idx = buffer.indexOf('\n');
+          if (!line) continue;
+          let msg;
+          try {
+            msg = JSON.parse(line);
+          } catch (err) {
+            continue;
+          }
+          if (msg.ready) {
+            started = true;
+            clearTimeout(startTimer);
+            resolve(child);
+            continue;
+          }
+          this.settle(msg);
+        }
+      });
+
+      child.stderr.on('data', (chunk) => {
+        stderr = (stderr + chunk.toString()).slice(-4000);
+      });
+
+      child.on('error', (err) => {
+        clearTimeout(startTimer);
+        this.detach(child);
+        this.failAll(child, err.message);
+        reject(err);
+      });
+
+      child.on('close', (code) => {
+        clearTimeout(startTimer);
+        this.detach(child);
+        const message = stderr.trim() || `${this.name} ${code} kodu ile kapandı`;
+        this.failAll(child, message);
+        if (!started) {
+          reject(new Error(message));
+        }
+      });
+    });
+    return this.ready;
+  }
+
+  async request(payload) {
+    const child = await this.start();
+    const id = ++this.seq;
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        const message = `${this.name} isteği zaman aşımına uğradı`;
+        // a hung worker would time out every later request too; kill it first
+        // so the caller sees running === false and uses its fallback
+        this.abort(child, message);
+        reject(new Error(message));
+      }, this.timeoutMs);
+      this.pending.set(id, { resolve, reject, timer, child });
+      child.stdin.write(`${JSON.stringify({ ...payload, id })}\n`);
+    });
+  }
+
+  stop() {
+    const { child } = this;
+    this.detach(child);
+    if (child) {
+      try {
+        child.stdin.end(`${JSON.stringify({ cmd: 'shutdown' })}\n`);
+      } catch (err) {
+        // already gone
+      }
+      setTimeout(() => child.kill(), 2000).unref();
+    }
+  }
+
+  settle(msg) {
+    const entry = this.pending.get(msg.id);
+    if (!entry) return;
+    this.pending.delete(msg.id);
+    clearTimeout(entry.timer);
+    if (msg.error) {
+      entry.reject(new Error(msg.error));
+    } else {
+      entry.resolve(msg);
+    }
+  }
+
+  abort(child, message) {
+    this.detach(child);
+    this.failAll(child, message);
+    try {
+      child.kill();
+    } catch (err) {
+      // already gone
+    }
+  }
+
+  detach(child) {
+    if (child && this.child === child) {
+      this.child = null;
+      this.ready = null;
+    }
+  }
+
+  failAll(child, message) {
+    this.pending.forEach((entry, id) => {
+      if (entry.child !== child) return;
+      clearTimeout(entry.timer);
+      this.pending.delete(id);
+      entry.reject(new Error(message));
+    });
+  }
+}
+
+module.exports = { PythonLineServer };
@@ -734,13 +734,21 @@ function buildPortfolioView() {
       setStatus('info', 'Portföy verileri güncelleniyor...');
     }
     const failed = [];
+    let quotes;
+    try {
+      quotes = await window.pythonBridge.fetchQuotes(viewState.holdings.map((holding) => holding.symbol));
+    } catch (err) {
+      setStatus('error', err && err.message ? err.message : 'Fiyat çekilemedi.');
+      refreshInfo.textContent = `Son yenileme başarısız: ${formatDateTime(new Date().toISOString())}`;
+      return;
+    }
     for (const holding of viewState.holdings) {
-      try {
-        const quote = await ensureQuote(holding.symbol, { silent: true });
-        mergeQuoteIntoHolding(holding, quote);
-      } catch (err) {
+      const raw = quotes[(holding.symbol || '').toUpperCase()];
+      if (!raw || raw.error) {
         failed.push(holding.symbol);
+        continue;
       }
+      mergeQuoteIntoHolding(holding, raw);
     }
     renderHoldings();
     renderSummary();
@@ -1550,6 +1558,7 @@ function buildScannerView() {
   const checkboxFields = [
     { label: 'Sessiz mod (quiet)', name: 'quiet' },
     { label: 'Grafik üretme (no charts)', name: 'noCharts' },
+    { label: 'Yalnızca geçenlere grafik (diğerleri istendiğinde)', name: 'lazyCharts' },
     { label: 'Delist edilenleri sakla (keep delisted)', name: 'keepDelisted' },
     { label: 'Earnings alma (no earnings)', name: 'noEarnings' },
     { label: 'Analyst rating alma (no analyst)', name: 'noAnalyst' },
@@ -1657,6 +1666,8 @@ function buildScannerView() {
   const progressCard = createProgressCard();
   let progressState = null;
 
+  const deferred = buildDeferredChartsPanel();
+
   form.appendChild(generalSection);
   form.appendChild(filtersSection);
   form.appendChild(formActions);
@@ -1692,6 +1703,7 @@ function buildScannerView() {
 
     if (formData.get('quiet')) args.push('--quiet');
     if (formData.get('noCharts')) args.push('--no-charts');
+    if (formData.get('lazyCharts')) args.push('--charts', 'accepted');
     if (formData.get('keepDelisted')) args.push('--keep-delisted');
     if (formData.get('noEarnings')) args.push('--no-earnings');
     if (formData.get('noAnalyst')) args.push('--no-analyst');
@@ -1749,6 +1761,8 @@ function buildScannerView() {
       jobList,
       env,
       onOutput: ({ data }) => {
+        const runDir = parseScannerSnapshot(data);
+        if (runDir) deferred.setRunDir(runDir);
         const parsed = parseScannerProgress(data);
         if (!parsed || !progressState) return;
         const totalSafe = Number.isFinite(parsed.total) ? parsed.total : 0;
@@ -1782,6 +1796,7 @@ function buildScannerView() {
   root.appendChild(statusEl);
   root.appendChild(form);
   root.appendChild(jobList);
+  root.appendChild(deferred.root);
 
   (async () => {
     try {
@@ -2294,6 +2309,144 @@ function updateProgressCard(progressCard, state, message, finished = false) {
   }
 }
 
+// "Snapshot   -> <run_dir>/charts.json" line printed by deferred-chart scans
+function parseScannerSnapshot(text) {
+  if (!text) return null;
+  const match = String(text).match(/Snapshot\s+->\s+(.+?)[\\/]charts\.json/);
+  return match ? match[1].trim() : null;
+}
+
+function buildDeferredChartsPanel() {
+  const root = document.createElement('section');
+  root.className = 'subpanel deferred-charts';
+
+  const title = document.createElement('h3');
+  title.textContent = 'Ertelenmiş Grafikler';
+  const hint = document.createElement('p');
+  hint.className = 'filters-hint';
+  hint.textContent = '"Yalnızca geçenlere grafik" ile yapılan taramalarda elenenlerin grafikleri tarama anındaki barlardan istendiğinde çizilir.';
+
+  const statusEl = document.createElement('div');
+  statusEl.className = 'scanner-status hidden';
+
+  const controls = document.createElement('div');
+  controls.className = 'form-grid';
+  const runField = document.createElement('label');
+  runField.className = 'field';
+  runField.textContent = 'Çalışma Klasörü';
+  const runInput = document.createElement('input');
+  runInput.type = 'text';
+  runInput.placeholder = 'örn. results/run_20250101_0930';
+  runField.appendChild(runInput);
+  const listBtn = document.createElement('button');
+  listBtn.type = 'button';
+  listBtn.className = 'secondary';
+  listBtn.textContent = 'Grafiksizleri Listele';
+  controls.appendChild(runField);
+  controls.appendChild(listBtn);
+
+  const table = document.createElement('table');
+  table.className = 'reporter-table hidden';
+  table.innerHTML = `
+    <thead>
+      <tr>
+        <th>Ticker</th>
+        <th>Sonuç</th>
+        <th>Sebep</th>
+        <th></th>
+      </tr>
+    </thead>
+  `;
+  const tbody = document.createElement('tbody');
+  table.appendChild(tbody);
+
+  const chartContainer = document.createElement('div');
+  chartContainer.className = 'portfolio-chart hidden';
+  const chartImg = document.createElement('img');
+  chartImg.alt = 'Tarama grafiği';
+  const chartMeta = document.createElement('span');
+  chartMeta.className = 'portfolio-chart-meta';
+  chartContainer.appendChild(chartImg);
+  chartContainer.appendChild(chartMeta);
+
+  root.appendChild(title);
+  root.appendChild(hint);
+  root.appendChild(statusEl);
+  root.appendChild(controls);
+  root.appendChild(table);
+  root.appendChild(chartContainer);
+
+  async function showChart(runDir, symbol, button) {
+    button.disabled = true;
+    setScannerStatus(statusEl, 'info', `${symbol} grafiği çiziliyor...`);
+    try {
+      const data = await window.pythonBridge.renderRunChart(runDir, symbol);
+      chartImg.src = data.image;
+      chartMeta.textContent = `${symbol} · ${data.path}`;
+      chartContainer.classList.remove('hidden');
+      button.textContent = 'Göster';
+      setScannerStatus(statusEl, 'success', `${symbol} grafiği hazır.`);
+    } catch (err) {
+      setScannerStatus(statusEl, 'error', err && err.message ? err.message : 'Grafik oluşturulamadı.');
+    } finally {
+      button.disabled = false;
+    }
+  }
+
+  async function loadList() {
+    const runDir = runInput.value.trim();
+    if (!runDir) {
+      setScannerStatus(statusEl, 'error', 'Çalışma klasörü girin.');
+      return;
+    }
+    tbody.innerHTML = '';
+    chartContainer.classList.add('hidden');
+    try {
+      const data = await window.pythonBridge.listRunCharts(runDir);
+      const pending = (data.tickers || []).filter((t) => !t.rendered);
+      pending.forEach((t) => {
+        const row = document.createElement('tr');
+        const symbolCell = document.createElement('td');
+        symbolCell.textContent = t.symbol;
+        const resultCell = document.createElement('td');
+        resultCell.textContent = t.passes ? 'Geçti' : 'Elendi';
+        const reasonCell = document.createElement('td');
+        reasonCell.textContent = t.failReason || '-';
+        const actionCell = document.createElement('td');
+        const btn = document.createElement('button');
+        btn.type = 'button';
+        btn.className = 'secondary';
+        btn.textContent = 'Grafik';
+        btn.addEventListener('click', () => showChart(data.runDir, t.symbol, btn));
+        actionCell.appendChild(btn);
+        row.appendChild(symbolCell);
+        row.appendChild(resultCell);
+        row.appendChild(reasonCell);
+        row.appendChild(actionCell);
+        tbody.appendChild(row);
+      });
+      table.classList.toggle('hidden', pending.length === 0);
+      setScannerStatus(
+        statusEl,
+        'info',
+        pending.length ? `${pending.length} tickerın grafiği henüz çizilmedi.` : 'Bu çalışmadaki tüm grafikler çizilmiş.',
+      );
+    } catch (err) {
+      table.classList.add('hidden');
+      setScannerStatus(statusEl, 'error', err && err.message ? err.message : 'Çalışma okunamadı.');
+    }
+  }
+
+  listBtn.addEventListener('click', loadList);
+
+  return {
+    root,
+    setRunDir(runDir) {
+      runInput.value = runDir;
+    },
+  };
+}
+
 function parseScannerProgress(line) {
   if (!line) return null;
   const lines = String(line).split(/\r?\n/);
@@ -8,10 +8,22 @@ const {
 } = require('./storage');
 
 let fetchQuoteFn = null;
+let fetchQuotesFn = null;
+let evaluateStopsFn = null;
 let timer = null;
 
-function initReporter({ fetchQuote }) {
+const ALERT_TYPES = {
+  stop_loss_80: { title: 'Stop Loss Uyarısı', direction: 'down' },
+  take_profit_100: { title: 'R Hedefi Uyarısı', direction: 'up' },
+};
+
+// fetchQuotes (optional): symbols -> {SYMBOL: quote | {error}} in one round-trip
+// evaluateStops (optional): () -> evaluate_stops result; alerts due this
+// cycle, already deduplicated against alerts_log
+function initReporter({ fetchQuote, fetchQuotes = null, evaluateStops = null }) {
   fetchQuoteFn = fetchQuote;
+  fetchQuotesFn = typeof fetchQuotes === 'function' ? fetchQuotes : null;
+  evaluateStopsFn = typeof evaluateStops === 'function' ? evaluateStops : null;
   rescheduleReporter();
 }
 
@@ -67,9 +79,31 @@ async function runReporterCycle() {
     return;
   }
 
+  if (evaluateStopsFn && await runBatchEvaluation({ holdings, settings, transporter })) {
+    updateReporterLastRun(new Date().toISOString());
+    return;
+  }
+
+  let quotes = null;
+  if (fetchQuotesFn) {
+    try {
+      quotes = await fetchQuotesFn(holdings.map((holding) => holding.symbol));
+    } catch (err) {
+      console.error('[reporter] batch quote error', err.message);
+    }
+  }
+
   for (const holding of holdings) {
     try {
-      const quote = await fetchQuoteFn(holding.symbol);
+      let quote;
+      if (quotes) {
+        quote = quotes[String(holding.symbol || '').toUpperCase()];
+        if (quote && quote.error) {
+          throw new Error(quote.error);
+        }
+      } else {
+        quote = await fetchQuoteFn(holding.symbol);
+      }
       if (!quote || !Number.isFinite(Number(quote.price))) continue;
       await evaluateHolding({ holding, quote, settings, transporter });
     } catch (err) {
@@ -80,6 +114,36 @@ async function runReporterCycle() {
   updateReporterLastRun(new Date().toISOString());
 }
 
+// One evaluate_stops pass for the whole portfolio. Returns false when the
+// evaluator failed so the cycle falls back to per-holding evaluation.
+async function runBatchEvaluation({ holdings, settings, transporter }) {
+  let result;
+  try {
+    result = await evaluateStopsFn();
+  } catch (err) {
+    console.error('[reporter] stop evaluator error', err.message);
+    return false;
+  }
+  Object.entries(result.errors || {}).forEach(([symbol, message]) => {
+    console.error('[reporter] quote error', symbol, message);
+  });
+  const byId = new Map(holdings.map((holding) => [holding.id, holding]));
+  for (const due of result.alerts || []) {
+    const holding = byId.get(due.holding_id);
+    const alert = ALERT_TYPES[due.type];
+    if (!holding || !alert) continue;
+    await sendAlert({
+      holding,
+      alert: { type: due.type, ...alert },
+      price: Number(due.price),
+      quote: { currency: due.currency, as_of: due.as_of },
+      settings,
+      transporter,
+    });
+  }
+  return true;
+}
+
 async function evaluateHolding({ holding, quote, settings, transporter }) {
   const avgPrice = Number(holding.avg_price);
   const stopLoss = Number(holding.stop_loss);
@@ -87,19 +151,17 @@ async function evaluateHolding({ holding, quote, settings, transporter }) {
   if (risk <= 0) return;
 
   const price = Number(quote.price);
-  const symbol = holding.symbol;
-  const timestamp = new Date().toISOString();
 
   const alerts = [];
 
   const lossThreshold = avgPrice - 0.8 * risk;
   if (price <= lossThreshold) {
-    alerts.push({ type: 'stop_loss_80', title: 'Stop Loss Uyarısı', direction: 'down' });
+    alerts.push({ type: 'stop_loss_80', ...ALERT_TYPES.stop_loss_80 });
   }
 
   const profitThreshold = avgPrice + 1.0 * risk;
   if (price >= profitThreshold) {
-    alerts.push({ type: 'take_profit_100', title: 'R Hedefi Uyarısı', direction: 'up' });
+    alerts.push({ type: 'take_profit_100', ...ALERT_TYPES.take_profit_100 });
   }
 
   for (const alert of alerts) {
@@ -108,33 +170,42 @@ async function evaluateHolding({ holding, quote, settings, transporter }) {
       // within last hour, skip duplicate notifications
       continue;
     }
+    await sendAlert({ holding, alert, price, quote, settings, transporter });
+  }
+}
 
-    const subject = `${alert.title}: ${symbol} ${alert.direction === 'down' ? '↓' : '↑'}`;
-    const bodyLines = [
-      `Sembol: ${symbol}`,
-      `Güncel Fiyat: ${formatMoney(price, quote.currency)}`,
-      `Ort. Alış: ${formatMoney(avgPrice, quote.currency)}`,
-      `Stop Loss: ${formatMoney(stopLoss, quote.currency)}`,
-      `Risk (1R): ${formatMoney(risk, quote.currency)}`,
-      '',
-      alert.direction === 'down'
-        ? `Fiyat stop loss mesafesinin %80'ine ulaştı. Pozisyonu gözden geçirin.`
-        : `Fiyat 1R hedefini yakaladı. Kar realizasyonu değerlendirin.`,
-      '',
-      `Veri zamanı: ${quote.as_of || quote.fetched_at || new Date().toISOString()}`,
-    ];
+async function sendAlert({ holding, alert, price, quote, settings, transporter }) {
+  const avgPrice = Number(holding.avg_price);
+  const stopLoss = Number(holding.stop_loss);
+  const risk = avgPrice - stopLoss;
+  const symbol = holding.symbol;
+  const timestamp = new Date().toISOString();
 
-    try {
-      await transporter.sendMail({
-        from: settings.from_address || settings.smtp_username || settings.email_address,
-        to: settings.email_address,
-        subject,
-        text: bodyLines.join('\n'),
-      });
-      recordAlertTrigger({ holdingId: holding.id, alertType: alert.type, timestampIso: timestamp });
-    } catch (err) {
-      console.error('[reporter] email send failed', err.message);
-    }
+  const subject = `${alert.title}: ${symbol} ${alert.direction === 'down' ? '↓' : '↑'}`;
+  const bodyLines = [
+    `Sembol: ${symbol}`,
+    `Güncel Fiyat: ${formatMoney(price, quote.currency)}`,
+    `Ort. Alış: ${formatMoney(avgPrice, quote.currency)}`,
+    `Stop Loss: ${formatMoney(stopLoss, quote.currency)}`,
+    `Risk (1R): ${formatMoney(risk, quote.currency)}`,
+    '',
+    alert.direction === 'down'
+      ? `Fiyat stop loss mesafesinin %80'ine ulaştı. Pozisyonu gözden geçirin.`
+      : `Fiyat 1R hedefini yakaladı. Kar realizasyonu değerlendirin.`,
+    '',
+    `Veri zamanı: ${quote.as_of || quote.fetched_at || new Date().toISOString()}`,
+  ];
+
+  try {
+    await transporter.sendMail({
+      from: settings.from_address || settings.smtp_username || settings.email_address,
+      to: settings.email_address,
+      subject,
+      text: bodyLines.join('\n'),
+    });
+    recordAlertTrigger({ holdingId: holding.id, alertType: alert.type, timestampIso: timestamp });
+  } catch (err) {
+    console.error('[reporter] email send failed', err.message);
   }
 }
 
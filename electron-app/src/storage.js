@@ -35,6 +35,10 @@ function ensureDb() {
   }
 }
 
+function getDbPath() {
+  return dbPath;
+}
+
 function persist() {
   ensureDb();
   if (!dbPath) {
@@ -455,6 +459,7 @@ function getLastAlertFor({ holdingId, alertType }) {
 
 module.exports = {
   initStorage,
+  getDbPath,
   getPortfolioSnapshot,
   upsertHolding,
   sellHolding,
@@ -0,0 +1,182 @@
+"""
+asyncio tabanlı HTTP çekim katmanı.
+
+Tek event loop'ta yüzlerce isteği aynı anda uçuşta tutar; host başına
+eşzamanlılık asyncio.Semaphore ile sınırlanır. Zaman aşımı ve yeniden deneme
+davranışı net.http_get ile aynıdır (GLOBAL_HTTP_TIMEOUT, GLOBAL_MAX_RETRIES);
+host hız sınırlayıcıları (net.RATE_LIMITS) thread'lerle ortaktır.
+aiohttp kurulu değilse istekler net.http_get ile thread havuzunda yapılır;
+aiohttp yalnızca ilk AsyncFetcher açılırken import edilir (--async dışında
+başlangıca yük bindirmez).
+"""
+import asyncio
+from urllib.parse import urlsplit
+
+from . import net
+from .utils import _netlog
+
+aiohttp = None
+_AIOHTTP_TRIED = False
+
+
+def _load_aiohttp():
+    global aiohttp, _AIOHTTP_TRIED
+    if not _AIOHTTP_TRIED:
+        _AIOHTTP_TRIED = True
+        try:
+            import aiohttp as _aiohttp
+        except ImportError:  # pragma: no cover - aiohttp opsiyonel
+            _aiohttp = None
+        aiohttp = _aiohttp
+    return aiohttp
+
+# host başına aynı anda uçuşta olabilecek istek sayısı (CLI: --async-limit)
+HOST_LIMIT = 64
+
+def set_host_limit(n: int):
+    global HOST_LIMIT
+    HOST_LIMIT = max(1, int(n))
+
+# açık AsyncFetcher; aget_json bunu kullanır
+_ACTIVE = None
+
+
+class _RetryableStatus(Exception):
+    pass
+
+
+async def backoff_sleep_async(attempt: int, base: float = 0.6):
+    await asyncio.sleep(net.backoff_delay(attempt, base))
+
+
+def _clean_params(params):
+    # aiohttp yalnızca str/int/float kabul eder
+    out = {}
+    for k, v in (params or {}).items():
+        if isinstance(v, bool):
+            v = "true" if v else "false"
+        out[k] = v if isinstance(v, (str, int, float)) else str(v)
+    return out
+
+
+class AsyncFetcher:
+    """
+    `async with AsyncFetcher():` bloğu boyunca tek aiohttp oturumu açık
+    tutulur ve aget_json çağrıları bu oturumdan geçer.
+    """
+
+    def __init__(self, host_limit: int = None):
+        self.host_limit = int(host_limit or HOST_LIMIT)
+        self._sems = {}
+        self._session = None
+
+    def _sem(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        sem = self._sems.get(host)
+        if sem is None:
+            sem = self._sems[host] = asyncio.Semaphore(self.host_limit)
+        return sem
+
+    async def __aenter__(self):
+        global _ACTIVE
+        if _load_aiohttp() is not None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=0, limit_per_host=self.host_limit),
+                timeout=aiohttp.ClientTimeout(sock_connect=5.0, sock_read=net.GLOBAL_HTTP_TIMEOUT),
+            )
+        else:
+            _netlog("[net warn] aiohttp bulunamadı; async istekler thread havuzunda yapılacak")
+        _ACTIVE = self
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        global _ACTIVE
+        if _ACTIVE is self:
+            _ACTIVE = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        return False
+
+    async def get_json(self, url, headers=None, params=None, retries=None,
+                       retry_status=(429,500,502,503,504), retry_forbidden=(403,404)):
+        """http_get(...).json() karşılığı; başarısızsa None."""
+        if self._session is None:
+            async with self._sem(url):
+                r = await asyncio.to_thread(net.http_get, url, headers, params, retries,
+                                            retry_status, retry_forbidden)
+            return None if r is None else r.json()
+
+        if retries is None: retries = net.GLOBAL_MAX_RETRIES
+        params = _clean_params(params)
+        bucket = net.limiter_for(url)
+        slots = net.concurrency_for(url)
+        provider = net.provider_for(url)
+        attempt, throttled = 1, 0
+        while attempt <= retries:
+            if provider is not None and not net.provider_ok(provider):
+                _netlog(f"[net warn] {url} -> {provider} circuit open; skip")
+                return None
+            retry_after = None
+            started = None
+            outcome, healthy = "congested", False
+            try:
+                # hız sınırı beklemesi host semaforu dışında: bekleyen istek
+                # eşzamanlılık yeri tutmaz
+                if bucket is not None:
+                    wait = bucket.reserve()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                async with self._sem(url):
+                    if slots is not None:
+                        started = await slots.acquire_async()
+                    try:
+                        r = await self._session.get(url, headers=headers or {}, params=params)
+                        outcome, healthy = net.classify_status(provider, r.status)
+                    finally:
+                        if started is not None:
+                            slots.release(started, outcome)
+                        if provider is not None:
+                            net.record_provider(provider, healthy)
+                    async with r:
+                        if r.status == 429 and 429 in retry_status and throttled < net.MAX_THROTTLE_WAITS:
+                            throttled += 1
+                            delay = net.throttle_delay(r.headers, throttled)
+                            _netlog(f"[net warn] {url} -> HTTP 429; waiting {delay:.1f}s "
+                                    f"(throttle {throttled}/{net.MAX_THROTTLE_WAITS})")
+                            if bucket is not None:
+                                bucket.pause(delay)
+                            else:
+                                await asyncio.sleep(delay)
+                            continue
+                        if r.status in retry_forbidden:
+                            _netlog(f"[net warn] {url} -> HTTP {r.status}. Not retrying.")
+                            return None
+                        if r.status in retry_status:
+                            retry_after = net.retry_after_seconds(r.headers.get("Retry-After"))
+                            raise _RetryableStatus(f"Retryable HTTP {r.status}")
+                        r.raise_for_status()
+                        return await r.json(content_type=None)
+            except (_RetryableStatus, aiohttp.ClientConnectionError, aiohttp.ClientResponseError,
+                    asyncio.TimeoutError) as e:
+                if attempt >= retries:
+                    _netlog(f"[net error] {url} -> {e}; giving up.")
+                    return None
+                _netlog(f"[net warn] {url} -> {e}; retry {attempt}/{retries}")
+                if retry_after is not None:
+                    await asyncio.sleep(retry_after)
+                else:
+                    await backoff_sleep_async(attempt)
+                attempt += 1
+            except Exception as e:
+                _netlog(f"[net warn] {url} -> {e}; skip")
+                return None
+        return None
+
+
+async def aget_json(url, headers=None, params=None, **kw):
+    """Açık AsyncFetcher üzerinden JSON GET; blok dışında çağrılırsa thread'de http_get."""
+    if _ACTIVE is not None:
+        return await _ACTIVE.get_json(url, headers=headers, params=params, **kw)
+    r = await asyncio.to_thread(net.http_get, url, headers, params)
+    return None if r is None else r.json()
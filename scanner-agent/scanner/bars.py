@@ -0,0 +1,92 @@
+"""
+Tek ticker'ın günlük barları için hafif, dizi tabanlı taşıyıcı.
+
+Tarama sıcak yolunda (fiyat metrikleri, göstergeler, grafik) DataFrame
+yerine kullanılır: satır başına Ticker / ChangePct kolonu taşımaz, OHLC
+float32, hacim float64, günler 1970-01-01'den beri int64 gün sayısıdır.
+"""
+import numpy as np
+import pandas as pd
+
+_EPOCH = pd.Timestamp("1970-01-01")
+_PRICE = np.float32
+_VOLUME = np.float64
+
+
+class Bars:
+    __slots__ = ("ticker", "days", "open", "high", "low", "close", "volume")
+
+    def __init__(self, ticker: str, days, open, high, low, close, volume):
+        self.ticker = ticker
+        self.days = np.ascontiguousarray(days, dtype=np.int64)
+        self.open = np.ascontiguousarray(open, dtype=_PRICE)
+        self.high = np.ascontiguousarray(high, dtype=_PRICE)
+        self.low = np.ascontiguousarray(low, dtype=_PRICE)
+        self.close = np.ascontiguousarray(close, dtype=_PRICE)
+        self.volume = np.ascontiguousarray(volume, dtype=_VOLUME)
+
+    @classmethod
+    def empty(cls, ticker: str) -> "Bars":
+        z = np.empty(0)
+        return cls(ticker, z, z, z, z, z, z)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, ticker: str = None) -> "Bars":
+        """Date + OHLCV içeren frame'den (agg şeması dahil)."""
+        if df is None or df.empty:
+            return cls.empty(ticker or "")
+        if ticker is None:
+            ticker = str(df["Ticker"].iloc[-1]) if "Ticker" in df else ""
+        dates = pd.to_datetime(df["Date"])
+        if getattr(dates.dt, "tz", None) is not None:
+            dates = dates.dt.tz_localize(None)
+        days = (dates.dt.normalize() - _EPOCH).dt.days.to_numpy(dtype=np.int64)
+        return cls(ticker, days, df["Open"].to_numpy(), df["High"].to_numpy(),
+                   df["Low"].to_numpy(), df["Close"].to_numpy(), df["Volume"].to_numpy())
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    @property
+    def dates(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(_EPOCH + pd.to_timedelta(self.days, unit="D"), name="Date")
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, f).nbytes for f in ("days", "open", "high", "low", "close", "volume"))
+
+    def since(self, day: int) -> "Bars":
+        """day (epoch gün) ve sonrası; dizi görünümleri, kopya yok."""
+        i = int(np.searchsorted(self.days, day))
+        return Bars(self.ticker, self.days[i:], self.open[i:], self.high[i:],
+                    self.low[i:], self.close[i:], self.volume[i:])
+
+    def change_pct(self) -> np.ndarray:
+        """Günlük % değişim (ilk bar NaN); ölçüm float64 ile yapılır."""
+        c = self.close.astype(np.float64)
+        out = np.full(len(c), np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[1:] = (c[1:] / c[:-1] - 1.0) * 100.0
+        return out
+
+    def to_frame(self) -> pd.DataFrame:
+        """poly_get_agg şemasında DataFrame (mplfinance ve CSV uçları için)."""
+        df = pd.DataFrame({
+            "Date": self.dates,
+            "Ticker": self.ticker,
+            "Open": self.open.astype(np.float64),
+            "High": self.high.astype(np.float64),
+            "Low": self.low.astype(np.float64),
+            "Close": self.close.astype(np.float64),
+            "Volume": self.volume,
+            "ChangePct": self.change_pct(),
+        })
+        return df
+
+    def ohlcv_frame(self) -> pd.DataFrame:
+        """Date indeksli OHLCV (mplfinance girdisi)."""
+        return pd.DataFrame(
+            {"Open": self.open, "High": self.high, "Low": self.low,
+             "Close": self.close, "Volume": self.volume},
+            index=self.dates,
+        )
@@ -0,0 +1,73 @@
+"""
+Grafik çizim kıyası: plot_ticker_stockcharts (mpf, her grafikte yeni figür +
+bbox_inches="tight") ile chart_template.render_ticker (süreç başına tek
+şablon).
+
+    python -m scanner.bench_charts --n 500
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+from .bars import Bars
+from .utils import set_quiet
+
+
+def synthetic_bars(n_tickers: int, n_bars: int, seed: int = 0):
+    """Rastgele yürüyüşlü OHLCV; iş günü aralıklı epoch günleri."""
+    rng = np.random.default_rng(seed)
+    week = np.arange(n_bars)
+    days = 19000 + week // 5 * 7 + week % 5
+    out = []
+    for i in range(n_tickers):
+        close = np.exp(np.cumsum(rng.normal(0, 0.02, n_bars))) * rng.uniform(5, 200)
+        open_ = close * np.exp(rng.normal(0, 0.01, n_bars))
+        high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.02, n_bars))
+        low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.02, n_bars))
+        out.append(Bars(f"BM{i:04d}", days, open_, high, low, close, rng.uniform(1e5, 5e6, n_bars)))
+    return out
+
+
+def _time(render, bars_list, cfg, out_dir):
+    t0 = time.perf_counter()
+    for i, bars in enumerate(bars_list):
+        render(bars, cfg, out_dir, fail_reason=("StochRSI" if i % 2 else None))
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grafik çizim süresi kıyası")
+    parser.add_argument("--n", type=int, default=500, help="Grafik sayısı")
+    parser.add_argument("--bars", type=int, default=190, help="Grafik başına bar sayısı")
+    parser.add_argument("--keep", action="store_true", help="Üretilen PNG'leri silme")
+    args = parser.parse_args()
+    set_quiet(True)
+
+    from .plotting import plot_ticker_stockcharts
+    from .chart_template import render_ticker
+
+    cfg = {}
+    bars_list = synthetic_bars(args.n, args.bars)
+    root = tempfile.mkdtemp(prefix="bench_charts_")
+    try:
+        results = {}
+        for name, fn in (("mpf", plot_ticker_stockcharts), ("template", render_ticker)):
+            out_dir = os.path.join(root, name)
+            # ilk grafik import / şablon kurulumunu ölçüme katmasın
+            fn(bars_list[0], cfg, out_dir)
+            results[name] = _time(fn, bars_list, cfg, out_dir)
+            n_png = len([f for f in os.listdir(out_dir) if f.endswith(".png")])
+            print(f"{name:>9}: {results[name]:7.2f} s  ({results[name] / args.n * 1000:6.1f} ms/grafik, {n_png} PNG)")
+        print(f"  hızlanma: {results['mpf'] / results['template']:.1f}x")
+        if args.keep:
+            print(f"PNG'ler -> {root}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
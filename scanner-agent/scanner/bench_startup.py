@@ -0,0 +1,82 @@
+"""
+Başlangıç maliyeti ölçümü: `python -X importtime` çıktısından modül başına
+import süresi ve süreç açılışından import bitişine duvar saati süresi.
+
+    python -m scanner.bench_startup --repeat 5
+    python -m scanner.bench_startup --module scanner.portfolio
+
+Her tekrar taze bir yorumlayıcıda çalışır; ilk çalıştırma .pyc ısınması
+için sayılmaz, değerler tekrarların medyanıdır.
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+# tarama sıcak yolunda olmaması gereken ağır paketler
+HEAVY = ("matplotlib", "mplfinance", "yfinance", "aiohttp", "rich", "pandas", "requests")
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def _run(module: str, cwd: str):
+    """Tek taze süreç: (duvar saati ms, {modül: (self µs, kümülatif µs, derinlik)})."""
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=cwd, capture_output=True, text=True)
+    wall = (time.perf_counter() - t0) * 1000
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or [f"çıkış kodu {proc.returncode}"]
+        raise RuntimeError(f"{module} import edilemedi: {tail[0]}")
+    mods = {}
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            mods[m.group(4)] = (int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2)
+    return wall, mods
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Modül başına import maliyeti")
+    parser.add_argument("--module", default="scanner.cli", help="Ölçülecek modül")
+    parser.add_argument("--repeat", type=int, default=5, help="Tekrar sayısı")
+    parser.add_argument("--top", type=int, default=12, help="Listelenecek üçüncü parti paket sayısı")
+    args = parser.parse_args()
+
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    _run(args.module, cwd)
+    runs = [_run(args.module, cwd) for _ in range(max(1, args.repeat))]
+
+    def median(name, idx):
+        vals = [mods[name][idx] for _, mods in runs if name in mods]
+        return statistics.median(vals) / 1000 if vals else 0.0
+
+    names = set().union(*(mods for _, mods in runs))
+    wall = statistics.median(w for w, _ in runs)
+    total = median(args.module, 1)
+    print(f"{args.module}: import {total:7.1f} ms, süreç toplamı {wall:7.1f} ms ({len(runs)} tekrar, medyan)")
+
+    own = sorted((n for n in names if n == "scanner" or n.startswith("scanner.")),
+                 key=lambda n: -median(n, 1))
+    print("\n  paket modülleri            kümülatif       kendi")
+    for n in own:
+        print(f"  {n:<24} {median(n, 1):9.1f} ms {median(n, 0):8.1f} ms")
+
+    # üçüncü parti: ilk yüklendiği yerdeki kök paket (alt modüller kökün içinde sayılır)
+    roots = sorted((n for n in names if "." not in n and not n.startswith("_") and n != "scanner"),
+                   key=lambda n: -median(n, 1))
+    print("\n  üçüncü parti / stdlib      kümülatif")
+    for n in roots[:max(0, args.top)]:
+        print(f"  {n:<24} {median(n, 1):9.1f} ms")
+
+    loaded = [h for h in HEAVY if h in names]
+    skipped = [h for h in HEAVY if h not in names]
+    print(f"\n  yüklenen ağır paketler : {', '.join(loaded) or '-'}")
+    print(f"  yüklenmeyen            : {', '.join(skipped) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 import os
+import threading
 import numpy as np
 import pandas as pd
 
 from .polygon_api import poly_get_agg
 from .yahoo_api import yahoo_close_series
+from .net import provider_ok
 
 
 def _poly_close_series(ticker: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.Series:
@@ -22,68 +24,182 @@ def _polygon_available() -> bool:
 def _close_series(ticker: str, start: pd.Timestamp, end: pd.Timestamp, provider: str) -> pd.Series:
     provider = (provider or 'polygon').lower()
     if provider == 'yahoo':
-        series = yahoo_close_series(ticker, start, end)
+        series = yahoo_close_series(ticker, start, end) if provider_ok('yahoo') else pd.Series(dtype=float)
         if not series.empty:
             return series
         if not _polygon_available():
             return pd.Series(dtype=float)
     return _poly_close_series(ticker, start, end)
 
-def _winsorize(series: pd.Series, p: float) -> pd.Series:
-    if series.empty or p <= 0:
-        return series
-    lo, hi = series.quantile(p), series.quantile(1 - p)
-    return series.clip(lower=lo, upper=hi)
+TRADING_DAYS = 252
+
+
+def _winsorize_columns(x: np.ndarray, mask: np.ndarray, p: float) -> np.ndarray:
+    """
+    Her kolonu yalnızca mask'teki değerlerin [p, 1-p] kantillerine kırpar
+    (pandas quantile ile aynı lineer interpolasyon). nanquantile yerine tek
+    sıralama + take_along_axis; NaN'ler sıralamada sona düşer.
+    """
+    xm = np.where(mask, x, np.nan)
+    srt = np.sort(xm, axis=0)
+    n = mask.sum(axis=0)
+    last = np.maximum(n - 1, 0)
+    bounds = []
+    for q in (p, 1 - p):
+        pos = q * last
+        i0 = np.floor(pos).astype(np.int64)
+        i1 = np.minimum(i0 + 1, last)
+        v0 = np.take_along_axis(srt, i0[None, :], axis=0)[0]
+        v1 = np.take_along_axis(srt, i1[None, :], axis=0)[0]
+        bounds.append(v0 + (pos - i0) * (v1 - v0))
+    return np.clip(xm, bounds[0], bounds[1])
+
+
+def beta_matrix(returns: np.ndarray, market: np.ndarray, min_points: int = 500, winsor_pct: float = 0.01) -> np.ndarray:
+    """
+    Kapalı form (cov/var) winsorize edilmiş OLS beta; tüm kolonlar tek geçişte.
+
+    returns: (gün × ticker) log getiri matrisi, NaN = o gün veri yok.
+    market:  (gün,) benchmark log getirileri.
+    min_points'ten az ortak günü olan kolonlar NaN döner.
+    """
+    R = np.asarray(returns, dtype=np.float64)
+    if R.ndim == 1:
+        R = R[:, None]
+    M = np.broadcast_to(np.asarray(market, dtype=np.float64)[:, None], R.shape)
+    mask = np.isfinite(R) & np.isfinite(M)
+
+    if winsor_pct > 0:
+        R = _winsorize_columns(R, mask, winsor_pct)
+        M = _winsorize_columns(M, mask, winsor_pct)
+
+    x = np.where(mask, M, 0.0)
+    y = np.where(mask, R, 0.0)
+    n = mask.sum(axis=0)
+    n_safe = np.maximum(n, 1)
+    sx, sy = x.sum(axis=0), y.sum(axis=0)
+    var = (x * x).sum(axis=0) - sx * sx / n_safe
+    cov = (x * y).sum(axis=0) - sx * sy / n_safe
+
+    out = np.full(R.shape[1], np.nan)
+    ok = (n >= max(int(min_points), 2)) & (var > 0)
+    out[ok] = cov[ok] / var[ok]
+    return out
+
+
+def beta_windows(returns: np.ndarray, market: np.ndarray, years=(1, 3, 5), min_points=500, winsor_pct: float = 0.01) -> dict:
+    """
+    Aynı hizalı getiri matrisinden birden çok pencere (son N yıl) için beta.
+
+    min_points tek sayı ya da {yıl: min_points} olabilir. Tek sayı, pencerenin
+    gün sayısının %80'i ile sınırlanır (1 yılda ~252 getiri var; 500 şartı
+    o pencereyi hep NaN yapardı). Dönüş: {yıl: ndarray}.
+    """
+    out = {}
+    for y in years:
+        w = int(round(float(y) * TRADING_DAYS))
+        if isinstance(min_points, dict):
+            mp = min_points.get(y, 0)
+        else:
+            mp = min(int(min_points), int(0.8 * w))
+        out[y] = beta_matrix(returns[-w:], market[-w:], min_points=mp, winsor_pct=winsor_pct)
+    return out
+
+
+def universe_betas(closes: pd.DataFrame, bench_close: pd.Series, cfg: dict, years=None) -> dict:
+    """
+    (tarih × ticker) kapanış tablosundan tüm evren için beta.
+
+    Benchmark tarihleri eksen alınır; ticker'ın olmadığı günler NaN kalır.
+    Dönüş: {yıl: pd.Series(beta, index=ticker)}.
+    """
+    beta_cfg = cfg.get("beta", {}) or {}
+    if years is None:
+        years = (int(beta_cfg.get("years", 3)),)
+    bench = bench_close.sort_index()
+    aligned = closes.reindex(bench.index)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        R = np.diff(np.log(aligned.to_numpy(dtype=np.float64)), axis=0)
+        m = np.diff(np.log(bench.to_numpy(dtype=np.float64)))
+    res = beta_windows(
+        R, m, years=years,
+        min_points=int(beta_cfg.get("min_points", 500)),
+        winsor_pct=float(beta_cfg.get("winsor_pct", 0.01)),
+    )
+    return {y: pd.Series(b, index=closes.columns) for y, b in res.items()}
+
+def _beta_window(cfg: dict):
+    years = int((cfg.get("beta", {}) or {}).get("years", 3))
+    end = pd.Timestamp.today().normalize()
+    start = end - pd.DateOffset(years=years)
+    return start, end
+
+def _close_series_with_fallback(ticker: str, start: pd.Timestamp, end: pd.Timestamp, provider: str) -> pd.Series:
+    s = _close_series(ticker, start, end, provider)
+    if s.empty and provider != 'polygon' and _polygon_available():
+        s = _close_series(ticker, start, end, 'polygon')
+    return s
+
+def _load_benchmark(cfg: dict, provider: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.Series:
+    bench_sym = (cfg.get("beta", {}) or {}).get("benchmark", "SPY")
+    s_mkt = _close_series_with_fallback(bench_sym, start, end, provider)
+    if s_mkt.empty and bench_sym != "SPY":
+        s_mkt = _close_series_with_fallback("SPY", start, end, provider)
+    return s_mkt
+
+
+class BenchmarkProvider:
+    """
+    Çalışma kapsamlı benchmark kaynağı: benchmark (ve SPY fallback) her
+    sağlayıcı için bir kez yüklenir, worker'lara log kapanış serisi olarak
+    paylaştırılır.
+    """
+
+    def __init__(self, cfg: dict):
+        self.cfg = cfg
+        self.start, self.end = _beta_window(cfg)
+        self._series = {}
+        self._lock = threading.Lock()
 
-def compute_beta_daily_ols(ticker: str, cfg: dict, provider: str = 'polygon'):
+    def log_close(self, provider: str = 'polygon'):
+        provider = (provider or 'polygon').lower()
+        with self._lock:
+            if provider not in self._series:
+                s_mkt = _load_benchmark(self.cfg, provider, self.start, self.end)
+                self._series[provider] = None if s_mkt.empty else np.log(s_mkt)
+            return self._series[provider]
+
+
+def compute_beta_daily_ols(ticker: str, cfg: dict, provider: str = 'polygon', benchmarks: BenchmarkProvider = None):
     beta_cfg = cfg.get("beta", {})
-    bench_sym = beta_cfg.get("benchmark", "SPY")
-    years = int(beta_cfg.get("years", 3))
     min_pts = int(beta_cfg.get("min_points", 500))
     winsor_p = float(beta_cfg.get("winsor_pct", 0.01))
 
-    end = pd.Timestamp.today().normalize()
-    start = end - pd.DateOffset(years=years)
+    if benchmarks is None:
+        benchmarks = BenchmarkProvider(cfg)
+    start, end = benchmarks.start, benchmarks.end
 
-    s_sym = _close_series(ticker, start, end, provider)
-    if s_sym.empty and provider != 'polygon' and _polygon_available():
-        s_sym = _close_series(ticker, start, end, 'polygon')
+    s_sym = _close_series_with_fallback(ticker, start, end, provider)
     if s_sym.empty:
         return None
 
-    s_mkt = _close_series(bench_sym, start, end, provider)
-    if s_mkt.empty and provider != 'polygon' and _polygon_available():
-        s_mkt = _close_series(bench_sym, start, end, 'polygon')
-    if s_mkt.empty and bench_sym != "SPY":
-        s_mkt = _close_series("SPY", start, end, provider)
-        if s_mkt.empty and provider != 'polygon' and _polygon_available():
-            s_mkt = _close_series("SPY", start, end, 'polygon')
-    if s_mkt.empty:
+    lm = benchmarks.log_close(provider)
+    if lm is None:
         return None
 
-    s_mkt = s_mkt.reindex(s_sym.index).ffill()
+    lm = lm.reindex(s_sym.index).ffill()
 
     ri = np.log(s_sym).diff().dropna()
-    rm = np.log(s_mkt).diff().dropna()
+    rm = lm.diff().dropna()
 
     idx = ri.index.intersection(rm.index)
     if len(idx) < min_pts:
         return None
-    ri = ri.loc[idx]
-    rm = rm.loc[idx]
-
-    if winsor_p > 0:
-        ri = _winsorize(ri, winsor_p)
-        rm = _winsorize(rm, winsor_p)
-
-    try:
-        beta = np.polyfit(rm.values, ri.values, 1)[0]
-        return float(beta)
-    except Exception:
-        return None
+    beta = beta_matrix(ri.loc[idx].values, rm.loc[idx].values, min_points=min_pts, winsor_pct=winsor_p)[0]
+    return None if np.isnan(beta) else float(beta)
 
-def compute_beta(ticker: str, cfg: dict, provider: str = 'polygon'):
-    return compute_beta_daily_ols(ticker, cfg, provider)
+def compute_beta(ticker: str, cfg: dict, provider: str = 'polygon', benchmarks: BenchmarkProvider = None):
+    return compute_beta_daily_ols(ticker, cfg, provider, benchmarks)
 
-def compute_beta_polygon(ticker: str, cfg: dict):
-    return compute_beta_daily_ols(ticker, cfg, 'polygon')
+def compute_beta_polygon(ticker: str, cfg: dict, benchmarks: BenchmarkProvider = None):
+    return compute_beta_daily_ols(ticker, cfg, 'polygon', benchmarks)
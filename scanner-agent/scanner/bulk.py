@@ -0,0 +1,169 @@
+"""
+Polygon grouped-daily ile toplu evren yükleme.
+
+Her işlem günü için tek istekle tüm ABD hisselerinin barı çekilir ve
+(tarih × ticker) OHLCV paneli kurulur. Geçmiş günler bar deposunun
+`grouped/` klasöründe gün başına npz olarak saklanır; günlük tazeleme tek
+istek, tam geçmiş doldurma gün başına bir istektir.
+"""
+import os
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+from . import store
+from .polygon_api import poly_get_grouped_daily, poly_get_splits
+from .bars import Bars
+from .utils import ensure_dir, _netlog, epoch_day, day_str
+
+_FIELDS = ("Open", "High", "Low", "Close", "Volume")
+
+
+def _day_path(day: str) -> str:
+    return os.path.join(store.STORE_DIR, "grouped", f"{day}.npz")
+
+
+def _read_day(day: str):
+    path = _day_path(day)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as z:
+            df = pd.DataFrame({c: z[c] for c in _FIELDS})
+            df.insert(0, "Ticker", z["tickers"].astype(str))
+            fetched = int(z["fetched"])
+    except Exception as e:
+        _netlog(f"[bulk warn] {path}: {e}")
+        return None
+    return df, fetched
+
+
+def _write_day(day: str, df: pd.DataFrame, fetched: int):
+    path = _day_path(day)
+    ensure_dir(os.path.dirname(path))
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                tickers=df["Ticker"].to_numpy(dtype=str),
+                fetched=np.int64(fetched),
+                **{c: df[c].to_numpy(dtype=np.float64) for c in _FIELDS},
+            )
+        os.replace(tmp, path)
+    except Exception as e:
+        _netlog(f"[bulk warn] {path}: {e}")
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def _load_day(day: str, today: int):
+    """(df, fetched_day) ya da istek başarısızsa None. Bugün depolanmaz."""
+    past = epoch_day(day) < today
+    if store.STORE_ENABLED and past:
+        cached = _read_day(day)
+        if cached is not None:
+            return cached
+    df = poly_get_grouped_daily(day)
+    if df is None:
+        return None
+    if store.STORE_ENABLED and past:
+        _write_day(day, df, today)
+    return df, today
+
+
+class BulkPanel:
+    """(tarih × ticker) OHLCV dizileri; ticker başına Bars dilimleri verir."""
+
+    def __init__(self, dates: pd.DatetimeIndex, tickers: pd.Index, fields: dict):
+        self.dates = dates
+        self.tickers = tickers
+        self.fields = fields
+
+    @property
+    def closes(self) -> pd.DataFrame:
+        return pd.DataFrame(self.fields["Close"], index=self.dates, columns=self.tickers)
+
+    def close_series(self, ticker: str) -> pd.Series:
+        if ticker not in self.tickers:
+            return pd.Series(dtype=float)
+        return self.closes[ticker].dropna()
+
+    def bars(self, ticker: str, _from: str = None) -> Bars:
+        j = self.tickers.get_indexer([ticker])[0]
+        if j < 0:
+            return Bars.empty(ticker)
+        rows = np.isfinite(self.fields["Close"][:, j])
+        if _from:
+            rows &= self.dates >= pd.Timestamp(_from)
+        days = (self.dates[rows] - pd.Timestamp("1970-01-01")).days
+        f = self.fields
+        return Bars(ticker, days, f["Open"][rows, j], f["High"][rows, j], f["Low"][rows, j],
+                    f["Close"][rows, j], f["Volume"][rows, j])
+
+
+def _apply_splits(panel: BulkPanel, fetched: np.ndarray, splits: list, today: int):
+    """
+    Split'ten önce çekilmiş (eski düzeltmeli) günleri yeni orana çeker.
+    Henüz gerçekleşmemiş (duyurulmuş, ex > bugün) split'ler atlanır.
+    """
+    day_idx = np.array([epoch_day(d) for d in panel.dates], dtype=np.int64)
+    for sp in splits:
+        t = str(sp.get("ticker", "")).replace(".", "-")
+        j = panel.tickers.get_indexer([t])[0]
+        try:
+            ex = epoch_day(sp["execution_date"])
+            ratio = float(sp["split_from"]) / float(sp["split_to"])
+        except Exception:
+            continue
+        if j < 0 or ratio <= 0 or ex > today:
+            continue
+        rows = (day_idx < ex) & (fetched < ex)
+        if not rows.any():
+            continue
+        for c in ("Open", "High", "Low", "Close"):
+            panel.fields[c][rows, j] *= ratio
+        panel.fields["Volume"][rows, j] /= ratio
+
+
+def load_panel(_from: str, _to: str, tickers, workers: int = 8) -> BulkPanel:
+    """
+    [_from, _to] iş günleri için grouped-daily panelini kurar; yalnızca
+    `tickers` kolon olarak tutulur. Bar gelmeyen günler (tatiller) atılır.
+    """
+    today = epoch_day(datetime.date.today())
+    days = [d.strftime("%Y-%m-%d") for d in pd.bdate_range(_from, _to) if epoch_day(d) <= today]
+    universe = pd.Index(sorted(set(tickers)))
+
+    with ThreadPoolExecutor(max_workers=max(1, int(workers))) as ex:
+        loaded = list(ex.map(lambda d: _load_day(d, today), days))
+
+    failed = [d for d, got in zip(days, loaded) if got is None]
+    if failed:
+        _netlog(f"[bulk warn] {len(failed)} gün çekilemedi: {', '.join(failed[:5])}")
+
+    kept = [(d, got) for d, got in zip(days, loaded) if got is not None and not got[0].empty]
+    shape = (len(kept), len(universe))
+    fields = {c: np.full(shape, np.nan) for c in _FIELDS}
+    fetched = np.full(len(kept), today, dtype=np.int64)
+    for i, (_d, (df, f_day)) in enumerate(kept):
+        pos = universe.get_indexer(df["Ticker"])
+        hit = pos >= 0
+        for c in _FIELDS:
+            fields[c][i, pos[hit]] = df[c].to_numpy(dtype=np.float64)[hit]
+        fetched[i] = f_day
+
+    panel = BulkPanel(pd.DatetimeIndex([pd.Timestamp(d) for d, _ in kept]), universe, fields)
+
+    stale = fetched < today
+    if stale.any():
+        splits = poly_get_splits(day_str(int(fetched[stale].min())), day_str(today))
+        if splits is None:
+            _netlog("[bulk warn] split listesi alınamadı; eski günler düzeltilmeden kullanılıyor")
+        else:
+            _apply_splits(panel, fetched, splits, today)
+    return panel
@@ -0,0 +1,337 @@
+"""
+Çalışma süresince tutulan, ticker başına kapsanan tarih aralıklarını bilen
+fiyat geçmişi önbelleği ve eşzamanlı aynı istekleri birleştiren
+single-flight katmanı.
+
+Aynı ticker için farklı pencereler (worker: --lookback, beta: 3 yıl) tek bir
+çekimin dilimlerinden servis edilir; eksik kısım varsa kapsama tek bir
+çekimle genişletilir.
+"""
+import asyncio
+import collections
+import functools
+import threading
+import numpy as np
+import pandas as pd
+
+from .bars import Bars
+from .utils import epoch_day, day_str, run_steps, run_steps_async, hold_async
+
+# Çalışma genelinde istenecek en eski gün; ilk çekim buraya kadar genişletilir
+HISTORY_FLOOR = None
+
+
+def set_history_floor(start):
+    global HISTORY_FLOOR
+    HISTORY_FLOOR = None if start is None else epoch_day(start)
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Aynı anahtar için eşzamanlı çağrıları tek çekimde birleştirir: ilk gelen
+    çekimi yapar, o sürerken gelenler bekleyip aynı sonucu (ya da hatayı)
+    alır. Sonuç saklanmaz; önbellek üst katmanın işidir (lru_cache, RangeCache).
+    `suppressed` anahtarın ilk elemanına (istek türü) göre bastırılan kopya
+    istek sayısıdır.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self.suppressed = collections.Counter()
+
+    def note(self, kind: str):
+        with self._lock:
+            self.suppressed[kind] += 1
+
+    def do(self, key: tuple, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.suppressed[key[0]] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+        try:
+            call.value = fn()
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: tuple, afn):
+        """do'nun asyncio karşılığı (tek event loop); afn coroutine fonksiyonudur."""
+        task = self._tasks.get(key)
+        if task is not None:
+            self.note(key[0])
+            return await asyncio.shield(task)
+        task = self._tasks[key] = asyncio.ensure_future(afn())
+        try:
+            return await task
+        finally:
+            self._tasks.pop(key, None)
+
+    def total(self) -> int:
+        return sum(self.suppressed.values())
+
+    def summary(self) -> str:
+        parts = ", ".join(f"{k} {n}" for k, n in self.suppressed.most_common())
+        return f"{self.total()} kopya istek bastırıldı" + (f" ({parts})" if parts else "")
+
+
+FLIGHT = SingleFlight()
+
+
+def single_flight(kind: str):
+    """Fonksiyonu FLIGHT üzerinden çağırır; anahtar (kind, *args)."""
+    def deco(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def awrapper(*args):
+                return await FLIGHT.do_async((kind,) + args, lambda: fn(*args))
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args):
+            return FLIGHT.do((kind,) + args, lambda: fn(*args))
+        return wrapper
+    return deco
+
+
+def _subtract(lo: int, hi: int, spans: list) -> list:
+    """[lo, hi] aralığından kapsanan span'leri çıkarır; eksik parçaları döndürür."""
+    missing = []
+    cur = lo
+    for s_lo, s_hi in spans:
+        if s_hi < cur:
+            continue
+        if s_lo > hi:
+            break
+        if s_lo > cur:
+            missing.append((cur, s_lo - 1))
+        cur = max(cur, s_hi + 1)
+        if cur > hi:
+            break
+    if cur <= hi:
+        missing.append((cur, hi))
+    return missing
+
+
+def _add_span(spans: list, lo: int, hi: int) -> list:
+    out = []
+    for s_lo, s_hi in sorted(spans + [(lo, hi)]):
+        if out and s_lo <= out[-1][1] + 1:
+            out[-1] = (out[-1][0], max(out[-1][1], s_hi))
+        else:
+            out.append((s_lo, s_hi))
+    return out
+
+
+# bellek önbelleğinin bayt bütçesi (CLI: --cache-mb)
+HISTORY_MAX_BYTES = 256 * 1024 * 1024
+
+
+def set_history_budget(max_bytes: int):
+    global HISTORY_MAX_BYTES
+    HISTORY_MAX_BYTES = max(0, int(max_bytes))
+    HISTORY.trim()
+
+
+_FIELDS = ("Open", "High", "Low", "Close", "Volume")
+_EPOCH = pd.Timestamp("1970-01-01")
+
+
+class _Entry:
+    """Bir ticker'ın barları: gün (int64) + OHLCV (float64) dizileri ve kapsanan aralıklar."""
+    __slots__ = ("days", "fields", "spans", "nbytes")
+
+    def __init__(self, days, fields: dict, spans: list):
+        self.days = days
+        self.fields = fields
+        self.spans = spans
+        self.nbytes = days.nbytes + sum(a.nbytes for a in fields.values())
+
+
+class RangeCache:
+    """
+    (provider, ticker) -> barlar + kapsanan [lo, hi] gün aralıkları.
+    Toplam dizi boyutu HISTORY_MAX_BYTES'ı aşınca en uzun süredir
+    kullanılmayan ticker atılır (LRU); atılan ticker'ın sonraki isteği bar
+    deposundan yeniden yüklenir.
+    """
+
+    def __init__(self):
+        self._data = collections.OrderedDict()
+        self._locks = {}
+        self._guard = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lock_for(self, key):
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def clear(self):
+        with self._guard:
+            self._data.clear()
+            self.bytes = 0
+
+    def _lookup(self, key):
+        with self._guard:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def _store(self, key, entry: _Entry):
+        with self._guard:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old.nbytes
+            self._data[key] = entry
+            self.bytes += entry.nbytes
+            self._evict()
+
+    def _evict(self):
+        # son eklenen her zaman kalır; tek ticker bütçeyi aşsa bile istek servis edilir
+        while self.bytes > HISTORY_MAX_BYTES and len(self._data) > 1:
+            _key, entry = self._data.popitem(last=False)
+            self.bytes -= entry.nbytes
+            self.evictions += 1
+
+    def trim(self):
+        with self._guard:
+            self._evict()
+
+    def stats(self) -> dict:
+        with self._guard:
+            return {
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(self._data), "bytes": self.bytes, "max_bytes": HISTORY_MAX_BYTES,
+            }
+
+    def summary(self) -> str:
+        st = self.stats()
+        total = st["hits"] + st["misses"]
+        rate = 100.0 * st["hits"] / total if total else 0.0
+        return (f"{st['hits']} isabet, {st['misses']} ıska (%{rate:.0f} isabet), "
+                f"{st['evictions']} tahliye, {st['entries']} ticker, "
+                f"{st['bytes'] / 2**20:.1f}/{st['max_bytes'] / 2**20:.0f} MB")
+
+    def _steps(self, key, lo: int, hi: int, contended: bool = False):
+        entry = self._lookup(key)
+        spans = entry.spans if entry is not None else []
+        missing = _subtract(lo, hi, spans)
+        with self._guard:
+            if missing:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if contended and not missing:
+            # başka bir çağrının sürmekte olan çekimi bu isteği de karşıladı
+            FLIGHT.note("history")
+        if missing:
+            f_lo, f_hi = missing[0][0], missing[-1][1]
+            if HISTORY_FLOOR is not None and HISTORY_FLOOR < f_lo and not spans:
+                f_lo = HISTORY_FLOOR
+            got = yield (day_str(f_lo), day_str(f_hi))
+            # başarısız / eksik çekim kapsam sayılmaz; sonraki aşama yeniden dener
+            complete = got is not None and not got.attrs.get("partial")
+            entry = _merge(entry, got, _add_span(spans, f_lo, f_hi) if complete else spans)
+            self._store(key, entry)
+        return entry
+
+    @staticmethod
+    def _slice(entry: _Entry, lo: int, hi: int) -> pd.DataFrame:
+        i, j = np.searchsorted(entry.days, [lo, hi + 1])
+        df = pd.DataFrame({c: entry.fields[c][i:j] for c in _FIELDS})
+        df.insert(0, "Date", _EPOCH + pd.to_timedelta(entry.days[i:j], unit="D"))
+        return df
+
+    @staticmethod
+    def _slice_bars(entry: _Entry, lo: int, hi: int, ticker: str) -> Bars:
+        i, j = np.searchsorted(entry.days, [lo, hi + 1])
+        f = entry.fields
+        return Bars(ticker, entry.days[i:j], f["Open"][i:j], f["High"][i:j],
+                    f["Low"][i:j], f["Close"][i:j], f["Volume"][i:j])
+
+    def _entry(self, key, lo: int, hi: int, fetch) -> _Entry:
+        lock = self._lock_for(key)
+        contended = not lock.acquire(blocking=False)
+        if contended:
+            lock.acquire()
+        try:
+            return run_steps(self._steps(key, lo, hi, contended), fetch)
+        finally:
+            lock.release()
+
+    async def _entry_async(self, key, lo: int, hi: int, afetch) -> _Entry:
+        async with hold_async(self._lock_for(key)) as contended:
+            return await run_steps_async(self._steps(key, lo, hi, contended), afetch)
+
+    def get(self, key, start: str, end: str, fetch) -> pd.DataFrame:
+        """
+        fetch(start, end) -> Date + OHLCV içeren DataFrame (ekstra kolonlar
+        atılır). Dönen frame [start, end] dilimidir; kopyadır.
+        """
+        lo, hi = epoch_day(start), epoch_day(end)
+        return self._slice(self._entry(key, lo, hi, fetch), lo, hi)
+
+    async def get_async(self, key, start: str, end: str, afetch) -> pd.DataFrame:
+        """get'in asyncio karşılığı; afetch bir coroutine fonksiyonudur."""
+        lo, hi = epoch_day(start), epoch_day(end)
+        return self._slice(await self._entry_async(key, lo, hi, afetch), lo, hi)
+
+    def get_bars(self, key, start: str, end: str, fetch) -> Bars:
+        """get gibi; DataFrame yerine Bars (ticker = key[1])."""
+        lo, hi = epoch_day(start), epoch_day(end)
+        return self._slice_bars(self._entry(key, lo, hi, fetch), lo, hi, key[1])
+
+    async def get_bars_async(self, key, start: str, end: str, afetch) -> Bars:
+        lo, hi = epoch_day(start), epoch_day(end)
+        return self._slice_bars(await self._entry_async(key, lo, hi, afetch), lo, hi, key[1])
+
+
+def _merge(entry, new, spans: list) -> _Entry:
+    """Yeni barları entry'ye ekler; aynı gün için yeni çekim kazanır, günler sıralı kalır."""
+    if entry is None:
+        days = np.empty(0, dtype=np.int64)
+        fields = {c: np.empty(0, dtype=np.float64) for c in _FIELDS}
+    else:
+        days, fields = entry.days, entry.fields
+    if new is not None and not new.empty:
+        new_days = ((pd.to_datetime(new["Date"]).dt.normalize() - _EPOCH).dt.days).to_numpy(dtype=np.int64)
+        all_days = np.concatenate([days, new_days])
+        # ters sırada ilk görülen = en son eklenen
+        uniq, first = np.unique(all_days[::-1], return_index=True)
+        take = len(all_days) - 1 - first
+        days = uniq
+        fields = {c: np.concatenate([fields[c], new[c].to_numpy(dtype=np.float64)])[take] for c in _FIELDS}
+    return _Entry(days, fields, spans)
+
+
+HISTORY = RangeCache()
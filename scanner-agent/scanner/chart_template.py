@@ -0,0 +1,315 @@
+"""
+Yeniden kullanılan grafik şablonu.
+
+plot_ticker_stockcharts her grafikte mpf stilini, figürü, eksenleri,
+legend'ı ve formatter'ları baştan kurar ve bbox_inches="tight" ile kaydeder.
+ChartTemplate aynı yerleşimi (fiyat 6 : hacim 2 : StochRSI 2, mpf stili) süreç
+başına bir kez kurar; her ticker için yalnızca artist verileri (mum
+poligonları, fitiller, hacim çubukları, MA / K / D çizgileri, başlık, FAIL
+filigranı) ve eksen sınırları güncellenir, PNG sabit boyutta kaydedilir.
+render_ticker, plot_ticker_stockcharts ile aynı imzayı taşır.
+"""
+import os
+os.environ["MPLBACKEND"] = "Agg"
+
+import json
+import zlib
+import struct
+import numpy as np
+import matplotlib as mpl
+import matplotlib.style as mstyle
+import mplfinance as mpf
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection, LineCollection
+from matplotlib.colors import to_rgba_array
+from matplotlib.lines import Line2D
+from matplotlib.ticker import FuncFormatter, MaxNLocator
+
+from .utils import ensure_dir, _netlog, day_str
+from .indicators import ta_sma, stochrsi
+from .bars import Bars
+from .plotting import PLOT_LOCK, _fmt_millions, _log_plot_error
+
+try:
+    from mplfinance._widths import _dfinterpolate, _widths
+except ImportError:  # pragma: no cover - mplfinance iç API'si değişirse
+    _dfinterpolate = _widths = None
+
+# mpf.plot(figratio=(16, 9), figscale=1.05) figür boyutu; panel yerleşimi
+# tight_layout sonrası görünüme göre sabit (bbox hesabı yapılmaz)
+FIGSIZE = (10.7333, 6.0375)
+DPI = 140
+# PNG zlib seviyesi (PIL'in varsayılanı 6): ~%15 büyük dosya, yarı süre
+PNG_COMPRESS = 3
+_LEFT, _WIDTH = 0.03, 0.875
+_PANELS = {  # (alt, yükseklik)
+    "price": (0.46, 0.495),
+    "volume": (0.295, 0.165),
+    "stoch": (0.13, 0.165),
+}
+
+
+def _widths_for(n: int):
+    """mpf'in bar sayısına göre mum / hacim genişlikleri."""
+    if _widths is None:
+        return 0.42, 0.44, 0.88
+    return (float(_dfinterpolate(_widths, n, "cw")), float(_dfinterpolate(_widths, n, "clw")),
+            float(_dfinterpolate(_widths, n, "vw")))
+
+
+def _style_of(cfg: dict):
+    """plot_ticker_stockcharts ile aynı mpf stili ve parametreleri."""
+    trn = (cfg.get("trend") or {}) if isinstance(cfg, dict) else {}
+    mom = (cfg.get("momentum") or {}) if isinstance(cfg, dict) else {}
+    opts = (cfg.get("options") or {}) if isinstance(cfg, dict) else {}
+    style_cfg = opts.get("style") or {}
+    base_style = "classic"
+    if isinstance(style_cfg, dict) and style_cfg.get("base_mpf_style"):
+        base_style = style_cfg["base_mpf_style"]
+    mc = mpf.make_marketcolors(up="g", down="r", edge="inherit", wick="inherit", volume="inherit")
+    style_kwargs = {"marketcolors": mc, "gridstyle": ":", "y_on_right": True}
+    if isinstance(style_cfg, dict):
+        style_kwargs.update({k: v for k, v in style_cfg.items() if k != "base_mpf_style"})
+    style = mpf.make_mpf_style(base_mpf_style=base_style, **style_kwargs)
+    params = {
+        "ma_mid": int(trn.get("ma_mid", 50)),
+        "ma_slow": int(trn.get("ma_slow", 200)),
+        "rsi_len": int(mom.get("rsi_len", mom.get("stochrsi_len", 14))),
+        "k": int(mom.get("stochrsi_k", mom.get("k", 3))),
+        "d": int(mom.get("stochrsi_d", mom.get("d", 3))),
+    }
+    return style, params, opts.get("facecolor")
+
+
+def _template_key(cfg: dict) -> str:
+    if not isinstance(cfg, dict):
+        return ""
+    return json.dumps({k: cfg.get(k) for k in ("trend", "momentum", "options")}, sort_keys=True, default=str)
+
+
+class ChartTemplate:
+    """Tek figür; render(bars, out_path, fail_reason) ile ticker başına yeniden çizilir."""
+
+    def __init__(self, cfg: dict):
+        style, self.params, face = _style_of(cfg)
+        mc = style["marketcolors"]
+        self._rc = dict(style.get("rc") or [])
+        self._base = style.get("base_mpl_style")
+        self._up = {k: mc[k]["up"] for k in ("candle", "edge", "wick", "volume")}
+        self._down = {k: mc[k]["down"] for k in ("candle", "edge", "wick", "volume")}
+        self._dates = np.empty(0, dtype=np.int64)
+        with self._context():
+            self._build(style, face)
+
+    def _context(self):
+        ctx = mstyle.context(self._base) if self._base else mpl.rc_context()
+        return _Stacked(ctx, mpl.rc_context(self._rc))
+
+    def _build(self, style, face):
+        p = self.params
+        fig = Figure(figsize=FIGSIZE, dpi=DPI, facecolor=face or style.get("figcolor") or style.get("facecolor"))
+        FigureCanvasAgg(fig)
+        axes = {}
+        for name, (bottom, height) in _PANELS.items():
+            ax = fig.add_axes((_LEFT, bottom, _WIDTH, height), sharex=axes.get("price"))
+            ax.set_facecolor(face or style.get("facecolor"))
+            ax.grid(True, color=style.get("gridcolor"), linestyle=style.get("gridstyle"))
+            ax.set_axisbelow(True)
+            if style.get("y_on_right"):
+                ax.yaxis.tick_right()
+                ax.yaxis.set_label_position("right")
+            if name != "stoch":
+                ax.tick_params(labelbottom=False)
+            axes[name] = ax
+        ax_p, ax_v, ax_s = axes["price"], axes["volume"], axes["stoch"]
+
+        self.wicks = LineCollection([], zorder=2)
+        self.bodies = PolyCollection([], zorder=3)
+        ax_p.add_collection(self.wicks)
+        ax_p.add_collection(self.bodies)
+        self.ma_mid, = ax_p.plot([], [], color="#1f77b4", lw=1.2)
+        self.ma_slow, = ax_p.plot([], [], color="#d62728", lw=1.2)
+        ax_p.set_ylabel("Price")
+        ax_p.legend(handles=[
+            Line2D([0], [0], color="#1f77b4", lw=2, label=f"MA({p['ma_mid']})"),
+            Line2D([0], [0], color="#d62728", lw=2, label=f"MA({p['ma_slow']})"),
+        ], loc="upper left", frameon=False)
+
+        self.volume = PolyCollection([], alpha=0.35, zorder=2)
+        ax_v.add_collection(self.volume)
+        ax_v.set_ylabel("Volume", fontsize="medium")
+        ax_v.yaxis.set_major_locator(MaxNLocator(nbins=4, steps=[1, 2, 5, 10], prune="lower"))
+        ax_v.yaxis.set_major_formatter(FuncFormatter(_fmt_millions))
+
+        self.k_line, = ax_s.plot([], [], color="#1f77b4", lw=1.0)
+        self.d_line, = ax_s.plot([], [], color="#7f7f7f", lw=1.0)
+        self.k_fill = PolyCollection([], facecolors="green", alpha=0.18, linewidths=0)
+        ax_s.add_collection(self.k_fill)
+        ax_s.axhline(0.2, linestyle="--", linewidth=1, color="#ccc")
+        ax_s.axhline(0.8, linestyle="--", linewidth=1, color="#ccc")
+        ax_s.set_ylim(-0.05, 1.05)
+        ax_s.set_ylabel("StochRSI", fontsize="medium")
+        ax_s.xaxis.set_major_locator(MaxNLocator(nbins=9, integer=True))
+        ax_s.xaxis.set_major_formatter(FuncFormatter(self._fmt_date))
+        ax_s.tick_params(axis="x", labelrotation=45)
+        ax_s.set_yticks([0.0, 0.5, 1.0])
+
+        self.title = fig.suptitle("", fontsize=11, y=0.98)
+        self.fail = fig.text(
+            0.985, 0.015, "", fontsize=10, color="red", ha="right", va="bottom",
+            alpha=0.9, fontweight="bold",
+            bbox=dict(facecolor="white", alpha=0.6, edgecolor="none", pad=2.5),
+        )
+        self.fig, self.ax_price, self.ax_vol, self.ax_stoch = fig, ax_p, ax_v, ax_s
+
+    def _fmt_date(self, x, pos):
+        i = int(round(x))
+        if i < 0 or i >= len(self._dates):
+            return ""
+        d = day_str(self._dates[i])
+        return f"{_MONTHS[int(d[5:7]) - 1]} {d[8:10]}"
+
+    def _colors(self, up, key):
+        return np.where(up[:, None], to_rgba_array(self._up[key]), to_rgba_array(self._down[key]))
+
+    def render(self, bars: Bars, out_path: str, fail_reason: str = None):
+        p = self.params
+        n = len(bars)
+        x = np.arange(n, dtype=np.float64)
+        o, h, l, c = (a.astype(np.float64) for a in (bars.open, bars.high, bars.low, bars.close))
+        vol = bars.volume
+        up = c >= o
+        cw, clw, vw = _widths_for(n)
+
+        lo, hi = np.minimum(o, c), np.maximum(o, c)
+        x0, x1 = x - cw / 2, x + cw / 2
+        self.bodies.set_verts(np.stack([np.column_stack([x0, lo]), np.column_stack([x0, hi]),
+                                        np.column_stack([x1, hi]), np.column_stack([x1, lo])], axis=1))
+        self.bodies.set_facecolors(self._colors(up, "candle"))
+        self.bodies.set_edgecolors(self._colors(up, "edge"))
+        self.bodies.set_linewidths(clw)
+        self.wicks.set_segments(np.stack([np.column_stack([x, l]), np.column_stack([x, h])], axis=1))
+        self.wicks.set_colors(self._colors(up, "wick"))
+        self.wicks.set_linewidths(clw)
+
+        v0, v1 = x - vw / 2, x + vw / 2
+        z = np.zeros(n)
+        self.volume.set_verts(np.stack([np.column_stack([v0, z]), np.column_stack([v0, vol]),
+                                        np.column_stack([v1, vol]), np.column_stack([v1, z])], axis=1))
+        self.volume.set_facecolors(self._colors(up, "volume"))
+        self.volume.set_alpha(0.35)
+
+        self.ma_mid.set_data(x, ta_sma(bars.close, p["ma_mid"]))
+        self.ma_slow.set_data(x, ta_sma(bars.close, p["ma_slow"]))
+        _rsi, k_line, d_line = stochrsi(bars.close, rsi_len=p["rsi_len"], k=p["k"], d=p["d"])
+        k_vals = np.asarray(k_line, dtype=np.float64)
+        self.k_line.set_data(x, k_vals)
+        self.d_line.set_data(x, d_line)
+        self.k_fill.set_verts(_band_polys(x, k_vals, 0.8, above=True) + _band_polys(x, k_vals, 0.2, above=False))
+
+        span = max(float(h.max() - l.min()), 1e-9)
+        self.ax_price.set_xlim(-0.5 - 0.05 * cw, n - 0.5 + 0.05 * cw)
+        self.ax_price.set_ylim(l.min() - 0.01 * span, h.max() + 0.01 * span)
+        self.ax_vol.set_ylim(0, max(float(vol.max()), 1.0) * 1.05)
+        self._dates = bars.days
+
+        self.title.set_text(str(bars.ticker))
+        self.fail.set_text(f"FAIL: {fail_reason}" if fail_reason else "")
+        self.fail.set_visible(bool(fail_reason))
+        with self._context():
+            self.fig.canvas.draw()
+        _write_png(out_path, np.asarray(self.fig.canvas.buffer_rgba())[..., :3])
+
+
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+
+def _write_png(path: str, rgb: np.ndarray):
+    """
+    Opak RGB tamponu filtresiz PNG olarak yazar; savefig/PIL'in satır başına
+    uyarlamalı filtre denemesi yapılmaz.
+    """
+    h, w, _ = rgb.shape
+    raw = np.zeros((h, w * 3 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgb.reshape(h, -1)
+    data = b"".join((
+        b"\x89PNG\r\n\x1a\n",
+        _png_chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0)),
+        _png_chunk(b"IDAT", zlib.compress(raw.tobytes(), PNG_COMPRESS)),
+        _png_chunk(b"IEND", b""),
+    ))
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _band_polys(x, y, level: float, above: bool):
+    """fill_between(x, level, y, where=y>=level / y<=level) poligonları."""
+    with np.errstate(invalid="ignore"):
+        mask = (y >= level) if above else (y <= level)
+    if not mask.any():
+        return []
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], mask.view(np.int8), [0]])))
+    polys = []
+    for a, b in zip(edges[::2], edges[1::2]):
+        xs, ys = x[a:b], y[a:b]
+        polys.append(np.column_stack([np.concatenate([xs, xs[::-1]]),
+                                      np.concatenate([ys, np.full(len(xs), level)])]))
+    return polys
+
+
+class _Stacked:
+    """İki context manager'ı sırayla açar."""
+
+    def __init__(self, outer, inner):
+        self.outer, self.inner = outer, inner
+
+    def __enter__(self):
+        self.outer.__enter__()
+        try:
+            self.inner.__enter__()
+        except Exception:
+            self.outer.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            self.inner.__exit__(*exc)
+        finally:
+            self.outer.__exit__(*exc)
+        return False
+
+
+# süreç başına şablonlar (stil ayarı -> ChartTemplate)
+_TEMPLATES = {}
+
+
+def template_for(cfg: dict) -> ChartTemplate:
+    key = _template_key(cfg)
+    tpl = _TEMPLATES.get(key)
+    if tpl is None:
+        tpl = _TEMPLATES[key] = ChartTemplate(cfg)
+    return tpl
+
+
+def render_ticker(bars, cfg, out_dir: str, fail_reason: str = None):
+    """plot_ticker_stockcharts'ın şablonlu karşılığı: out_dir/<TICKER>.png."""
+    ensure_dir(out_dir)
+    if not isinstance(bars, Bars):
+        bars = Bars.from_frame(bars)
+    if len(bars) < 10:
+        return
+    tkr = str(bars.ticker)
+    with PLOT_LOCK:
+        try:
+            template_for(cfg).render(bars, os.path.join(out_dir, f"{tkr}.png"), fail_reason)
+        except Exception as e:
+            _log_plot_error(out_dir, tkr, e)
+            _netlog(f"[plot warn] {tkr}: {e}")
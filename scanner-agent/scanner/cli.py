@@ -1,7 +1,9 @@
 import os
+import sys
+import json
 import argparse, csv
+import numpy as np
 import pandas as pd
-from concurrent.futures import ThreadPoolExecutor
 
 try:
     from rich.progress import (
@@ -58,8 +60,46 @@ except ImportError:  # pragma: no cover - fallback for minimal envs
 from .config import load_cfg
 from .tickers import load_tickers
 from .utils import ensure_dir, set_quiet, _netlog
-from .net import set_http
-from .worker import process_ticker
+from .net import set_http, set_rate_limit, set_adaptive
+from .anet import set_host_limit
+from .store import set_store
+from .cache import set_history_floor, set_history_budget, HISTORY, FLIGHT
+from .worker import data_provider_for, metric_params
+from .render import ChartPool
+from .runs import CSV_COLUMNS, save_run, refilter_run, save_snapshot, render_run_chart
+from .pipeline import scan_universe
+from .beta import BenchmarkProvider
+
+def _bulk_prefetch(tickers, history_start, _from, _to, cfg, benchmarks, workers):
+    from .bulk import load_panel
+    from .beta import universe_betas
+
+    bench_sym = (cfg.get("beta", {}) or {}).get("benchmark", "SPY")
+    print(f"Bulk: grouped-daily paneli yükleniyor ({history_start} → {_to})...", flush=True)
+    panel = load_panel(history_start, _to, list(tickers) + [bench_sym, "SPY"], workers=workers)
+
+    bench_close = panel.close_series(bench_sym)
+    if bench_close.empty:
+        bench_close = panel.close_series("SPY")
+    if bench_close.empty:
+        lm = benchmarks.log_close("polygon")
+        bench_close = pd.Series(dtype=float) if lm is None else np.exp(lm)
+
+    betas = None
+    if not bench_close.empty:
+        years = int((cfg.get("beta", {}) or {}).get("years", 3))
+        cols = [t for t in tickers if t in panel.tickers]
+        betas = universe_betas(panel.closes[cols], bench_close, cfg, years=(years,))[years]
+
+    out = {}
+    for t in tickers:
+        b = None if betas is None else betas.get(t)
+        out[t] = {
+            "bars": panel.bars(t, _from),
+            "beta": None if b is None or np.isnan(b) else float(b),
+        }
+    print(f"Bulk: {len(panel.dates)} gün × {len(panel.tickers)} ticker hazır.", flush=True)
+    return out
 
 def main():
     parser = argparse.ArgumentParser(allow_abbrev=False)
@@ -71,10 +111,29 @@ def main():
     parser.add_argument("--http-timeout", type=float, default=8.0, help="HTTP timeout (s)")
     parser.add_argument("--max-retries", type=int, default=2, help="HTTP retry sayısı")
     parser.add_argument("--workers", type=int, default=16, help="Paralel iş parçacığı sayısı")
+    parser.add_argument("--max-inflight", type=int, default=64,
+                        help="Host başına uyarlamalı (AIMD) eşzamanlılığın üst sınırı (0 = kapalı)")
+    parser.add_argument("--poly-rate", type=float, default=50.0, help="Polygon istek/sn üst sınırı (0 = sınırsız)")
+    parser.add_argument("--yahoo-rate", type=float, default=10.0, help="Yahoo istek/sn üst sınırı (0 = sınırsız)")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Ağ isteklerini thread yerine tek event loop'ta (asyncio) yürüt")
+    parser.add_argument("--async-limit", type=int, default=64, help="Async modda host başına eşzamanlı istek sayısı")
+    parser.add_argument("--store-dir", type=str, default=os.path.join(".cache", "bars"), help="Yerel bar deposu klasörü")
+    parser.add_argument("--cache-mb", type=int, default=256, help="Bellekteki fiyat önbelleğinin üst sınırı (MB)")
+    parser.add_argument("--no-store", action="store_true", help="Yerel bar deposunu kapat (her aralığı sağlayıcıdan çek)")
+    parser.add_argument("--bulk", action="store_true", help="Polygon grouped-daily ile gün başına tek istekte tüm evreni yükle")
 
     # output kontrolü
     parser.add_argument("--out-dir", type=str, default="results", help="Çıktıların kök klasörü (default: results)")
     parser.add_argument("--no-charts", action="store_true", help="Grafik üretimini kapat")
+    parser.add_argument("--charts", dest="chart_mode", choices=("all", "accepted", "lazy"), default="all",
+                        help="all: her ticker için PNG; accepted: yalnızca geçenler için PNG, diğerleri "
+                             "bar snapshot'ından istendiğinde; lazy: hiç PNG yok, yalnızca snapshot + manifest")
+    parser.add_argument("--render", nargs=2, metavar=("RUN_DIR", "TICKER"), default=None,
+                        help="Ertelenmiş moddaki bir çalışmadan tek ticker'ın grafiğini çiz (JSON çıktı)")
+    parser.add_argument("--portfolio", metavar="DB", default=None,
+                        help="portfolio.sqlite işlem defterinden NAV / K/Z / drawdown / beta analizi (JSON çıktı)")
+    parser.add_argument("--chart-procs", type=int, default=0, help="Grafik çizen süreç sayısı (0 = CPU sayısı)")
     parser.add_argument("--keep-delisted", action="store_true", help="Polygon boşsa yine de devam et (yavaş)")
 
     # veri sağlayıcı opsiyonları
@@ -82,12 +141,23 @@ def main():
     parser.add_argument("--no-analyst", action="store_true", help="Analyst rating çekmeyi kapat (Yahoo)")
 
     # CSV & plotting davranışı
-    # --write-all kaldırıldı; tüm komutlar artık "write-all" davranışında çalışır.
+    # Tüm tickerlar için satır + grafik her zaman yazılır. --write-all ayrıca elenen
+    # tickerlar için de pahalı aşamaları (beta, profil, analist, earnings) çalıştırıp
+    # CSV kolonlarını eksiksiz doldurur; verilmezse ilk elendiği aşamada durulur.
+    parser.add_argument("--write-all", action="store_true", help="Elenen tickerlar için de tüm kolonları doldur (aşama kısa devresini kapatır)")
+    parser.add_argument("--refilter", type=str, default=None, metavar="RUN_DIR",
+                        help="Ağa çıkmadan, RUN_DIR'deki kayıtlı metriklere güncel filters.yaml'ı yeniden uygula")
 
     args = parser.parse_args()
 
     # global io/net flags
     set_http(args.http_timeout, args.max_retries)
+    set_host_limit(args.async_limit)
+    set_rate_limit("polygon", args.poly_rate)
+    set_adaptive(args.max_inflight, enabled=args.max_inflight > 0)
+    set_rate_limit("yahoo", args.yahoo_rate)
+    set_store(args.store_dir, enabled=not args.no_store)
+    set_history_budget(args.cache_mb * 1024 * 1024)
     set_quiet(args.quiet)
 
     cfg = load_cfg()
@@ -95,6 +165,46 @@ def main():
     if bool(opts.get("quiet_warnings", False)) or args.quiet:
         set_quiet(True)
 
+    if args.render:
+        run_dir, ticker = args.render
+        try:
+            path = render_run_chart(run_dir, ticker.strip().upper())
+        except Exception as e:
+            print(json.dumps({"error": str(e)}))
+            sys.exit(1)
+        print(json.dumps({"ticker": ticker.strip().upper(), "path": os.path.abspath(path)}))
+        return
+
+    if args.portfolio:
+        from .portfolio import portfolio_report
+        # stdout yalnızca JSON taşır
+        set_quiet(True)
+        try:
+            report = portfolio_report(args.portfolio, cfg, workers=args.workers)
+        except Exception as e:
+            print(json.dumps({"error": str(e)}))
+            sys.exit(1)
+        print(json.dumps(report))
+        return
+
+    if args.refilter:
+        try:
+            n_pass, n_changed, n_status, n_pending, n_charts = refilter_run(
+                args.refilter, cfg, make_charts=not args.no_charts)
+        except ValueError as e:
+            print(f"Refilter iptal -> {args.refilter}: {e}")
+            sys.exit(1)
+        if n_charts is None:
+            chart_note = (f"{n_changed} sonuç değişti, grafikler yeniden çizilemedi "
+                          f"(--bulk / --no-store çalışması: yerel bar yok)")
+        else:
+            chart_note = f"{n_changed} sonuç değişti, {n_charts} grafik güncellendi"
+        print(f"Refilter -> {args.refilter}: {n_pass} geçti, {n_status} durum değişti, {chart_note}")
+        if n_pending:
+            print(f"{n_pending} ticker için metrikler eksik (orijinal çalışmada erken elenmişti); "
+                  f"tam kapsam için --write-all ile yeniden tarayın.")
+        return
+
     include_earnings = (not args.no_earnings) and bool(opts.get("include_earnings", True))
     include_analyst  = (not args.no_analyst) and (str(opts.get("analyst_ratings_provider", "yahoo")).lower() == "yahoo")
 
@@ -109,6 +219,18 @@ def main():
         start = end - pd.Timedelta(days=int(args.lookback))
         _from, _to = start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
 
+    # benchmark serisi çalışma başına bir kez yüklenir, tüm worker'lar paylaşır
+    benchmarks = BenchmarkProvider(cfg)
+
+    # beta aynı ticker'ın daha uzun geçmişini ister; ilk çekim ikisini de kapsasın
+    history_start = min(pd.Timestamp(_from), benchmarks.start).strftime("%Y-%m-%d")
+    set_history_floor(history_start)
+
+    # toplu mod: fiyatlar ve beta panelden, ticker başına fiyat isteği yok
+    prefetched = {}
+    if args.bulk:
+        prefetched = _bulk_prefetch(tickers, history_start, _from, _to, cfg, benchmarks, args.workers)
+
     # === OUTPUT LAYOUT ===
     ts = pd.Timestamp.now().strftime("%Y%m%d_%H%M")
     run_dir = os.path.join(args.out_dir, f"run_{ts}")
@@ -120,68 +242,93 @@ def main():
 
     print(f"Toplam {len(tickers)} sembol için veri çekiliyor...")
 
-    columns = [
-        "Ticker","Date","Close","ChangePct",
-        "Market Cap","YTDpct","Beta","AnalystRating",
-        "RecentEarnings","UpcomingEarnings","Sector",
-        "FailReason"   # elendiyse sebep(ler)
-    ]
+    columns = CSV_COLUMNS
 
     total = len(tickers)
     # Tüm komutlar write-all gibi çalışsın
     write_all = True
     # write-all iken grafikler her zaman üretilir; --no-charts bunu override edilemezdi
     make_charts = (not args.no_charts) or write_all
-    skip_if_empty = not args.keep_delisted
 
-    with make_progress() as progress, open(out_csv, "w", newline="") as f:
+    # all dışındaki modlarda elenenlerin grafikleri snapshot'tan istendiğinde çizilir
+    deferred = make_charts and args.chart_mode != "all"
+    eager = make_charts and args.chart_mode != "lazy"
 
-        writer = csv.DictWriter(f, fieldnames=columns); writer.writeheader()
+    # grafikler süreç havuzunda, ticker sonucu kesinleşir kesinleşmez çizilir
+    chart_pool = ChartPool(cfg, processes=args.chart_procs or None) if eager else None
+
+    def on_final(ticker, bars, passes, fail_text):
+        if chart_pool is not None and (passes or (write_all and not deferred)):
+            chart_pool.submit(bars, accepted_dir if passes else rejected_dir, fail_text)
+
+    with make_progress() as progress:
         task = progress.add_task("run", total=total)
+        processed = 0
+        try:
+            print(f"[0/{total}] Scan started", flush=True)
+        except Exception:
+            pass
 
-        from concurrent.futures import ThreadPoolExecutor
-        with ThreadPoolExecutor(max_workers=int(args.workers)) as ex:
-            futures = [ex.submit(
-                process_ticker, t, _from, _to, cfg,
-                include_earnings, include_analyst,
-                accepted_dir, rejected_dir, make_charts, skip_if_empty,
-                write_all
-            ) for t in tickers]
-
-            processed = 0
-            skipped = 0
-            skipped_tickers = []
+        def on_done(ticker, ok):
+            nonlocal processed
+            processed += 1
             try:
-                print(f"[0/{total}] Scan started", flush=True)
+                status = "OK" if ok else "FAIL"
+                print(f"[{processed}/{total}] {ticker} {status}", flush=True)
             except Exception:
                 pass
-            for ticker, fut in zip(tickers, futures):
-                row = None
-                try:
-                    row = fut.result()
-                except Exception as e:
-                    _netlog(f"[cli warn] worker error: {e}")
-                    row = None
-                if row is not None:
-                    writer.writerow(row)
-                else:
-                    skipped += 1
-                    if len(skipped_tickers) < 10:
-                        skipped_tickers.append(ticker)
-                processed += 1
-                try:
-                    status = "OK" if row is not None else "FAIL"
-                    print(f"[{processed}/{total}] {ticker} {status}", flush=True)
-                except Exception:
-                    pass
-                progress.advance(task)
+            progress.advance(task)
+
+        result = scan_universe(
+            tickers, _from, _to, cfg,
+            include_earnings, include_analyst,
+            workers=args.workers, benchmarks=benchmarks, prefetched=prefetched,
+            fill_all=args.write_all, on_done=on_done,
+            use_async=args.use_async, on_final=on_final,
+        )
+
+    skipped = len(result.skipped)
+    skipped_tickers = result.skipped[:10]
+    with open(out_csv, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns); writer.writeheader()
+        for ticker, row, passes, fail_text in result.rows():
+            if passes or write_all:
+                writer.writerow(row)
+
+    if deferred:
+        save_snapshot(run_dir, result, cfg, args.chart_mode)
+
+    if chart_pool is not None:
+        if chart_pool.done < chart_pool.submitted:
+            print(f"Grafikler bekleniyor ({chart_pool.done}/{chart_pool.submitted})...", flush=True)
+        chart_pool.close()
+
+    # --refilter için ham metrikler
+    save_run(run_dir, result, {
+        "from": _from, "to": _to,
+        "provider": data_provider_for(cfg),
+        "store_dir": None if args.no_store else args.store_dir,
+        "bulk": bool(args.bulk),
+        "write_all": write_all,
+        "charts": bool(make_charts),
+        "chart_mode": args.chart_mode if make_charts else "none",
+        # --refilter grafikleri snapshot'tan ya da ticker başına depodan çizer
+        "charts_redrawable": bool(deferred or not (args.no_store or args.bulk)),
+        # metriklerin hesaplandığı periyotlar; --refilter bunları karşılaştırır
+        "metric_params": metric_params(cfg),
+    })
 
     print(f"\nSaved CSV -> {out_csv}")
     if make_charts:
         print(f"Accepted   -> {accepted_dir}")
         print(f"Rejected   -> {rejected_dir}")
+    if deferred:
+        print(f"Snapshot   -> {os.path.join(run_dir, 'charts.json')} (grafik: --render {run_dir} <TICKER>)")
     if skipped:
         note = ", ".join(skipped_tickers)
         if skipped > len(skipped_tickers):
             note += ", ..."
         print(f"Skipped {skipped} ticker (no data / processing error): {note}")
+    print(f"Fiyat önbelleği: {HISTORY.summary()}")
+    if FLIGHT.total():
+        print(f"Single-flight: {FLIGHT.summary()}")
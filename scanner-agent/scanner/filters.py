@@ -0,0 +1,165 @@
+"""
+filters.yaml filtreleri: hangi metriğe baktıkları ve maliyet aşaması.
+
+Aşamalar maliyete göre sıralıdır; bir aşamada elenen ticker için sonraki
+(ağ isteği gerektiren) aşamaların metrikleri çekilmez. Kontroller NumPy
+maskeleri olarak yazılmıştır: tüm evrenin metrik tablosu (ticker başına bir
+satır) tek geçişte değerlendirilir.
+"""
+import numpy as np
+import pandas as pd
+
+# (aşama adı, o aşamanın filtreleri) — ucuzdan pahalıya
+STAGES = (
+    ("price",   ("Universe", "Volume", "YTD", "StochRSI", "MA50x200")),
+    ("beta",    ("Beta",)),
+    ("profile", ("MarketCap",)),
+    ("analyst", ("Analyst",)),
+)
+
+
+def _f(x):
+    """None -> NaN; skaler ya da dizi float'a."""
+    if x is None:
+        return np.nan
+    return np.asarray(x, dtype=np.float64)
+
+
+def check_universe(m: dict, cfg: dict):
+    uni = cfg.get("universe", {}) or {}
+    close = _f(m.get("close"))
+    return ((close >= float(uni.get("min_price", -float("inf")))) &
+            (close <= float(uni.get("max_price", float("inf")))))
+
+
+def check_volume(m: dict, cfg: dict):
+    vol = cfg.get("volume", {}) or {}
+    return ((_f(m.get("avg_volume")) >= float(vol.get("min_avg_volume", 0))) &
+            (_f(m.get("avg_dollar_volume")) >= float(vol.get("min_avg_dollar_vol", 0))))
+
+
+def check_market_cap(m: dict, cfg: dict):
+    fun = cfg.get("fundamentals", {}) or {}
+    mc = _f(m.get("market_cap"))
+    return ((mc >= float(fun.get("market_cap_min", 0))) &
+            (mc <= float(fun.get("market_cap_max", float("inf")))))
+
+
+def check_beta(m: dict, cfg: dict):
+    fun = cfg.get("fundamentals", {}) or {}
+    return _f(m.get("beta")) >= float(fun.get("beta_min_5y", -float("inf")))
+
+
+def check_ytd(m: dict, cfg: dict):
+    fun = cfg.get("fundamentals", {}) or {}
+    ytd = _f(m.get("ytd"))
+    in_range = ((ytd >= float(fun.get("ytd_min_pct", -float("inf")))) &
+                (ytd <= float(fun.get("ytd_max_pct", float("inf")))))
+    missing_ok = not bool(fun.get("require_ytd", True))
+    return np.where(np.isnan(ytd), missing_ok, in_range)
+
+
+def check_analyst(m: dict, cfg: dict):
+    fun = cfg.get("fundamentals", {}) or {}
+    allowed = [str(a).strip() for a in fun.get("analyst_ratings_allow", [])]
+    rating = m.get("analyst")
+    rating = np.asarray("" if rating is None else rating, dtype=object)
+    if not allowed:
+        return np.ones(rating.shape, dtype=bool)
+    empty = (rating == "") | (rating == None)  # noqa: E711 - eleman bazlı
+    require = bool(fun.get("require_analyst_rating", False))
+    return np.where(empty, not require, np.isin(rating, allowed))
+
+
+def check_stochrsi(m: dict, cfg: dict):
+    mom = cfg.get("momentum", {}) or {}
+    k = _f(m.get("stoch_k"))
+    if not bool(mom.get("enable_stochrsi", False)):
+        return np.ones(np.shape(k), dtype=bool)
+    return k < float(mom.get("stochrsi_max", 0.5))
+
+
+def check_ma_cross(m: dict, cfg: dict):
+    """MA(mid) >= MA(slow) ya da yakın zamanda yukarı kesişim bekleniyorsa geçer."""
+    trn = cfg.get("trend", {}) or {}
+    fast, slow = _f(m.get("ma_fast")), _f(m.get("ma_slow"))
+    if not bool(trn.get("enable_ma_cross_filter", False)):
+        return np.ones(np.shape(fast), dtype=bool)
+    lookahead = int(trn.get("ma_cross_lookahead_days", 20))
+    max_gap_pct = float(trn.get("ma_cross_max_gap_pct", 3.0))
+
+    rel_slope = _f(m.get("ma_fast_slope")) - _f(m.get("ma_slow_slope"))
+    gap = np.maximum(0.0, slow - fast)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        est_days = np.where(rel_slope > 1e-9, gap / rel_slope, np.inf)
+        gap_pct = np.where(slow > 0, gap / slow * 100.0, 100.0)
+    will_cross_soon = (fast < slow) & (rel_slope > 0) & (est_days <= lookahead) & (gap_pct <= max_gap_pct)
+    return (fast >= slow) | will_cross_soon
+
+
+CHECKS = {
+    "Universe": check_universe,
+    "Volume": check_volume,
+    "MarketCap": check_market_cap,
+    "Beta": check_beta,
+    "YTD": check_ytd,
+    "Analyst": check_analyst,
+    "StochRSI": check_stochrsi,
+    "MA50x200": check_ma_cross,
+}
+
+# FailReason sırası (eski worker çıktısıyla aynı)
+REASON_ORDER = ("Universe", "Volume", "MarketCap", "Beta", "YTD", "Analyst", "StochRSI", "MA50x200")
+
+
+PENDING = "Pending"
+
+NUMERIC_COLUMNS = (
+    "close", "change_pct", "avg_volume", "avg_dollar_volume", "ytd", "stoch_k",
+    "ma_fast", "ma_slow", "ma_fast_slope", "ma_slow_slope",
+    "beta", "market_cap",
+)
+
+
+def metrics_table(records: dict) -> pd.DataFrame:
+    """{ticker: metrik dict} -> ticker indeksli tablo; sayısal kolonlar float (None -> NaN)."""
+    table = pd.DataFrame.from_dict(records, orient="index")
+    for c in NUMERIC_COLUMNS:
+        table[c] = pd.to_numeric(table[c], errors="coerce") if c in table else np.nan
+    if "analyst" not in table:
+        table["analyst"] = ""
+    table["analyst"] = table["analyst"].fillna("").astype(object)
+    return table
+
+
+def evaluate(table: pd.DataFrame, cfg: dict, reached=None):
+    """
+    Tüm filtreleri tablo üzerinde maske olarak uygular.
+
+    reached: ticker başına metrikleri yüklenmiş aşama sayısı (None = hepsi);
+    yüklenmemiş aşamaların filtreleri fail sayılmaz. Hiçbir yüklü filtreye
+    takılmayıp eksik aşaması olan ticker "Pending" ile işaretlenir (yalnızca
+    kayıtlı metriklerle yeniden filtrelemede görülür).
+    Dönüş: (passes bool dizisi, FailReason metin dizisi).
+    """
+    n = len(table)
+    cols = {c: table[c].to_numpy() for c in table.columns}
+    reached = np.full(n, len(STAGES)) if reached is None else np.asarray(reached)
+
+    failed = {}
+    for si, (_stage, names) in enumerate(STAGES):
+        active = reached > si
+        for name in names:
+            ok = np.broadcast_to(np.asarray(CHECKS[name](cols, cfg), dtype=bool), (n,))
+            failed[name] = active & ~ok
+
+    any_fail = np.zeros(n, dtype=bool)
+    text = np.full(n, "", dtype=object)
+    for name in REASON_ORDER:
+        f = failed[name]
+        text = np.where(f & any_fail, text + "," + name, np.where(f, text + name, text))
+        any_fail |= f
+    complete = reached >= len(STAGES)
+    text = np.where(~any_fail & ~complete, PENDING, text)
+    passes = ~any_fail & complete
+    return passes, text
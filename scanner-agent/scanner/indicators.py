@@ -1,20 +1,37 @@
 import numpy as np
 import pandas as pd
 
-def compute_ytd_pct(df: pd.DataFrame):
-    if df.empty: return None
-    last = df.iloc[-1]
-    year_start = pd.Timestamp(year=pd.Timestamp(last["Date"]).year, month=1, day=1)
-    ydf = df[df["Date"] >= year_start]
-    if len(ydf) == 0: return None
-    first_close = float(ydf["Close"].iloc[0])
-    last_close  = float(ydf["Close"].iloc[-1])
+from .bars import Bars
+
+def compute_ytd_pct(bars: Bars):
+    if len(bars) == 0: return None
+    last_day = pd.Timestamp("1970-01-01") + pd.Timedelta(days=int(bars.days[-1]))
+    year_start = (pd.Timestamp(year=last_day.year, month=1, day=1) - pd.Timestamp("1970-01-01")).days
+    i = int(np.searchsorted(bars.days, year_start))
+    if i >= len(bars): return None
+    first_close = float(bars.close[i])
+    last_close  = float(bars.close[-1])
     return (last_close / first_close - 1.0) * 100.0
 
-def ta_sma(s: pd.Series, n: int) -> pd.Series:
-    return s.rolling(int(n), min_periods=1).mean()
+def ta_sma(values, n: int) -> np.ndarray:
+    """
+    rolling(n, min_periods=1).mean() karşılığı (ilk n-1 bar kısmi pencere);
+    NaN barlar pencereden düşülür, penceresi tamamen NaN olan nokta NaN; float64.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    n = int(n)
+    finite = np.isfinite(x)
+    csum = np.concatenate([[0.0], np.cumsum(np.where(finite, x, 0.0))])
+    ccnt = np.concatenate([[0], np.cumsum(finite)])
+    idx = np.arange(1, len(x) + 1)
+    lo = np.maximum(idx - n, 0)
+    cnt = ccnt[idx] - ccnt[lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(cnt > 0, (csum[idx] - csum[lo]) / cnt, np.nan)
 
-def stochrsi(close: pd.Series, rsi_len=14, k=3, d=3):
+def stochrsi(close, rsi_len=14, k=3, d=3):
+    """close dizisi -> (rsi, k_line, d_line) float64 dizileri."""
+    close = pd.Series(np.asarray(close, dtype=np.float64))
     delta = close.diff()
     up = delta.clip(lower=0.0)
     down = (-delta).clip(lower=0.0)
@@ -27,4 +44,4 @@ def stochrsi(close: pd.Series, rsi_len=14, k=3, d=3):
     stoch = (rsi - rsi_min) / (rsi_max - rsi_min).replace(0, np.nan)
     k_line = stoch.rolling(k, min_periods=1).mean()
     d_line = k_line.rolling(d, min_periods=1).mean()
-    return rsi, k_line, d_line
+    return rsi.to_numpy(), k_line.to_numpy(), d_line.to_numpy()
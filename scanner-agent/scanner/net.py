@@ -1,4 +1,6 @@
-import os, sys, random, time
+import os, sys, random, time, threading, collections
+import email.utils
+from urllib.parse import urlsplit
 import requests
 from requests.adapters import HTTPAdapter
 from requests.exceptions import ConnectTimeout, ReadTimeout, ConnectionError as ReqConnError, HTTPError
@@ -20,21 +22,352 @@ ADAPTER = HTTPAdapter(pool_connections=256, pool_maxsize=256,
 SESSION.mount("https://", ADAPTER)
 SESSION.mount("http://", ADAPTER)
 
-def backoff_sleep(attempt: int, base: float = 0.6):
-    import random
+def backoff_delay(attempt: int, base: float = 0.6) -> float:
     sleep_s = base * (2 ** (attempt - 1))
     sleep_s = sleep_s * (0.75 + 0.5 * random.random())
-    time.sleep(min(sleep_s, 1.5))
+    return min(sleep_s, 1.5)
+
+def backoff_sleep(attempt: int, base: float = 0.6):
+    time.sleep(backoff_delay(attempt, base))
+
+# --- host başına hız sınırı ---
+
+# 429 yanıtı yeniden deneme hakkı harcamaz, host sınırlayıcısında beklenir (istek başına en çok bu kadar)
+MAX_THROTTLE_WAITS = 6
+# tek bir Retry-After beklemesinin üst sınırı (sn)
+MAX_RETRY_AFTER = 60.0
+
+PROVIDER_HOSTS = {
+    "polygon": "api.polygon.io",
+    "yahoo": "query1.finance.yahoo.com",
+}
+
+class TokenBucket:
+    """
+    Bir host için ortak sınırlayıcı: sürekli `rate` istek/sn, en fazla `burst`
+    patlama. GCRA (sanal zamanlama) ile kurulu; token bucket'a denk ama tek
+    zaman damgası tutar. Thread-safe; çağıran reserve()'ün döndürdüğü süre
+    kadar kendisi uyur, böylece thread'ler ve async loop aynı kovayı paylaşır.
+    """
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst or rate))
+        self._interval = 1.0 / self.rate
+        self._tau = (self.burst - 1.0) * self._interval
+        self._tat = 0.0  # sonraki isteğin teorik varış zamanı
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Bir yer ayırır; göndermeden önce beklenecek süreyi döndürür."""
+        with self._lock:
+            now = time.monotonic()
+            tat = max(self._tat, now)
+            wait = max(0.0, tat - self._tau - now)
+            self._tat = tat + self._interval
+            return wait
+
+    def pause(self, seconds: float):
+        """Retry-After: şimdi+seconds'a kadar istek yok, sonra yine `rate` hızında."""
+        with self._lock:
+            resume = time.monotonic() + float(seconds)
+            self._tat = max(self._tat, resume + self._tau)
+
+RATE_LIMITS = {
+    "api.polygon.io": TokenBucket(50.0, 50),
+    "query1.finance.yahoo.com": TokenBucket(10.0, 10),
+}
+
+def set_rate_limit(host: str, rate: float, burst: float = None):
+    """rate <= 0 host için sınırı kapatır. `host` sağlayıcı adı da olabilir."""
+    host = PROVIDER_HOSTS.get(host, host)
+    if rate is None or float(rate) <= 0:
+        RATE_LIMITS.pop(host, None)
+    else:
+        RATE_LIMITS[host] = TokenBucket(rate, burst)
+
+def limiter_for(url: str):
+    return RATE_LIMITS.get(urlsplit(url).netloc)
+
+def retry_after_seconds(value):
+    """Retry-After başlığı (saniye ya da HTTP tarihi) -> saniye; yoksa None."""
+    if not value:
+        return None
+    try:
+        secs = float(value)
+    except ValueError:
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        secs = when.timestamp() - time.time()
+    return min(max(0.0, secs), MAX_RETRY_AFTER)
+
+def throttle_delay(headers, throttled: int) -> float:
+    """429 sonrası bekleme: varsa sunucunun Retry-After'ı, yoksa backoff."""
+    delay = retry_after_seconds(headers.get("Retry-After"))
+    return backoff_delay(throttled) if delay is None else delay
+
+# --- uyarlanır eşzamanlılık (AIMD) ---
+
+class AdaptiveLimit:
+    """
+    Bir host için uçuştaki istek sınırı. Her `limit` sağlıklı yanıtta ~1
+    büyür, yani tur başına yaklaşık +1 (toplamsal artış); 429 ve zaman
+    aşımında yarıya iner (çarpımsal azalış, yumuşatılmış tur süresinde en çok
+    bir kez; tek bir ret dalgası bir kez sayılır). Host'un taban
+    gecikmesinin `latency_slack` katından yavaş yanıt sağlıksız sayılır:
+    büyüme olmaz.
+    """
+
+    def __init__(self, host: str, initial: int = 4, max_limit: int = 64, min_limit: int = 1,
+                 latency_slack: float = 3.0):
+        self.host = host
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.latency_slack = float(latency_slack)
+        self.inflight = 0
+        self.baseline = None
+        self.rtt = None
+        self._last_cut = 0.0
+        self._cond = threading.Condition()
+        # asyncio bekleyenleri: (loop, future); release() yer açıldıkça uyandırır
+        self._async_waiters = collections.deque()
+
+    def acquire(self) -> float:
+        with self._cond:
+            while self.inflight >= int(self.limit):
+                self._cond.wait()
+            self.inflight += 1
+            return time.monotonic()
+
+    async def acquire_async(self) -> float:
+        """acquire()'ın asyncio karşılığı; yer açılana kadar loop'u meşgul etmeden bekler."""
+        import asyncio
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self.inflight < int(self.limit):
+                    self.inflight += 1
+                    return time.monotonic()
+                fut = loop.create_future()
+                self._async_waiters.append((loop, fut))
+            try:
+                await fut
+            except asyncio.CancelledError:
+                with self._cond:
+                    try:
+                        self._async_waiters.remove((loop, fut))
+                    except ValueError:
+                        # uyandırılmıştı; sıradaki bekleyene devredilir
+                        self._wake_async()
+                raise
+
+    def _wake_async(self):
+        """Boş yer sayısı kadar async bekleyeni uyandırır (kilit tutulurken çağrılır)."""
+        free = int(self.limit) - self.inflight
+        while free > 0 and self._async_waiters:
+            loop, fut = self._async_waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(self._resolve, fut)
+            except RuntimeError:
+                continue  # loop kapanmış
+            free -= 1
+
+    def _resolve(self, fut):
+        if not fut.done():
+            fut.set_result(None)
+        else:
+            # bekleyen bu arada iptal edildi; uyandırma kaybolmasın
+            with self._cond:
+                self._wake_async()
+
+    def release(self, started: float, outcome: str):
+        """outcome: 'ok', 'error' (5xx vb.) ya da 'congested' (429 / zaman aşımı)."""
+        now = time.monotonic()
+        latency = now - started
+        with self._cond:
+            self.inflight -= 1
+            self.rtt = latency if self.rtt is None else self.rtt + (latency - self.rtt) * 0.1
+            if outcome == "congested":
+                if now - self._last_cut >= self.rtt:
+                    self._last_cut = now
+                    old = int(self.limit)
+                    self.limit = max(float(self.min_limit), self.limit * 0.5)
+                    if int(self.limit) < old:
+                        _netlog(f"[net warn] {self.host}: congestion, concurrency {old} -> {int(self.limit)}")
+            elif outcome == "ok":
+                if self.baseline is None or latency < self.baseline:
+                    self.baseline = latency
+                else:
+                    # taban, tipik gecikmeyi yukarı doğru yavaşça izler
+                    self.baseline += (latency - self.baseline) * 0.01
+                if latency <= self.latency_slack * max(self.baseline, 0.05):
+                    self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+            self._wake_async()
+
+ADAPTIVE_ENABLED = True
+ADAPTIVE_MAX = 64
+_ADAPTIVE = {}
+_ADAPTIVE_GUARD = threading.Lock()
+
+def set_adaptive(max_inflight: int, enabled: bool = True):
+    """max_inflight: uyarlanır sınırın host başına tavanı."""
+    global ADAPTIVE_ENABLED, ADAPTIVE_MAX
+    ADAPTIVE_ENABLED = bool(enabled) and int(max_inflight) > 0
+    ADAPTIVE_MAX = max(1, int(max_inflight))
+    with _ADAPTIVE_GUARD:
+        _ADAPTIVE.clear()
+
+def concurrency_for(url: str):
+    if not ADAPTIVE_ENABLED:
+        return None
+    host = urlsplit(url).netloc
+    with _ADAPTIVE_GUARD:
+        lim = _ADAPTIVE.get(host)
+        if lim is None:
+            lim = _ADAPTIVE[host] = AdaptiveLimit(host, max_limit=ADAPTIVE_MAX)
+        return lim
+
+# --- devre kesici ---
+
+class CircuitBreaker:
+    """
+    Sağlayıcı başına sağlık anahtarı. Son `window` sonucun en az `threshold`
+    oranı (ve en az `min_calls` çağrı) başarısızsa açılır; açıkken çağıranlar
+    hemen vazgeçer ya da yedek sağlayıcıya gider. `cooldown` saniye sonra tek
+    bir deneme çağrısı geçirilir (yarı açık): başarılıysa devre kapanır,
+    değilse yeniden açılır.
+    """
+
+    def __init__(self, name: str, window: int = 20, min_calls: int = 10,
+                 threshold: float = 0.5, cooldown: float = 30.0):
+        self.name = name
+        self.window = int(window)
+        self.min_calls = int(min_calls)
+        self.threshold = float(threshold)
+        self.cooldown = float(cooldown)
+        self.state = "closed"
+        self._results = collections.deque(maxlen=self.window)
+        self._opened_at = 0.0
+        self._probe_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "open" and now - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+                self._probe_at = now
+                return True
+            if self.state == "half_open" and now - self._probe_at >= self.cooldown:
+                # önceki deneme çağrısı sonuç bildirmedi
+                self._probe_at = now
+                return True
+            return False
+
+    def record(self, ok: bool):
+        with self._lock:
+            if self.state == "half_open":
+                if ok:
+                    self.state = "closed"
+                    self._results.clear()
+                    _netlog(f"[net warn] {self.name}: provider healthy again, circuit closed")
+                else:
+                    self._open()
+                return
+            if self.state == "open":
+                return
+            self._results.append(bool(ok))
+            n = len(self._results)
+            fails = n - sum(self._results)
+            if n >= self.min_calls and fails >= self.threshold * n:
+                self._open()
+                _netlog(f"[net warn] {self.name}: {fails}/{n} failed, circuit open for {self.cooldown:.0f}s")
+
+    def _open(self):
+        self.state = "open"
+        self._opened_at = time.monotonic()
+        self._results.clear()
+
+# sağlayıcının sağlığına karşı sayılan HTTP durumları: yalnızca 429 ve 5xx
+# (404 = bilinmeyen ticker, 403 = uç nokta planda yok; ikisi de sağlık sorunu değil)
+BREAKER_FAIL_STATUS = {
+    "polygon": (429, 500, 502, 503, 504),
+    "yahoo": (429, 500, 502, 503, 504),
+}
+
+BREAKERS = {name: CircuitBreaker(name) for name in PROVIDER_HOSTS}
+_HOST_PROVIDERS = {host: name for name, host in PROVIDER_HOSTS.items()}
+
+def provider_ok(provider: str) -> bool:
+    """Sağlayıcının devresi açıkken False (bunun yerine yedek çağrılır)."""
+    br = BREAKERS.get(provider)
+    return br is None or br.allow()
+
+def record_provider(provider: str, ok: bool):
+    br = BREAKERS.get(provider)
+    if br is not None:
+        br.record(ok)
+
+def provider_for(url: str):
+    return _HOST_PROVIDERS.get(urlsplit(url).netloc)
+
+def classify_status(provider, status: int):
+    """-> (AIMD sonucu, devre kesici için başarılı mı)"""
+    bad = status in BREAKER_FAIL_STATUS.get(provider, ())
+    if status == 429:
+        return "congested", not bad
+    if status >= 500:
+        return "error", not bad
+    return "ok", not bad
 
 def http_get(url, headers=None, params=None, retries=None, retry_status=(429,500,502,503,504), retry_forbidden=(403,404)):
     if retries is None: retries = GLOBAL_MAX_RETRIES
-    for attempt in range(1, retries + 1):
+    bucket = limiter_for(url)
+    slots = concurrency_for(url)
+    provider = provider_for(url)
+    attempt, throttled = 1, 0
+    while attempt <= retries:
+        if provider is not None and not provider_ok(provider):
+            _netlog(f"[net warn] {url} -> {provider} circuit open; skip")
+            return None
+        retry_after = None
+        started = None
+        outcome, healthy = "congested", False
         try:
-            r = SESSION.get(url, headers=headers or {}, params=params or {}, timeout=(5.0, GLOBAL_HTTP_TIMEOUT))
+            if bucket is not None:
+                wait = bucket.reserve()
+                if wait > 0:
+                    time.sleep(wait)
+            if slots is not None:
+                started = slots.acquire()
+            try:
+                r = SESSION.get(url, headers=headers or {}, params=params or {}, timeout=(5.0, GLOBAL_HTTP_TIMEOUT))
+                outcome, healthy = classify_status(provider, r.status_code)
+            finally:
+                if started is not None:
+                    slots.release(started, outcome)
+                if provider is not None:
+                    record_provider(provider, healthy)
+            if r.status_code == 429 and 429 in retry_status and throttled < MAX_THROTTLE_WAITS:
+                throttled += 1
+                delay = throttle_delay(r.headers, throttled)
+                _netlog(f"[net warn] {url} -> HTTP 429; waiting {delay:.1f}s (throttle {throttled}/{MAX_THROTTLE_WAITS})")
+                if bucket is not None:
+                    bucket.pause(delay)
+                else:
+                    time.sleep(delay)
+                continue
             if r.status_code in retry_forbidden:
                 _netlog(f"[net warn] {url} -> HTTP {r.status_code}. Not retrying.")
                 return None
             if r.status_code in retry_status:
+                retry_after = retry_after_seconds(r.headers.get("Retry-After"))
                 raise HTTPError(f"Retryable HTTP {r.status_code}")
             r.raise_for_status()
             return r
@@ -43,7 +376,11 @@ def http_get(url, headers=None, params=None, retries=None, retry_status=(429,500
                 _netlog(f"[net error] {url} -> {e}; giving up.")
                 return None
             _netlog(f"[net warn] {url} -> {e}; retry {attempt}/{retries}")
-            backoff_sleep(attempt)
+            if retry_after is not None:
+                time.sleep(retry_after)
+            else:
+                backoff_sleep(attempt)
+            attempt += 1
         except Exception as e:
             _netlog(f"[net warn] {url} -> {e}; skip")
             return None
@@ -0,0 +1,230 @@
+"""
+Evren düzeyinde aşamalı tarama.
+
+Önce tüm tickerların fiyatları çekilip fiyat metrikleri hesaplanır; sonra
+filters.STAGES sırasıyla her aşamada tablo tek geçişte değerlendirilir ve
+yalnızca hâlâ geçen tickerlar (fill_all ise hepsi) bir sonraki aşamanın ağ
+isteklerine girer.
+
+use_async: fiyat, profil ve analist aşamalarının istekleri tek thread'deki
+event loop'ta (anet.AsyncFetcher) uçuşta tutulur; beta ve earnings gibi
+senkron kütüphane çağrıları loop'un thread havuzunda çalışır.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from .filters import STAGES, PENDING, metrics_table, evaluate
+from .utils import _netlog
+from .anet import AsyncFetcher
+from . import worker
+
+
+class ScanResult:
+    """Tarama çıktısı: ticker başına barlar (Bars), metrik tablosu ve filtre sonucu."""
+
+    def __init__(self, frames: dict, table, reached, passes, fail_text, earnings: dict, skipped: list):
+        self.frames = frames
+        self.table = table
+        self.reached = reached
+        self.passes = passes
+        self.fail_text = fail_text
+        self.earnings = earnings
+        self.skipped = skipped
+
+    def rows(self):
+        """Taramadaki sırayla (ticker, CSV satırı, geçti mi, FailReason)."""
+        for i, t in enumerate(self.table.index):
+            m = self.table.iloc[i].to_dict()
+            text = str(self.fail_text[i])
+            row = worker.build_row(t, m, self.earnings.get(t), text)
+            yield t, row, bool(self.passes[i]), text
+
+
+def _map(ex, fn, items):
+    """fn(item) sonuçlarını sırayla döndürür; hata veren item için None."""
+    futures = [ex.submit(fn, it) for it in items]
+    for it, fut in zip(items, futures):
+        try:
+            yield it, fut.result()
+        except Exception as e:
+            _netlog(f"[pipeline warn] {it}: {e}")
+            yield it, None
+
+
+class _ThreadRunner:
+    """Aşama işlerini ThreadPoolExecutor'da yürütür."""
+
+    def __init__(self, workers: int):
+        self.ex = ThreadPoolExecutor(max_workers=max(1, int(workers)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.ex.shutdown(wait=True)
+        return False
+
+    def map(self, fn, items):
+        return _map(self.ex, fn, items)
+
+
+class _AsyncRunner:
+    """
+    Aşama işlerini (coroutine fonksiyonları) tek event loop'ta yürütür;
+    aiohttp oturumu tüm aşamalar boyunca açık kalır.
+    """
+
+    def __init__(self, host_limit: int = None):
+        self.loop = asyncio.new_event_loop()
+        self.fetcher = AsyncFetcher(host_limit)
+
+    def __enter__(self):
+        self.loop.run_until_complete(self.fetcher.__aenter__())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.loop.run_until_complete(self.fetcher.__aexit__(exc_type, exc, tb))
+            self.loop.run_until_complete(self.loop.shutdown_default_executor())
+        finally:
+            self.loop.close()
+        return False
+
+    def map(self, afn, items):
+        async def one(it):
+            try:
+                return it, await afn(it)
+            except Exception as e:
+                _netlog(f"[pipeline warn] {it}: {e}")
+                return it, None
+
+        async def run_all():
+            return await asyncio.gather(*(one(it) for it in items))
+
+        return self.loop.run_until_complete(run_all())
+
+
+def _threaded(fn):
+    """Senkron loader'ı async runner'da loop'un thread havuzuna taşır."""
+    async def run(*args):
+        return await asyncio.to_thread(fn, *args)
+    return run
+
+
+def scan_universe(
+    tickers,
+    _from: str,
+    _to: str,
+    cfg: dict,
+    include_earnings: bool,
+    include_analyst: bool,
+    workers: int = 16,
+    benchmarks=None,
+    prefetched: dict = None,
+    fill_all: bool = False,
+    on_done=None,
+    use_async: bool = False,
+    host_limit: int = None,
+    on_final=None,
+) -> ScanResult:
+    """
+    on_done(ticker, ok) bir ticker'ın işi bittiğinde (veri yok, elendi ya da
+    son aşamayı geçti) çağrılır; ilerleme göstergesi içindir.
+    on_final(ticker, bars, passes, fail_text) ticker'ın filtre sonucu
+    kesinleşir kesinleşmez (kısa devreyle elendiğinde ya da son aşamadan
+    sonra, earnings beklenmeden) çağrılır; grafikler tarama sürerken
+    üretilebilsin diye.
+    use_async ise ağ aşamaları asyncio ile yürür (host başına en çok
+    host_limit istek; None = anet.HOST_LIMIT), workers kullanılmaz.
+    """
+    prefetched = prefetched or {}
+    data_provider = worker.data_provider_for(cfg)
+    finished = set()
+
+    def finish(t, ok=True):
+        if t not in finished:
+            finished.add(t)
+            if on_done is not None:
+                on_done(t, ok)
+
+    settled = set()
+
+    def settle(t, ok, text):
+        if on_final is not None and t not in settled:
+            settled.add(t)
+            on_final(t, frames[t], bool(ok), str(text))
+
+    frames, records, skipped = {}, {}, []
+    runner = _AsyncRunner(host_limit) if use_async else _ThreadRunner(workers)
+    with runner:
+        # --- aşama 0: fiyat ---
+        if use_async:
+            async def price_job(t):
+                bars = await worker.load_bars_async(t, _from, _to, data_provider, prefetched.get(t))
+                if bars is None or len(bars) == 0:
+                    return None
+                return bars, worker.price_metrics(bars, cfg)
+        else:
+            def price_job(t):
+                bars = worker.load_bars(t, _from, _to, data_provider, prefetched.get(t))
+                if bars is None or len(bars) == 0:
+                    return None
+                return bars, worker.price_metrics(bars, cfg)
+
+        for t, got in runner.map(price_job, list(tickers)):
+            if got is None:
+                skipped.append(t)
+                finish(t, False)
+                continue
+            frames[t], records[t] = got
+
+        table = metrics_table(records)
+        index = np.asarray(table.index, dtype=object)
+        reached = np.ones(len(table), dtype=np.int64)
+
+        if use_async:
+            beta_async = _threaded(worker.load_beta)
+            loaders = {
+                "beta": lambda t: beta_async(t, cfg, data_provider, benchmarks, prefetched.get(t)),
+                "profile": lambda t: worker.load_profile_async(t, data_provider, float(table.at[t, "close"])),
+                "analyst": lambda t: worker.load_analyst_async(t, include_analyst),
+            }
+            load_earnings = _threaded(worker.load_earnings)
+        else:
+            loaders = {
+                "beta": lambda t: worker.load_beta(t, cfg, data_provider, benchmarks, prefetched.get(t)),
+                "profile": lambda t: worker.load_profile(t, data_provider, float(table.at[t, "close"])),
+                "analyst": lambda t: worker.load_analyst(t, include_analyst),
+            }
+            load_earnings = worker.load_earnings
+
+        # --- pahalı aşamalar: yalnızca hâlâ geçenler (fill_all ise hepsi) ---
+        for si in range(1, len(STAGES)):
+            _passes, text = evaluate(table, cfg, reached)
+            alive = (text == "") | (text == PENDING)
+            if not fill_all:
+                for t, t_text in zip(index[~alive], text[~alive]):
+                    finish(t)
+                    settle(t, False, t_text)
+            todo = list(index if fill_all else index[alive])
+            for t, vals in runner.map(loaders[STAGES[si][0]], todo):
+                for k, v in (vals or {}).items():
+                    if k not in table:
+                        table[k] = None
+                    table.at[t, k] = v
+            reached[table.index.get_indexer(todo)] = si + 1
+
+        passes, fail_text = evaluate(table, cfg, reached)
+        for t, ok, t_text in zip(index, passes, fail_text):
+            settle(t, ok, t_text)
+
+        earnings = {}
+        if include_earnings:
+            want = [t for t, p in zip(index, passes) if p or fill_all]
+            for t, earn in runner.map(load_earnings, want):
+                earnings[t] = earn
+
+    for t in index:
+        finish(t)
+    return ScanResult(frames, table, reached, passes, fail_text, earnings, skipped)
@@ -18,6 +18,7 @@ from datetime import datetime
 
 from .utils import ensure_dir, _netlog
 from .indicators import ta_sma, stochrsi
+from .bars import Bars
 
 def _fmt_millions(x, pos):
     if x >= 1_000_000: return f"{x/1_000_000:.0f}M"
@@ -35,18 +36,21 @@ def _log_plot_error(chart_dir: str, ticker: str, err: Exception):
     except Exception:
         pass
 
-def plot_ticker_stockcharts(df, cfg, out_dir: str, fail_reason: str = None):
+def plot_ticker_stockcharts(bars, cfg, out_dir: str, fail_reason: str = None):
     """
+    bars: Bars (DataFrame verilirse Ticker kolonuyla Bars'a çevrilir).
     fail_reason verilirse grafiğin sağ-alt köşesine kırmızı 'FAIL: reason' filigranı basar.
     """
     ensure_dir(out_dir)
+    if not isinstance(bars, Bars):
+        bars = Bars.from_frame(bars)
 
     # çok az bar varsa mpf bazen sıkıntı çıkarabiliyor
-    if len(df) < 10:
+    if len(bars) < 10:
         return  # sessiz atla
 
     with PLOT_LOCK:
-        tkr = str(df["Ticker"].iloc[-1])
+        tkr = str(bars.ticker)
         try:
             # ---- güvenli config okuma ----
             trn = (cfg.get("trend") or {}) if isinstance(cfg, dict) else {}
@@ -60,11 +64,11 @@ def plot_ticker_stockcharts(df, cfg, out_dir: str, fail_reason: str = None):
             st_k    = int(mom.get("stochrsi_k", mom.get("k", 3)))
             st_d    = int(mom.get("stochrsi_d", mom.get("d", 3)))
 
-            ma50  = ta_sma(df["Close"], ma_mid)
-            ma200 = ta_sma(df["Close"], ma_slow)
-            _rsi, k_line, d_line = stochrsi(df["Close"], rsi_len=rsi_len, k=st_k, d=st_d)
+            ma50  = ta_sma(bars.close, ma_mid)
+            ma200 = ta_sma(bars.close, ma_slow)
+            _rsi, k_line, d_line = stochrsi(bars.close, rsi_len=rsi_len, k=st_k, d=st_d)
 
-            base = df.set_index("Date")[["Open","High","Low","Close","Volume"]]
+            base = bars.ohlcv_frame()
             opts = (cfg.get("options") or {}) if isinstance(cfg, dict) else {}
             style_cfg = opts.get("style") or {}
             base_style = "classic"
@@ -84,10 +88,10 @@ def plot_ticker_stockcharts(df, cfg, out_dir: str, fail_reason: str = None):
                 **style_kwargs,
             )
             aps = [
-                mpf.make_addplot(ma50.values,  panel=0, color="#1f77b4", width=1.2),
-                mpf.make_addplot(ma200.values, panel=0, color="#d62728", width=1.2),
-                mpf.make_addplot(k_line.values,  panel=2, color="#1f77b4", width=1.0),
-                mpf.make_addplot(d_line.values,  panel=2, color="#7f7f7f", width=1.0),
+                mpf.make_addplot(ma50,  panel=0, color="#1f77b4", width=1.2),
+                mpf.make_addplot(ma200, panel=0, color="#d62728", width=1.2),
+                mpf.make_addplot(k_line,  panel=2, color="#1f77b4", width=1.0),
+                mpf.make_addplot(d_line,  panel=2, color="#7f7f7f", width=1.0),
             ]
 
             fig, axes = mpf.plot(
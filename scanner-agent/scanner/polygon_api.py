@@ -1,43 +1,145 @@
 import os, pandas as pd
 from .net import http_get
+from .anet import aget_json
 from .utils import _netlog
+from .store import cached_agg, cached_agg_async, agg_frame
+from .cache import HISTORY, single_flight
 
 POLYGON_API_KEY = os.getenv("POLYGON_API_KEY")
 
-def _poly_get(url, params=None):
+def _poly_headers():
     if not POLYGON_API_KEY:
         print("ERROR: POLYGON_API_KEY not found. Put it in .env like: POLYGON_API_KEY=xxxxx")
         raise SystemExit(1)
-    headers = {"Authorization": f"Bearer {POLYGON_API_KEY}"}
-    r = http_get(url, headers=headers, params=params or {})
+    return {"Authorization": f"Bearer {POLYGON_API_KEY}"}
+
+def _poly_get(url, params=None):
+    r = http_get(url, headers=_poly_headers(), params=params or {})
     return {} if r is None else r.json()
 
-def poly_get_agg(ticker: str, _from: str, _to: str, timespan="day"):
-    url = f"https://api.polygon.io/v2/aggs/ticker/{ticker}/range/1/{timespan}/{_from}/{_to}"
-    js = _poly_get(url, params={"adjusted": "true"})
-    if not js or js.get("resultsCount", 0) == 0:
+async def _poly_get_async(url, params=None):
+    js = await aget_json(url, headers=_poly_headers(), params=params or {})
+    return js or {}
+
+def _agg_url(ticker: str, _from: str, _to: str, timespan: str) -> str:
+    return f"https://api.polygon.io/v2/aggs/ticker/{ticker}/range/1/{timespan}/{_from}/{_to}"
+
+def _poly_fetch_agg(ticker: str, _from: str, _to: str, timespan="day"):
+    """Ham aggs çağrısı; istek başarısızsa None, veri yoksa boş DataFrame."""
+    js = _poly_get(_agg_url(ticker, _from, _to, timespan), params={"adjusted": "true"})
+    return _agg_rows(js)
+
+async def _poly_fetch_agg_async(ticker: str, _from: str, _to: str, timespan="day"):
+    js = await _poly_get_async(_agg_url(ticker, _from, _to, timespan), params={"adjusted": "true"})
+    return _agg_rows(js)
+
+def _agg_rows(js: dict):
+    if not js:
+        return None
+    if js.get("resultsCount", 0) == 0:
         return pd.DataFrame()
     rows = js["results"]
     df = pd.DataFrame(rows)
     df["Date"]   = pd.to_datetime(df["t"], unit="ms", utc=True).dt.tz_convert(None)
     df["Open"]   = df["o"]; df["High"] = df["h"]; df["Low"] = df["l"]; df["Close"] = df["c"]; df["Volume"] = df["v"]
+    return df[["Date","Open","High","Low","Close","Volume"]]
+
+def _poly_daily_stored(ticker: str, _from: str, _to: str):
+    return cached_agg("polygon", ticker, _from, _to,
+                      lambda a, b: _poly_fetch_agg(ticker, a, b, "day"))
+
+async def _poly_daily_stored_async(ticker: str, _from: str, _to: str):
+    return await cached_agg_async("polygon", ticker, _from, _to,
+                                  lambda a, b: _poly_fetch_agg_async(ticker, a, b, "day"))
+
+def _intraday_frame(df, ticker: str):
+    if df is None or df.empty:
+        return pd.DataFrame()
     df["Ticker"] = ticker
     df["ChangePct"] = df["Close"].pct_change() * 100
     return df[["Date","Ticker","Open","High","Low","Close","Volume","ChangePct"]]
 
-def poly_get_profile(ticker: str):
+def poly_get_agg(ticker: str, _from: str, _to: str, timespan="day"):
+    if timespan == "day":
+        df = HISTORY.get(("polygon", ticker), _from, _to,
+                         lambda a, b: _poly_daily_stored(ticker, a, b))
+        return agg_frame(df, ticker)
+    return _intraday_frame(_poly_fetch_agg(ticker, _from, _to, timespan), ticker)
+
+async def poly_get_agg_async(ticker: str, _from: str, _to: str, timespan="day"):
+    """poly_get_agg'in asyncio karşılığı; aynı bellek önbelleğini ve bar deposunu kullanır."""
+    if timespan == "day":
+        df = await HISTORY.get_async(("polygon", ticker), _from, _to,
+                                     lambda a, b: _poly_daily_stored_async(ticker, a, b))
+        return agg_frame(df, ticker)
+    return _intraday_frame(await _poly_fetch_agg_async(ticker, _from, _to, timespan), ticker)
+
+def poly_get_bars(ticker: str, _from: str, _to: str):
+    """Günlük barlar Bars olarak (tarama sıcak yolu; DataFrame kurulmaz)."""
+    return HISTORY.get_bars(("polygon", ticker), _from, _to,
+                            lambda a, b: _poly_daily_stored(ticker, a, b))
+
+async def poly_get_bars_async(ticker: str, _from: str, _to: str):
+    return await HISTORY.get_bars_async(("polygon", ticker), _from, _to,
+                                        lambda a, b: _poly_daily_stored_async(ticker, a, b))
+
+def _profile_url(ticker: str) -> str:
+    return f"https://api.polygon.io/v3/reference/tickers/{ticker}"
+
+def _profile_from_js(js: dict) -> dict:
     out = {"MarketCap": None, "Sector": None, "Shares": None}
+    res = js.get("results", {}) if js else {}
+    out["MarketCap"] = res.get("market_cap")
+    out["Sector"] = res.get("sic_description") or res.get("description")
+    out["Shares"] = (
+        res.get("share_class_shares_outstanding")
+        or res.get("weighted_shares_outstanding")
+        or res.get("shares_outstanding")
+    )
+    return out
+
+@single_flight("polygon_profile")
+def poly_get_profile(ticker: str):
     try:
-        url = f"https://api.polygon.io/v3/reference/tickers/{ticker}"
-        js = _poly_get(url)
-        res = js.get("results", {}) if js else {}
-        out["MarketCap"] = res.get("market_cap")
-        out["Sector"] = res.get("sic_description") or res.get("description")
-        out["Shares"] = (
-            res.get("share_class_shares_outstanding")
-            or res.get("weighted_shares_outstanding")
-            or res.get("shares_outstanding")
-        )
+        return _profile_from_js(_poly_get(_profile_url(ticker)))
     except Exception:
-        pass
+        return _profile_from_js({})
+
+@single_flight("polygon_profile")
+async def poly_get_profile_async(ticker: str):
+    try:
+        return _profile_from_js(await _poly_get_async(_profile_url(ticker)))
+    except Exception:
+        return _profile_from_js({})
+
+def poly_get_grouped_daily(date: str):
+    """
+    Bir işlem günü için tüm ABD hisselerinin günlük barı (tek istek).
+    İstek başarısızsa None, o gün bar yoksa (tatil) boş DataFrame.
+    """
+    url = f"https://api.polygon.io/v2/aggs/grouped/locale/us/market/stocks/{date}"
+    js = _poly_get(url, params={"adjusted": "true"})
+    if not js:
+        return None
+    rows = js.get("results") or []
+    if not rows:
+        return pd.DataFrame(columns=["Ticker","Open","High","Low","Close","Volume"])
+    df = pd.DataFrame(rows)
+    df["Ticker"] = df["T"].astype(str).str.replace(".", "-", regex=False)
+    df["Open"] = df["o"]; df["High"] = df["h"]; df["Low"] = df["l"]; df["Close"] = df["c"]; df["Volume"] = df["v"]
+    return df[["Ticker","Open","High","Low","Close","Volume"]]
+
+def poly_get_splits(since: str, until: str = None):
+    """since <= execution_date <= until olan split kayıtları; istek başarısızsa None."""
+    url = "https://api.polygon.io/v3/reference/splits"
+    params = {"execution_date.gte": since, "limit": 1000}
+    if until:
+        params["execution_date.lte"] = until
+    out = []
+    while url:
+        js = _poly_get(url, params=params)
+        if not js:
+            return None
+        out.extend(js.get("results") or [])
+        url, params = js.get("next_url"), None
     return out
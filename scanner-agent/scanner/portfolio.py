@@ -0,0 +1,281 @@
+"""
+Portföy analitiği: Electron uygulamasının işlem defteri (portfolio.sqlite) ve
+tarayıcının günlük kapanışları (bar deposu) üzerinden günlük NAV,
+gerçekleşen / gerçekleşmemiş K/Z, drawdown ve ağırlıklı portföy betası.
+
+Hesap (gün × sembol) matrisleri üzerinde yapılır: işlemler gün/sembol
+hücrelerine değişim olarak yazılır, pozisyon ve maliyet kümülatif toplamla
+çıkar; değerleme, getiri ve beta tek geçişte dizi işlemleridir. Döngü yalnızca
+işlem defteri (işlem sayısı kadar) ve sembol başına bar yükleme için var.
+
+    python scanner.py --portfolio <userData>/portfolio.sqlite
+
+Defter anlamı uygulamadaki storage.js ile aynı: 'buy' satırı pozisyonu
+shares / amount (toplam maliyet) değerine ayarlar (upsert), 'sell' satırı
+pozisyonun tamamını amount (satış geliri) karşılığında kapatır. Tüm tutarlar
+tek para birimi (USD) kabul edilir.
+"""
+import sqlite3
+import datetime
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .beta import TRADING_DAYS, beta_matrix
+from .utils import epoch_day, day_str
+
+
+def load_ledger(db_path: str) -> dict:
+    """
+    transactions, açık pozisyonların buy_date'leri ve nakit toplamı; veritabanı
+    salt okunur açılır (uygulama dosyayı her değişiklikte baştan yazar).
+    """
+    path = Path(db_path)
+    if not path.exists():
+        raise FileNotFoundError(f"Veritabanı bulunamadı: {db_path}")
+    conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        txns = conn.execute(
+            "SELECT type, symbol, shares, amount, occurred_at FROM transactions ORDER BY occurred_at, id"
+        ).fetchall()
+        buy_dates = dict(conn.execute("SELECT symbol, buy_date FROM holdings"))
+        cash = conn.execute("SELECT COALESCE(SUM(amount), 0) FROM cash_balances").fetchone()[0]
+    finally:
+        conn.close()
+    return {
+        "transactions": [
+            (str(kind).lower(), str(symbol).upper(), float(shares or 0), float(amount or 0), occurred)
+            for kind, symbol, shares, amount, occurred in txns
+        ],
+        "buy_dates": {str(s).upper(): d for s, d in buy_dates.items() if d},
+        "cash": float(cash or 0),
+    }
+
+
+def ledger_events(ledger: dict):
+    """
+    Defteri pozisyon değişimlerine çevirir. Dönüş: semboller ve olay dizileri
+    (gün, sembol kolonu, Δadet, Δmaliyet, gerçekleşen K/Z, satış geliri, giriş
+    akışı). Açık pozisyonun son alışı, işlem kayıt zamanı yerine kullanıcının
+    girdiği buy_date'e yazılır.
+    """
+    txns = [t for t in ledger["transactions"] if t[0] in ("buy", "sell") and t[4]]
+    last_buy = {}
+    for i, (kind, symbol, *_rest) in enumerate(txns):
+        if kind == "buy":
+            last_buy[symbol] = i
+
+    symbols = sorted({t[1] for t in txns})
+    col = {s: j for j, s in enumerate(symbols)}
+    state = {s: (0.0, 0.0) for s in symbols}
+    rows = []
+    for i, (kind, symbol, shares, amount, occurred) in enumerate(txns):
+        cur_shares, cur_cost = state[symbol]
+        when = occurred
+        if kind == "buy":
+            if last_buy.get(symbol) == i and symbol in ledger["buy_dates"]:
+                when = ledger["buy_dates"][symbol]
+            state[symbol] = (shares, amount)
+            rows.append((epoch_day(when), col[symbol], shares - cur_shares, amount - cur_cost, 0.0, 0.0,
+                         amount - cur_cost))
+        else:
+            state[symbol] = (0.0, 0.0)
+            rows.append((epoch_day(when), col[symbol], -cur_shares, -cur_cost, amount - cur_cost, amount, 0.0))
+
+    arr = np.array(rows, dtype=np.float64).reshape(-1, 7)
+    return symbols, {
+        "day": arr[:, 0].astype(np.int64),
+        "col": arr[:, 1].astype(np.int64),
+        "shares": arr[:, 2],
+        "cost": arr[:, 3],
+        "realized": arr[:, 4],
+        "proceeds": arr[:, 5],
+        "inflow": arr[:, 6],
+    }
+
+
+def load_closes(symbols, _from: str, _to: str, data_provider: str, workers: int = 8) -> dict:
+    """Sembol -> Bars; tarayıcının deposu / bellek önbelleği üzerinden, eksik aralıklar çekilir."""
+    from .worker import load_bars
+
+    with ThreadPoolExecutor(max_workers=max(1, int(workers))) as ex:
+        bars = list(ex.map(lambda t: load_bars(t, _from, _to, data_provider), symbols))
+    return dict(zip(symbols, bars))
+
+
+def _close_matrix(axis: np.ndarray, bars_list) -> np.ndarray:
+    """(gün × sembol) kapanışlar; eksen dışı barlar atılır, veri olmayan hücre NaN."""
+    C = np.full((len(axis), len(bars_list)), np.nan)
+    for j, bars in enumerate(bars_list):
+        if bars is None or len(bars) == 0:
+            continue
+        idx = np.searchsorted(axis, bars.days)
+        ok = idx < len(axis)
+        ok[ok] = axis[idx[ok]] == bars.days[ok]
+        C[idx[ok], j] = bars.close[ok]
+    return C
+
+
+def _ffill(C: np.ndarray) -> np.ndarray:
+    """Kolon bazında ileri doldurma (tatil / eksik gün); ilk değerden öncesi NaN kalır."""
+    rows = np.where(np.isfinite(C), np.arange(len(C))[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return C[rows, np.arange(C.shape[1])]
+
+
+def analyze(ledger: dict, closes: dict, bench=None, beta_cfg: dict = None, today: int = None) -> dict:
+    """
+    closes: sembol -> Bars, bench: benchmark Bars (ya da None).
+    Gün ekseni benchmark'ın işlem günleridir (yoksa sembollerin gün birleşimi);
+    seriler ilk işlem gününden başlar, beta son `years` yılın getirilerinden.
+    """
+    beta_cfg = beta_cfg or {}
+    today = epoch_day(datetime.date.today()) if today is None else int(today)
+    symbols, ev = ledger_events(ledger)
+    if not symbols:
+        return {"summary": None, "series": {}, "holdings": [], "missing": []}
+
+    start = int(ev["day"].min())
+    years = float(beta_cfg.get("years", 3))
+    beta_start = today - int(round(years * 365.25))
+    if bench is not None and len(bench):
+        axis = bench.days[bench.days >= min(start, beta_start)]
+    else:
+        axis = np.unique(np.concatenate([closes[s].days for s in symbols if closes.get(s) is not None] or [[]]))
+        axis = axis[axis >= min(start, beta_start)].astype(np.int64)
+    if len(axis) == 0 or axis[-1] < start:
+        axis = np.append(axis, max(start, today)).astype(np.int64)
+    T, N = len(axis), len(symbols)
+
+    C_raw = _close_matrix(axis, [closes.get(s) for s in symbols])
+    C = _ffill(C_raw)
+
+    # olaylar gün sonunda geçerli; tatile / depodaki son günden sonraya düşen
+    # olay bir sonraki (ya da son) eksen gününe yazılır
+    di = np.minimum(np.searchsorted(axis, ev["day"]), T - 1)
+    shares = np.zeros((T, N))
+    cost = np.zeros((T, N))
+    np.add.at(shares, (di, ev["col"]), ev["shares"])
+    np.add.at(cost, (di, ev["col"]), ev["cost"])
+    np.cumsum(shares, axis=0, out=shares)
+    np.cumsum(cost, axis=0, out=cost)
+    held = np.abs(shares) > 1e-9
+    shares[~held] = 0.0
+    cost[~held] = 0.0
+
+    # fiyatı henüz olmayan pozisyon maliyetinden değerlenir
+    value = np.where(held, np.where(np.isfinite(C), shares * C, cost), 0.0)
+    market_value = value.sum(axis=1)
+    cost_basis = cost.sum(axis=1)
+    unrealized = market_value - cost_basis
+    realized = np.cumsum(np.bincount(di, weights=ev["realized"], minlength=T))
+    proceeds = np.cumsum(np.bincount(di, weights=ev["proceeds"], minlength=T))
+    inflow = np.bincount(di, weights=ev["inflow"], minlength=T)
+    # cash_balances bugüne kadarki satış gelirlerini içerir; farkı başlangıç nakdi
+    cash = (ledger["cash"] - proceeds[-1]) + proceeds
+    nav = market_value + cash
+
+    # zaman ağırlıklı getiri: günlük K/Z / (önceki NAV + o günün alış akışı)
+    pnl = realized + unrealized
+    day_pnl = np.diff(pnl, prepend=0.0)
+    base = np.concatenate(([0.0], nav[:-1])) + inflow
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ret = np.where(base > 0, day_pnl / base, 0.0)
+    index = np.cumprod(1.0 + ret)
+    drawdown = index / np.maximum.accumulate(index) - 1.0
+
+    betas = np.full(N, np.nan)
+    if bench is not None and len(bench):
+        m_close = _close_matrix(axis, [bench])[:, 0]
+        w = int(round(years * TRADING_DAYS))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            R = np.diff(np.log(C_raw), axis=0)[-w:]
+            m = np.diff(np.log(m_close))[-w:]
+        betas = beta_matrix(R, m, min_points=int(beta_cfg.get("min_points", 500)),
+                            winsor_pct=float(beta_cfg.get("winsor_pct", 0.01)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weights = np.where(market_value[:, None] > 0, value / market_value[:, None], 0.0)
+    has_beta = np.isfinite(betas)
+    coverage = weights[:, has_beta].sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        beta_series = np.where(coverage > 0, weights[:, has_beta] @ betas[has_beta] / coverage, np.nan)
+
+    sl = slice(int(di.min()), T)
+    last = T - 1
+    open_cols = np.flatnonzero(held[last])
+    return {
+        "as_of": day_str(axis[last]),
+        "currency": "USD",
+        "summary": {
+            "nav": _num(nav[last]),
+            "market_value": _num(market_value[last]),
+            "cash": _num(cash[last]),
+            "cost_basis": _num(cost_basis[last]),
+            "realized_pnl": _num(realized[last]),
+            "unrealized_pnl": _num(unrealized[last]),
+            "total_pnl": _num(pnl[last]),
+            "return_pct": _num((index[last] - 1.0) * 100),
+            "drawdown_pct": _num(drawdown[last] * 100),
+            "max_drawdown_pct": _num(drawdown[sl].min() * 100),
+            "beta": _num(beta_series[last]),
+            "beta_coverage": _num(coverage[last]),
+        },
+        "series": {
+            "date": [day_str(d) for d in axis[sl]],
+            "nav": _list(nav[sl]),
+            "market_value": _list(market_value[sl]),
+            "cash": _list(cash[sl]),
+            "realized_pnl": _list(realized[sl]),
+            "unrealized_pnl": _list(unrealized[sl]),
+            "drawdown_pct": _list(drawdown[sl] * 100),
+            "beta": _list(beta_series[sl]),
+        },
+        "holdings": [
+            {
+                "symbol": symbols[j],
+                "shares": _num(shares[last, j]),
+                "cost_basis": _num(cost[last, j]),
+                "last_close": _num(C[last, j]),
+                "market_value": _num(value[last, j]),
+                "unrealized_pnl": _num(value[last, j] - cost[last, j]),
+                "weight": _num(weights[last, j]),
+                "beta": _num(betas[j]),
+            }
+            for j in open_cols
+        ],
+        "missing": [s for j, s in enumerate(symbols) if not np.isfinite(C_raw[:, j]).any()],
+    }
+
+
+def _num(x, digits: int = 6):
+    x = float(x)
+    return round(x, digits) if np.isfinite(x) else None
+
+
+def _list(a: np.ndarray, digits: int = 4) -> list:
+    a = np.round(np.asarray(a, dtype=np.float64), digits)
+    return np.where(np.isfinite(a), a, None).tolist()
+
+
+def portfolio_report(db_path: str, cfg: dict, workers: int = 8) -> dict:
+    """CLI / Electron girişi: defteri okur, kapanışları yükler, analyze() sonucunu döndürür."""
+    from .worker import data_provider_for
+
+    ledger = load_ledger(db_path)
+    symbols, ev = ledger_events(ledger)
+    if not symbols:
+        return analyze(ledger, {})
+    beta_cfg = cfg.get("beta", {}) or {}
+    today = epoch_day(datetime.date.today())
+    years = float(beta_cfg.get("years", 3))
+    _from = day_str(min(int(ev["day"].min()), today - int(round(years * 365.25))))
+    _to = day_str(today)
+    bench_sym = str(beta_cfg.get("benchmark", "SPY")).upper()
+    loaded = load_closes(sorted(set(symbols) | {bench_sym}), _from, _to, data_provider_for(cfg), workers=workers)
+    bench = loaded.get(bench_sym)
+    closes = {s: loaded[s] for s in symbols}
+    report = analyze(ledger, closes, bench=bench if bench is not None and len(bench) else None,
+                     beta_cfg=beta_cfg, today=today)
+    report["benchmark"] = bench_sym
+    return report
@@ -0,0 +1,128 @@
+"""
+Grafik üretimi için süreç havuzu.
+
+matplotlib işi GIL'e ve plotting.PLOT_LOCK'a takıldığı için thread'lerle
+ölçeklenmez. ChartPool her işçi süreçte matplotlib'i ve grafik şablonunu
+(chart_template) bir kez kurar (ön ısıtma) ve Bars dizilerini + FailReason'ı
+alıp PNG'yi orada çizer. İş kuyruğu sınırlıdır: kuyruk doluysa submit
+bekler (bellek sınırı), dolu değilse tarama thread'i hiç beklemez.
+"""
+import os
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .utils import _netlog
+
+# işçi süreç durumu
+_CFG = None
+
+
+def _init_worker(cfg: dict):
+    global _CFG
+    _CFG = cfg
+    # ağır importlar ve grafik şablonu süreç başına bir kez
+    from .chart_template import template_for
+    template_for(cfg)
+
+
+def _warm():
+    return os.getpid()
+
+
+def _render_one(bars, out_dir: str, fail_text: str):
+    from .chart_template import render_ticker
+    render_ticker(bars, _CFG, out_dir, fail_reason=(fail_text or None))
+
+
+class ChartPool:
+    """
+    with ChartPool(cfg) as pool: pool.submit(bars, out_dir, fail_text)
+
+    processes: işçi süreç sayısı (None = CPU sayısı). Havuzda aynı anda en
+    çok 2 x processes iş bulunur; geri kalanı queue_size'lık kuyrukta bekler.
+    """
+
+    def __init__(self, cfg: dict, processes: int = None, queue_size: int = 1024):
+        self.processes = max(1, int(processes or os.cpu_count() or 1))
+        # fork, tarama thread'leri ve açık soketlerle güvenli değil
+        ctx = multiprocessing.get_context("spawn")
+        self._ex = ProcessPoolExecutor(max_workers=self.processes, mp_context=ctx,
+                                       initializer=_init_worker, initargs=(cfg,))
+        self._queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._slots = threading.BoundedSemaphore(2 * self.processes)
+        self._lock = threading.Lock()
+        self._cfg = cfg
+        self._broken = False
+        self.submitted = 0
+        self.done = 0
+        self.failed = 0
+        for _ in range(self.processes):
+            self._ex.submit(_warm)
+        self._feeder = threading.Thread(target=self._feed, name="chart-feeder", daemon=True)
+        self._feeder.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def submit(self, bars, out_dir: str, fail_text: str):
+        self.submitted += 1
+        self._queue.put((bars, out_dir, fail_text))
+
+    def _feed(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            self._slots.acquire()
+            if not self._broken:
+                try:
+                    fut = self._ex.submit(_render_one, *item)
+                    fut.add_done_callback(lambda f, it=item: self._finish(it, f.exception()))
+                    continue
+                except BrokenProcessPool as e:
+                    self._mark_broken(e)
+            self._render_local(item)
+
+    def _mark_broken(self, err):
+        if not self._broken:
+            self._broken = True
+            _netlog(f"[plot warn] grafik süreç havuzu kullanılamıyor ({err}); grafikler bu süreçte çiziliyor")
+
+    def _render_local(self, item):
+        from .chart_template import render_ticker
+        bars, out_dir, fail_text = item
+        err = None
+        try:
+            render_ticker(bars, self._cfg, out_dir, fail_reason=(fail_text or None))
+        except Exception as e:
+            err = e
+        self._finish(item, err, retry=False)
+
+    def _finish(self, item, err, retry: bool = True):
+        self._slots.release()
+        if retry and isinstance(err, BrokenProcessPool):
+            # işçi süreç öldü: bu grafik (ve sonrakiler) yerelde çizilir
+            self._mark_broken(err)
+            self._slots.acquire()
+            self._render_local(item)
+            return
+        ticker = item[0].ticker
+        with self._lock:
+            self.done += 1
+            if err is not None:
+                self.failed += 1
+        if err is not None:
+            _netlog(f"[plot warn] {ticker}: {err}")
+
+    def close(self):
+        """Kuyruktaki tüm grafikler bitene kadar bekler."""
+        self._queue.put(None)
+        self._feeder.join()
+        self._ex.shutdown(wait=True)
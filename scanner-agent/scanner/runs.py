@@ -0,0 +1,321 @@
+"""
+Çalışma klasörüne ham metriklerin kaydı ve ağsız yeniden filtreleme.
+
+Her taramada run_dir/metrics.csv (ticker başına ham metrikler, yüklenen
+aşama sayısı, sonuç) ve run_dir/run.json (tarih aralığı, sağlayıcı, depo)
+yazılır. `--refilter <run_dir>` yeni filters.yaml'ı bu metriklere uygular,
+scan.csv'yi yeniden yazar ve yalnızca FailReason'ı değişen tickerların
+grafiklerini snapshot'tan ya da bar deposundan yeniden çizer (--bulk /
+--no-store çalışmalarında bu mümkün değildir; run.json bunu kaydeder).
+
+Ertelenmiş grafik modunda (--charts accepted|lazy) PNG yerine
+run_dir/bars.npy (tüm tickerların barları, tek yapılandırılmış dizi) ve
+run_dir/charts.json (ticker -> dilim, sonuç, grafik yolu) yazılır;
+render_run_chart tek ticker'ın grafiğini istendiğinde buradan çizer.
+"""
+import os
+import csv
+import json
+import numpy as np
+import pandas as pd
+
+from . import store
+from .bars import Bars
+from .filters import STAGES, PENDING, metrics_table, evaluate
+from .worker import build_row, render_chart, metric_params
+from .utils import ensure_dir, _netlog, epoch_day
+
+METRICS_FILE = "metrics.csv"
+META_FILE = "run.json"
+SNAPSHOT_FILE = "bars.npy"
+MANIFEST_FILE = "charts.json"
+
+# snapshot satırı: 32 bayt/bar, Bars ile aynı tipler
+SNAPSHOT_DTYPE = np.dtype([
+    ("days", np.int64), ("open", np.float32), ("high", np.float32),
+    ("low", np.float32), ("close", np.float32), ("volume", np.float64),
+])
+
+# grafik çizimini etkileyen config bölümleri (manifest'e kopyalanır)
+_STYLE_KEYS = ("trend", "momentum", "options")
+
+CSV_COLUMNS = [
+    "Ticker","Date","Close","ChangePct",
+    "Market Cap","YTDpct","Beta","AnalystRating",
+    "RecentEarnings","UpcomingEarnings","Sector",
+    "FailReason"   # elendiyse sebep(ler)
+]
+
+
+def save_run(run_dir: str, result, meta: dict):
+    table = result.table.copy()
+    table["reached"] = result.reached
+    table["passes"] = result.passes
+    table["fail_reason"] = result.fail_text
+    table["recent_earnings"] = [(result.earnings.get(t) or {}).get("RecentEarnings") for t in table.index]
+    table["upcoming_earnings"] = [(result.earnings.get(t) or {}).get("UpcomingEarnings") for t in table.index]
+    table.index.name = "ticker"
+    table.to_csv(os.path.join(run_dir, METRICS_FILE))
+    with open(os.path.join(run_dir, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+
+
+def load_run(run_dir: str):
+    path = os.path.join(run_dir, METRICS_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} bulunamadı")
+    raw = pd.read_csv(path, index_col="ticker", keep_default_na=False, na_values=[""])
+    meta = {}
+    meta_path = os.path.join(run_dir, META_FILE)
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+    return raw, meta
+
+
+def _chart_path(t: str, passes: bool) -> str:
+    return os.path.join("accepted" if passes else "rejected", f"{t}.png")
+
+
+def save_snapshot(run_dir: str, result, cfg: dict, mode: str):
+    """
+    Taramanın barlarını tek bars.npy'ye, ticker başına dilim ve filtre
+    sonucunu charts.json'a yazar.
+    """
+    index = list(result.table.index)
+    sizes = [len(result.frames[t]) for t in index]
+    snap = np.empty(int(sum(sizes)), dtype=SNAPSHOT_DTYPE)
+    entries, pos = {}, 0
+    for i, (t, n) in enumerate(zip(index, sizes)):
+        bars = result.frames[t]
+        part = snap[pos:pos + n]
+        for f in SNAPSHOT_DTYPE.names:
+            part[f] = getattr(bars, f)
+        passes = bool(result.passes[i])
+        entries[t] = {
+            "start": pos, "stop": pos + n,
+            "passes": passes,
+            "fail_reason": str(result.fail_text[i]),
+            "chart": _chart_path(t, passes),
+        }
+        pos += n
+    np.save(os.path.join(run_dir, SNAPSHOT_FILE), snap)
+    manifest = {
+        "version": 1,
+        "mode": mode,
+        "snapshot": SNAPSHOT_FILE,
+        "style": {k: cfg.get(k) for k in _STYLE_KEYS if cfg.get(k) is not None},
+        "tickers": entries,
+    }
+    _write_manifest(run_dir, manifest)
+
+
+def load_manifest(run_dir: str):
+    """charts.json; ertelenmiş grafik modunda çalışılmadıysa None."""
+    path = os.path.join(run_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(run_dir: str, manifest: dict):
+    path = os.path.join(run_dir, MANIFEST_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def snapshot_bars(run_dir: str, ticker: str, manifest: dict = None):
+    """Snapshot'tan tek ticker'ın barları (mmap, yalnızca o dilim okunur); yoksa None."""
+    manifest = manifest or load_manifest(run_dir)
+    entry = (manifest or {}).get("tickers", {}).get(ticker)
+    if entry is None:
+        return None
+    snap = np.load(os.path.join(run_dir, manifest.get("snapshot", SNAPSHOT_FILE)), mmap_mode="r")
+    part = snap[entry["start"]:entry["stop"]]
+    return Bars(ticker, part["days"], part["open"], part["high"],
+                part["low"], part["close"], part["volume"])
+
+
+def render_run_chart(run_dir: str, ticker: str, cfg: dict = None, force: bool = False) -> str:
+    """
+    Ertelenmiş moddaki bir çalışmadan ticker'ın grafiğini çizer (varsa ve
+    force değilse mevcut PNG'yi kullanır) ve PNG yolunu döndürür. cfg
+    verilmezse tarama anındaki stil ayarları (manifest) kullanılır.
+    """
+    manifest = load_manifest(run_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"{os.path.join(run_dir, MANIFEST_FILE)} bulunamadı")
+    entry = manifest["tickers"].get(ticker)
+    if entry is None:
+        raise ValueError(f"{ticker} bu çalışmada yok")
+    path = os.path.join(run_dir, entry["chart"])
+    if os.path.exists(path) and not force:
+        return path
+    from .chart_template import render_ticker
+
+    bars = snapshot_bars(run_dir, ticker, manifest)
+    render_ticker(bars, cfg if cfg is not None else manifest.get("style", {}),
+                  os.path.dirname(path), fail_reason=(entry["fail_reason"] or None))
+    if not os.path.exists(path):
+        raise RuntimeError(f"{ticker} grafiği oluşturulamadı")
+    return path
+
+
+def _local_bars(provider: str, ticker: str, _from: str, _to: str):
+    """Bar deposundan (ağa çıkmadan) [_from, _to] barları; yoksa None."""
+    cur = store.read_bars(provider, ticker)
+    if cur is None:
+        return None
+    bars = cur[0]
+    days = bars["Date"].map(epoch_day)
+    window = bars[(days >= epoch_day(_from)) & (days <= epoch_day(_to))]
+    return None if window.empty else Bars.from_frame(window, ticker)
+
+
+def charts_redrawable(meta: dict) -> bool:
+    """
+    Çalışmanın grafikleri ağa çıkmadan yeniden çizilebilir mi: snapshot
+    (ertelenmiş mod) ya da ticker başına bar deposu gerekir. --bulk barları
+    grouped-daily panelinden, --no-store doğrudan sağlayıcıdan gelir.
+    """
+    if "charts_redrawable" in meta:
+        return bool(meta["charts_redrawable"])
+    return bool(meta.get("store_dir")) and not meta.get("bulk")
+
+
+def _redraw_bars(run_dir: str, meta: dict, ticker: str):
+    """Yeniden çizim için barlar: önce çalışmanın snapshot'ı, sonra bar deposu."""
+    bars = snapshot_bars(run_dir, ticker)
+    if bars is not None:
+        return bars
+    if not meta.get("store_dir") or meta.get("bulk"):
+        return None
+    return _local_bars(meta.get("provider", "polygon"), ticker, meta.get("from"), meta.get("to"))
+
+
+def _check_metric_params(raw: pd.DataFrame, meta: dict, cfg: dict):
+    """
+    Kayıtlı metrikler yeni config ile kullanılabilir mi. Periyotlar değiştiyse
+    (ya da eski bir çalışmada açılan filtrenin metriği hiç kaydedilmediyse)
+    ValueError; yeni eşikler eski periyotlarla hesaplanmış metriklere uygulanmaz.
+    """
+    now = metric_params(cfg)
+    saved = meta.get("metric_params")
+    if saved is not None:
+        diff = [f"{k} {saved.get(k)} -> {v}" for k, v in now.items() if saved.get(k) != v]
+        if diff:
+            raise ValueError("kayıtlı metrikler farklı parametrelerle hesaplandı (" + ", ".join(diff)
+                             + "); bu değişiklik için yeniden tarayın")
+        return
+
+    # run.json'da parametre kaydı olmayan eski çalışma
+    _netlog("[refilter warn] çalışma metrik parametrelerini kaydetmemiş; periyot değişiklikleri denetlenemiyor")
+    needed = []
+    if bool((cfg.get("momentum", {}) or {}).get("enable_stochrsi", False)):
+        needed.append(("stoch_k", "StochRSI"))
+    if bool((cfg.get("trend", {}) or {}).get("enable_ma_cross_filter", False)):
+        needed.append(("ma_fast", "MA kesişimi"))
+    missing = [label for col, label in needed
+               if col not in raw.columns or not pd.to_numeric(raw[col], errors="coerce").notna().any()]
+    if missing:
+        raise ValueError(f"{', '.join(missing)} metrikleri bu çalışmada kaydedilmemiş "
+                         f"(filtre tarama sırasında kapalıydı); yeniden tarayın")
+
+
+def refilter_run(run_dir: str, cfg: dict, make_charts: bool = True):
+    """
+    Kayıtlı metriklere yeni filtreleri uygular. Dönüş sayıları: (geçen,
+    FailReason'ı değişen, geçti/kaldı durumu değişen, metrikleri eksik,
+    güncellenen grafik). Grafikler yeniden çizilemiyorsa son değer None.
+    Metriklerin periyotları yeni config'le uyuşmuyorsa ValueError.
+    """
+    raw, meta = load_run(run_dir)
+    _check_metric_params(raw, meta, cfg)
+    reached = raw["reached"].fillna(len(STAGES)).to_numpy(dtype=np.int64)
+    old_text = raw["fail_reason"].fillna("").astype(str).to_numpy()
+    old_pass = raw["passes"].astype(bool).to_numpy()
+
+    table = metrics_table(raw.drop(columns=["reached", "passes", "fail_reason"]).to_dict(orient="index"))
+    passes, fail_text = evaluate(table, cfg, reached)
+
+    write_all = bool(meta.get("write_all", True))
+    accepted_dir = os.path.join(run_dir, "accepted")
+    rejected_dir = os.path.join(run_dir, "rejected")
+    out_csv = os.path.join(run_dir, "scan.csv")
+    with open(out_csv, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS); writer.writeheader()
+        for i, t in enumerate(table.index):
+            if not (passes[i] or write_all):
+                continue
+            m = table.iloc[i].to_dict()
+            earn = {
+                "RecentEarnings": m.pop("recent_earnings", None),
+                "UpcomingEarnings": m.pop("upcoming_earnings", None),
+            }
+            earn = {k: (None if v != v else v) for k, v in earn.items()}
+            writer.writerow(build_row(t, m, earn, str(fail_text[i])))
+
+    changed = [i for i in range(len(table)) if fail_text[i] != old_text[i]]
+    pending = int(np.sum(fail_text == PENDING))
+
+    manifest = load_manifest(run_dir)
+    charts = 0
+    if manifest is not None and changed:
+        # ertelenmiş mod: manifest güncellenir, yalnızca "accepted" modunda
+        # geçenler hemen çizilir, diğerleri istendiğinde
+        eager = make_charts and manifest.get("mode") == "accepted"
+        for i in changed:
+            t = table.index[i]
+            entry = manifest["tickers"].get(t)
+            if entry is None:
+                continue
+            old_chart = os.path.join(run_dir, entry["chart"])
+            try:
+                os.remove(old_chart)
+            except OSError:
+                pass
+            entry.update(passes=bool(passes[i]), fail_reason=str(fail_text[i]),
+                         chart=_chart_path(t, bool(passes[i])))
+            charts += 1
+        manifest["style"] = {k: cfg.get(k) for k in _STYLE_KEYS if cfg.get(k) is not None}
+        _write_manifest(run_dir, manifest)
+        if eager:
+            for i in changed:
+                if passes[i] and table.index[i] in manifest["tickers"]:
+                    try:
+                        render_run_chart(run_dir, table.index[i], cfg, force=True)
+                    except Exception as e:
+                        _netlog(f"[plot warn] {table.index[i]}: {e}")
+    elif make_charts and meta.get("charts", True) and changed:
+        if not charts_redrawable(meta):
+            # eski PNG'ler yeni sonuçla çelişir; yerinde bırakılmaz
+            charts = None
+        if meta.get("store_dir"):
+            store.set_store(meta["store_dir"], enabled=True)
+        ensure_dir(accepted_dir)
+        ensure_dir(rejected_dir)
+        for i in changed:
+            t = table.index[i]
+            for d in (accepted_dir, rejected_dir):
+                try:
+                    os.remove(os.path.join(d, f"{t}.png"))
+                except OSError:
+                    pass
+            if charts is None or not (passes[i] or write_all):
+                continue
+            bars = _redraw_bars(run_dir, meta, t)
+            if bars is None:
+                _netlog(f"[refilter warn] {t}: bar deposunda veri yok, grafik atlandı")
+                continue
+            render_chart(t, bars, cfg, accepted_dir if passes[i] else rejected_dir, str(fail_text[i]))
+            charts += 1
+
+    # sonraki yeniden filtreleme bu sonuca göre fark alsın
+    raw["passes"] = passes
+    raw["fail_reason"] = fail_text
+    raw.to_csv(os.path.join(run_dir, METRICS_FILE))
+    status_changed = int(np.sum(passes != old_pass))
+    return int(np.sum(passes)), len(changed), status_changed, pending, charts
@@ -0,0 +1,221 @@
+"""
+Disk üzerinde ticker başına kolonlu (npz) günlük OHLCV deposu.
+
+Her dosya tek bir ticker'ın barlarını ve daha önce sağlayıcıdan çekilmiş
+(kapsanan) tarih aralığını tutar. İstenen aralık depodaysa doğrudan yerelden
+servis edilir; değilse yalnızca eksik baş/son günler sağlayıcıdan çekilir.
+"""
+import os
+import threading
+import datetime
+import numpy as np
+import pandas as pd
+
+from .utils import ensure_dir, _netlog, epoch_day, day_str, run_steps, run_steps_async, hold_async
+
+STORE_ENABLED = True
+STORE_DIR = os.path.join(".cache", "bars")
+
+# split / temettü düzeltmesi sonrası son barın kapanışı bu orandan fazla
+# değişirse depodaki geçmiş bayat sayılır ve tamamı yeniden çekilir
+_ADJUST_TOL = 1e-4
+
+_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+_EPOCH = pd.Timestamp("1970-01-01")
+
+_LOCKS = {}
+_LOCKS_GUARD = threading.Lock()
+
+
+def set_store(path: str = None, enabled: bool = True):
+    global STORE_DIR, STORE_ENABLED
+    if path:
+        STORE_DIR = str(path)
+    STORE_ENABLED = bool(enabled)
+
+
+def _lock_for(key):
+    with _LOCKS_GUARD:
+        lock = _LOCKS.get(key)
+        if lock is None:
+            lock = _LOCKS[key] = threading.Lock()
+        return lock
+
+
+def _path(provider: str, ticker: str) -> str:
+    return os.path.join(STORE_DIR, provider, f"{ticker}.npz")
+
+
+def _empty_frame() -> pd.DataFrame:
+    return pd.DataFrame(columns=["Date", "Ticker", *_COLUMNS, "ChangePct"])
+
+
+def read_bars(provider: str, ticker: str):
+    """
+    Depodaki barları (Date + OHLCV) ve kapsanan [lo, hi] gün aralığını döndürür.
+    Dosya yoksa / okunamazsa None.
+    """
+    path = _path(provider, ticker)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as z:
+            days = z["days"]
+            cols = {c: z[c] for c in _COLUMNS}
+            lo, hi = int(z["covered"][0]), int(z["covered"][1])
+    except Exception as e:
+        _netlog(f"[store warn] {path}: {e}")
+        return None
+    df = pd.DataFrame(cols)
+    df.insert(0, "Date", _EPOCH + pd.to_timedelta(days, unit="D"))
+    return df, lo, hi
+
+
+def write_bars(provider: str, ticker: str, df: pd.DataFrame, lo: int, hi: int):
+    path = _path(provider, ticker)
+    ensure_dir(os.path.dirname(path))
+    dates = pd.to_datetime(df["Date"]).dt.normalize()
+    days = ((dates - _EPOCH).dt.days).to_numpy(dtype=np.int64)
+    arrays = {c: df[c].to_numpy(dtype=np.float64) for c in _COLUMNS}
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            np.savez(f, days=days, covered=np.array([lo, hi], dtype=np.int64), **arrays)
+        os.replace(tmp, path)
+    except Exception as e:
+        _netlog(f"[store warn] {path}: {e}")
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def _merge(old: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    parts = [d for d in (old, new) if d is not None and not d.empty]
+    if not parts:
+        return pd.DataFrame(columns=["Date", *_COLUMNS])
+    out = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+    out = out.assign(Date=pd.to_datetime(out["Date"]).dt.normalize())
+    out = out.drop_duplicates("Date", keep="last").sort_values("Date")
+    return out[["Date", *_COLUMNS]].reset_index(drop=True)
+
+
+def _finished(bars: pd.DataFrame, hi: int) -> pd.DataFrame:
+    """Kapsam sonuna (hi) kadarki, yani kapanmış seanslara ait barlar."""
+    if bars is None or bars.empty:
+        return bars
+    return bars[pd.to_datetime(bars["Date"]) <= _EPOCH + pd.Timedelta(days=hi)]
+
+
+def _adjustment_changed(old: pd.DataFrame, new: pd.DataFrame) -> bool:
+    if old is None or old.empty or new is None or new.empty:
+        return False
+    anchor = pd.Timestamp(old["Date"].iloc[-1]).normalize()
+    hit = new[pd.to_datetime(new["Date"]).dt.normalize() == anchor]
+    if hit.empty:
+        return False
+    a, b = float(old["Close"].iloc[-1]), float(hit["Close"].iloc[-1])
+    return abs(a - b) > _ADJUST_TOL * max(abs(a), 1e-9)
+
+
+def _agg_steps(provider: str, ticker: str, _from: str, _to: str):
+    """
+    cached_agg'in depo mantığı. Sağlayıcıdan istenecek aralıkları (from, to)
+    olarak yield eder, karşılığında ham barları (ya da None) alır.
+    """
+    req_lo, req_hi = epoch_day(_from), epoch_day(_to)
+    today = epoch_day(datetime.date.today())
+    cur = read_bars(provider, ticker)
+    if cur is None:
+        bars, lo, hi = None, None, None
+    else:
+        bars, lo, hi = cur
+
+    changed = False
+    failed = False
+    if bars is None:
+        got = yield (day_str(req_lo), day_str(req_hi))
+        if got is None:
+            return None
+        bars = _merge(None, got)
+        lo, hi = req_lo, min(req_hi, today - 1)
+        changed = True
+    else:
+        if req_hi > hi:
+            # kapsamdaki son (kapanmış) bar da çekilir; kapanışı değiştiyse geçmiş
+            # yeniden düzeltilmiştir. Gün içi bar çapa olamaz, kapanışı zaten oynar.
+            settled = _finished(bars, hi)
+            anchor = epoch_day(settled["Date"].iloc[-1]) if not settled.empty else hi + 1
+            got = yield (day_str(anchor), day_str(req_hi))
+            if got is not None and _adjustment_changed(settled, got):
+                full_lo = min(lo, req_lo)
+                got = yield (day_str(full_lo), day_str(req_hi))
+                if got is not None:
+                    bars, lo = None, full_lo
+            if got is not None:
+                bars = _merge(bars, got)
+                hi = max(hi, min(req_hi, today - 1))
+                changed = True
+            else:
+                failed = True
+        if req_lo < lo:
+            got = yield (day_str(req_lo), day_str(lo - 1))
+            if got is not None:
+                bars = _merge(bars, got)
+                lo = req_lo
+                changed = True
+            else:
+                failed = True
+
+    if changed:
+        # kapsam dışındaki (bugünün, henüz kapanmamış) bar diske yazılmaz; bu
+        # çalışmanın penceresinde yine de servis edilir
+        write_bars(provider, ticker, _finished(bars, hi), lo, hi)
+
+    dates = pd.to_datetime(bars["Date"])
+    window = bars[(dates >= _EPOCH + pd.Timedelta(days=req_lo)) &
+                  (dates <= _EPOCH + pd.Timedelta(days=req_hi))]
+    out = agg_frame(window, ticker)
+    if failed:
+        # depodakiler servis edilir ama aralık eksik; üst katman kapsam saymaz
+        out.attrs["partial"] = True
+    return out
+
+
+def cached_agg(provider: str, ticker: str, _from: str, _to: str, fetch) -> pd.DataFrame:
+    """
+    [_from, _to] aralığındaki günlük barları depodan servis eder.
+
+    fetch(_from, _to) sağlayıcıdan ham barları (Date + OHLCV) döndürür:
+    boş DataFrame = o aralıkta veri yok, None = istek başarısız (kapsam
+    genişletilmez). Bugünün barı kapsama yazılmaz; gün içi yarım bar bir
+    sonraki çalışmada tazelenir.
+
+    Dönüş None ise hiç veri alınamadı; attrs["partial"] ise aralığın bir
+    kısmı çekilemedi ve yalnızca depodaki barlar döndü.
+    """
+    if not STORE_ENABLED:
+        got = fetch(_from, _to)
+        return None if got is None else agg_frame(got, ticker)
+    with _lock_for((provider, ticker)):
+        return run_steps(_agg_steps(provider, ticker, _from, _to), fetch)
+
+
+async def cached_agg_async(provider: str, ticker: str, _from: str, _to: str, afetch) -> pd.DataFrame:
+    """cached_agg'in asyncio karşılığı; afetch bir coroutine fonksiyonudur."""
+    if not STORE_ENABLED:
+        got = await afetch(_from, _to)
+        return None if got is None else agg_frame(got, ticker)
+    async with hold_async(_lock_for((provider, ticker))):
+        # npz okuma / yazma loop'u bloklamasın
+        return await run_steps_async(_agg_steps(provider, ticker, _from, _to), afetch, blocking=True)
+
+
+def agg_frame(df, ticker: str) -> pd.DataFrame:
+    """Date + OHLCV barlarını poly_get_agg çıktı şemasına (Ticker, ChangePct) çevirir."""
+    if df is None or df.empty:
+        return _empty_frame()
+    df = df.reset_index(drop=True).copy()
+    df["Ticker"] = ticker
+    df["ChangePct"] = df["Close"].pct_change() * 100
+    return df[["Date", "Ticker", *_COLUMNS, "ChangePct"]]
@@ -1,4 +1,7 @@
 import os
+import weakref
+import datetime
+import contextlib
 
 QUIET_WARNINGS = False  # run-time set from CLI/options
 
@@ -20,3 +23,85 @@ def human_money(n: float):
     return f"{n:.0f}"
 
 def ensure_dir(p): os.makedirs(p, exist_ok=True)
+
+_EPOCH_DATE = datetime.date(1970, 1, 1)
+
+def epoch_day(value) -> int:
+    """'YYYY-MM-DD' / date / datetime / Timestamp -> 1970-01-01'den beri gün sayısı."""
+    if isinstance(value, str):
+        value = datetime.date.fromisoformat(value[:10])
+    elif isinstance(value, datetime.datetime):
+        value = value.date()
+    return (value - _EPOCH_DATE).days
+
+def day_str(day: int) -> str:
+    return (_EPOCH_DATE + datetime.timedelta(days=int(day))).isoformat()
+
+def run_steps(steps, fetch):
+    """
+    Çekim isteklerini (args tuple) yield eden bir generator'ı senkron sürer:
+    her isteği fetch(*args) ile karşılar, generator'ın return değerini döndürür.
+    """
+    try:
+        req = next(steps)
+        while True:
+            req = steps.send(fetch(*req))
+    except StopIteration as stop:
+        return stop.value
+
+def _send_step(steps, value):
+    # StopIteration bir Future'a konamaz; iş parçacığından (bitti, değer) döner
+    try:
+        return False, steps.send(value)
+    except StopIteration as stop:
+        return True, stop.value
+
+async def run_steps_async(steps, afetch, blocking: bool = False):
+    """
+    run_steps'in asyncio karşılığı; istekler `await afetch(*args)` ile karşılanır.
+    blocking: generator adımları dosya G/Ç'si yapıyorsa her adım event loop
+    yerine bir işçi iş parçacığında sürülür.
+    """
+    import asyncio
+    value = None
+    while True:
+        if blocking:
+            done, out = await asyncio.to_thread(_send_step, steps, value)
+        else:
+            done, out = _send_step(steps, value)
+        if done:
+            return out
+        value = await afetch(*out)
+
+# event loop -> {threading.Lock: asyncio.Lock}; loop kapanınca kendiliğinden düşer
+_ASYNC_LOCKS = weakref.WeakKeyDictionary()
+
+@contextlib.asynccontextmanager
+async def hold_async(lock):
+    """
+    threading.Lock'u event loop'u bloklamadan tutar; True verirse kilit
+    beklenmiştir. Aynı kilidi bekleyen coroutine'ler ona bağlı bir asyncio.Lock
+    sırasında uyur; iş parçacığı kilidi yalnızca senkron yoldan tutuluyorsa
+    bir işçi iş parçacığında beklenir (loop başına kilit başına en fazla bir).
+    """
+    import asyncio
+    loop = asyncio.get_running_loop()
+    locks = _ASYNC_LOCKS.setdefault(loop, {})
+    alock = locks.get(lock)
+    if alock is None:
+        alock = locks[lock] = asyncio.Lock()
+    contended = alock.locked()
+    async with alock:
+        if not lock.acquire(blocking=False):
+            contended = True
+            waiter = asyncio.ensure_future(asyncio.to_thread(lock.acquire))
+            try:
+                await asyncio.shield(waiter)
+            except asyncio.CancelledError:
+                # iş parçacığı kilidi yine de alacak; alınınca bırakılır
+                waiter.add_done_callback(lambda _f: lock.release())
+                raise
+        try:
+            yield contended
+        finally:
+            lock.release()
@@ -1,10 +1,37 @@
 
+import re
 import functools
 import pandas as pd
-import yfinance as yf
 
-from .net import http_get
+from .net import http_get, record_provider
+from .anet import aget_json
 from .utils import _netlog
+from .store import cached_agg, agg_frame
+from .cache import HISTORY, single_flight
+
+def _yf():
+    """yfinance'ın importu pahalı; yalnızca Yahoo'ya gerçekten gidilince yüklenir."""
+    import yfinance
+    return yfinance
+
+# devre kesiciye yalnızca taşıma hataları ve HTTP 429 / 5xx yazılır; "veri yok"
+# (delist edilmiş / az bilinen ticker) sağlayıcının sağlığı hakkında bir şey söylemez
+_TRANSPORT_TEXT = re.compile(
+    r"HTTP (Error )?(429|5\d\d)|\b429\b|too many requests|rate.?limit|timed? ?out|connection", re.I)
+
+def _transport_failure(err) -> bool:
+    """yfinance hatası (istisna ya da mesaj) ağ / 429 / 5xx kaynaklı mı."""
+    if err is None:
+        return False
+    name = type(err).__name__ if isinstance(err, BaseException) else ""
+    if any(k in name for k in ("RateLimit", "Timeout", "Connection")):
+        return True
+    return bool(_TRANSPORT_TEXT.search(str(err)))
+
+def _download_error(ticker: str):
+    # yf.download hataları yutup shared._ERRORS'a yazar (en iyi çaba)
+    errors = getattr(getattr(_yf(), "shared", None), "_ERRORS", None) or {}
+    return errors.get(ticker) or errors.get(ticker.upper())
 
 def _yahoo_get(url, params=None):
     r = http_get(url, params=params or {})
@@ -46,36 +73,57 @@ def _rating_label_from_trend(trend: dict) -> str:
         return "Sell"
     return "Hold"
 
+_QUOTE_SUMMARY_URL = "https://query1.finance.yahoo.com/v10/finance/quoteSummary/{}"
+_ANALYST_MODULES = {"modules": "financialData,recommendationTrend"}
+
+def _rating_label_from_summary(js: dict) -> str:
+    if not js:
+        return ""
+    res_list = (js.get("quoteSummary") or {}).get("result") or []
+    if not res_list:
+        return ""
+    res = res_list[0] or {}
+
+    fin = res.get("financialData") or {}
+    mean = fin["recommendationMean"]["raw"] if isinstance(fin.get("recommendationMean"), dict) else fin.get("recommendationMean")
+    label = _rating_label_from_mean(mean)
+    if label:
+        return label
+
+    trend = res.get("recommendationTrend") or {}
+    periods = trend.get("trend") or []
+    latest = periods[0] if periods else {}
+    return _rating_label_from_trend(latest)
+
 @functools.lru_cache(maxsize=8192)
+@single_flight("yahoo_analyst")
 def yahoo_get_analyst_rating_label(ticker: str) -> str:
     try:
-        url = f"https://query1.finance.yahoo.com/v10/finance/quoteSummary/{ticker}"
-        params = {"modules": "financialData,recommendationTrend"}
-        js = _yahoo_get(url, params=params)
-        if not js:
-            return ""
-        res_list = (js.get("quoteSummary") or {}).get("result") or []
-        if not res_list:
-            return ""
-        res = res_list[0] or {}
-
-        fin = res.get("financialData") or {}
-        mean = fin["recommendationMean"]["raw"] if isinstance(fin.get("recommendationMean"), dict) else fin.get("recommendationMean")
-        label = _rating_label_from_mean(mean)
-        if label:
-            return label
-
-        trend = res.get("recommendationTrend") or {}
-        periods = trend.get("trend") or []
-        latest = periods[0] if periods else {}
-        return _rating_label_from_trend(latest)
+        js = _yahoo_get(_QUOTE_SUMMARY_URL.format(ticker), params=_ANALYST_MODULES)
+        return _rating_label_from_summary(js)
+    except Exception:
+        return ""
+
+# async varyantın çalışma içi önbelleği (lru_cache coroutine sonucunu saklayamaz)
+_ANALYST_LABELS = {}
+
+@single_flight("yahoo_analyst")
+async def yahoo_get_analyst_rating_label_async(ticker: str) -> str:
+    if ticker in _ANALYST_LABELS:
+        return _ANALYST_LABELS[ticker]
+    try:
+        js = await aget_json(_QUOTE_SUMMARY_URL.format(ticker), params=_ANALYST_MODULES)
+        label = _rating_label_from_summary(js or {})
     except Exception:
         return ""
+    _ANALYST_LABELS[ticker] = label
+    return label
 
 @functools.lru_cache(maxsize=8192)
+@single_flight("yahoo_earnings")
 def yahoo_get_earnings_dates(ticker: str):
     try:
-        tk = yf.Ticker(ticker)
+        tk = _yf().Ticker(ticker)
         df = tk.get_earnings_dates(limit=12)
         if df is None or df.empty:
             return {"RecentEarnings": None, "UpcomingEarnings": None}
@@ -90,16 +138,15 @@ def yahoo_get_earnings_dates(ticker: str):
     except Exception:
         return {"RecentEarnings": None, "UpcomingEarnings": None}
 
-@functools.lru_cache(maxsize=4096)
-def yahoo_price_history_cached(ticker: str, start: str, end: str):
+def _yahoo_download(ticker: str, start: str, end: str):
     try:
         end_plus = (pd.to_datetime(end) + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
     except Exception:
         end_plus = end
 
-    df = None
+    df, err = None, None
     try:
-        df = yf.download(
+        df = _yf().download(
             ticker,
             start=start,
             end=end_plus,
@@ -108,35 +155,55 @@ def yahoo_price_history_cached(ticker: str, start: str, end: str):
             progress=False,
             threads=False,
         )
-    except Exception:
-        df = None
+        if df is None or df.empty:
+            err = _download_error(ticker)
+    except Exception as e:
+        df, err = None, e
 
     if df is None or df.empty:
         try:
-            tk = yf.Ticker(ticker)
+            tk = _yf().Ticker(ticker)
             df = tk.history(
                 start=start,
                 end=end_plus,
                 interval="1d",
                 auto_adjust=False,
             )
-        except Exception:
-            df = None
+        except Exception as e:
+            df, err = None, e
 
+    # boş sonuç çağırana başarısız (None) döner ki kapsam sayılmasın; devre
+    # kesici ise yalnızca ağ / 429 / 5xx hatasında başarısızlık görür
     if df is None or df.empty:
-        return pd.DataFrame()
+        record_provider("yahoo", not _transport_failure(err))
+        return None
+    record_provider("yahoo", True)
 
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = [col[0] if isinstance(col, tuple) and col else col for col in df.columns]
     df = df.reset_index()
     if 'Date' not in df.columns:
         date_col = df.columns[0]
         df = df.rename(columns={date_col: 'Date'})
     df['Date'] = pd.to_datetime(df['Date']).dt.tz_localize(None)
-    df['Ticker'] = ticker
-    df['ChangePct'] = df['Close'].pct_change() * 100
-    return df[['Date', 'Ticker', 'Open', 'High', 'Low', 'Close', 'Volume', 'ChangePct']]
+    return df[['Date', 'Open', 'High', 'Low', 'Close', 'Volume']]
+
+def _yahoo_daily_stored(ticker: str, start: str, end: str):
+    return cached_agg("yahoo", ticker, start, end,
+                      lambda a, b: _yahoo_download(ticker, a, b))
+
+def yahoo_price_history_cached(ticker: str, start: str, end: str):
+    df = HISTORY.get(("yahoo", ticker), start, end,
+                     lambda a, b: _yahoo_daily_stored(ticker, a, b))
+    return agg_frame(df, ticker)
 
 def yahoo_get_agg(ticker: str, _from: str, _to: str):
-    return yahoo_price_history_cached(ticker, _from, _to).copy()
+    return yahoo_price_history_cached(ticker, _from, _to)
+
+def yahoo_get_bars(ticker: str, _from: str, _to: str):
+    """Günlük barlar Bars olarak (tarama sıcak yolu)."""
+    return HISTORY.get_bars(("yahoo", ticker), _from, _to,
+                            lambda a, b: _yahoo_daily_stored(ticker, a, b))
 
 def yahoo_close_series(ticker: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.Series:
     df = yahoo_price_history_cached(ticker, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
@@ -147,10 +214,12 @@ def yahoo_close_series(ticker: str, start: pd.Timestamp, end: pd.Timestamp) -> p
     return s
 
 @functools.lru_cache(maxsize=4096)
+@single_flight("yahoo_profile")
 def yahoo_get_profile(ticker: str):
     out = {"MarketCap": None, "Sector": None, "Shares": None}
+    err = None
     try:
-        tk = yf.Ticker(ticker)
+        tk = _yf().Ticker(ticker)
         fast = getattr(tk, 'fast_info', {}) or {}
         market_cap = fast.get('market_cap') or fast.get('market_capitalization')
         if market_cap:
@@ -168,10 +237,12 @@ def yahoo_get_profile(ticker: str):
         try:
             info = tk.get_info() or {}
             sector = info.get('sector') or info.get('industry') or info.get('longName')
-        except Exception:
-            sector = None
+        except Exception as e:
+            sector, err = None, e
         if sector:
             out['Sector'] = sector
-    except Exception:
-        pass
+    except Exception as e:
+        err = e
+    # boş profil (bilinmeyen ticker) başarı sayılır
+    record_provider("yahoo", not _transport_failure(err))
     return out